@@ -1,71 +1,55 @@
 import os
-import io
-import time
-import base64
-import uuid
-import PIL.Image
-from flask import Flask, render_template, request, jsonify
+import json
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from flask import Flask, Response, render_template, request, jsonify, stream_with_context
 from dotenv import load_dotenv
 
-# Google Cloud & GenAI specific imports
-from google.cloud import storage
-from google.api_core import exceptions as google_exceptions
-from google import genai
-from google.genai import types
+from batch import BATCH_MAX_BODY_BYTES, BATCH_MAX_ITEMS, run_batch
+from clients import (
+    MissingConfigError,
+    get_gcs_uploader,
+    get_gemini_image_client,
+    get_veo_video_client,
+    warm_up_in_background,
+)
+from pipeline import LOCAL_IMAGE_DIR, generate_image, save_image_locally, submit_video, wait_for_video
+from sketch_preprocess import (
+    MAX_PAYLOAD_BYTES,
+    SketchPayloadError,
+    SketchTooLargeError,
+    check_payload_size,
+    preprocess_in_worker,
+    strip_data_url,
+)
+from telemetry import configure_logging, init_app as init_telemetry, logger, render_metrics, span
 
 # --- Configuration & Initialization ---
+# Clients are created lazily (see clients.py) so importing this module is fast
+# and does not require credentials; gunicorn.conf.py warms them up per worker.
 load_dotenv('.env')
+configure_logging()
 
 app = Flask(__name__)
+init_telemetry(app)
+# Reject oversized request bodies before Flask parses the JSON
+# (base64 inflates the sketch by 4/3, plus room for the prompt).
+SINGLE_MAX_BODY_BYTES = MAX_PAYLOAD_BYTES * 4 // 3 + 64 * 1024
+app.config['MAX_CONTENT_LENGTH'] = max(SINGLE_MAX_BODY_BYTES, BATCH_MAX_BODY_BYTES)
 
-LOCAL_IMAGE_DIR = os.path.join('static', 'generated_images')
 os.makedirs(LOCAL_IMAGE_DIR, exist_ok=True)
 
-# Gemini Image Generation Client (using your existing setup)
-API_KEY = os.environ.get("GOOGLE_API_KEY")
-MODEL_ID_IMAGE = 'gemini-2.0-flash-exp-image-generation'
-
-# Veo Video Generation Client (NEW)
-PROJECT_ID = os.environ.get("PROJECT_ID")
-LOCATION = os.environ.get("GOOGLE_CLOUD_REGION", "us-central1")
-GCS_BUCKET_NAME = os.environ.get("GCS_BUCKET_NAME")
-MODEL_ID_VIDEO = "veo-3.0-generate-preview" # Your Veo model ID
-
-if not all([API_KEY, PROJECT_ID, GCS_BUCKET_NAME, LOCATION]):
-    raise RuntimeError("Missing required environment variables. Check your .env file.")
-
-# Initialize clients
-try:
-    # Client for Gemini Image Generation
-    gemini_image_client = genai.Client(api_key=API_KEY)
-    print(f"Gemini Image Client initialized successfully for model: {MODEL_ID_IMAGE}")
-
-    # Client for Veo Video Generation (Vertex AI)
-    veo_video_client = genai.Client(vertexai=True, project=PROJECT_ID, location=LOCATION)
-    print(f"Veo Video Client (Vertex AI) initialized successfully for project: {PROJECT_ID}")
-
-    # Client for Google Cloud Storage
-    gcs_client = storage.Client(project=PROJECT_ID)
-    print("Google Cloud Storage Client initialized successfully.")
-
-except Exception as e:
-    print(f"Error during client initialization: {e}")
-    gemini_image_client = veo_video_client = gcs_client = None
-
-
-# --- Helper Function to Upload to GCS (NEW) ---
-def upload_bytes_to_gcs(image_bytes: bytes, bucket_name: str, destination_blob_name: str) -> str:
-    """Uploads image bytes to GCS and returns the GCS URI."""
-    if not gcs_client:
-        raise ConnectionError("GCS client is not initialized.")
-    
-    bucket = gcs_client.bucket(bucket_name)
-    blob = bucket.blob(destination_blob_name)
-    blob.upload_from_string(image_bytes, content_type='image/png')
-    
-    gcs_uri = f"gs://{bucket_name}/{destination_blob_name}"
-    print(f"Image successfully uploaded to {gcs_uri}")
-    return gcs_uri
+
+def _get_clients():
+    """Returns (gemini, veo, uploader) or raises with a user-facing message."""
+    try:
+        return get_gemini_image_client(), get_veo_video_client(), get_gcs_uploader()
+    except MissingConfigError as e:
+        logger.error(f"Error during client initialization: {e}")
+        raise
+    except Exception as e:
+        logger.exception(f"Error during client initialization: {e}")
+        raise RuntimeError("A server-side client is not initialized. Check server logs.") from e
 
 
 # --- Main Routes ---
@@ -74,144 +58,100 @@ def index():
     """Renders the main HTML page."""
     return render_template('index.html')
 
+@app.before_request
+def limit_single_sketch_body():
+    """Applies the single-sketch body limit to /generate (batches get a larger one)."""
+    if request.endpoint == 'generate_video_from_sketch' and (request.content_length or 0) > SINGLE_MAX_BODY_BYTES:
+        return payload_too_large(None)
+
+@app.errorhandler(413)
+def payload_too_large(e):
+    """Returns oversized uploads as JSON so the frontend can show the error."""
+    return jsonify({"error": "Sketch is too large. Try a smaller image."}), 413
+
+@app.route('/metrics')
+def metrics():
+    """Stage and request duration histograms in the Prometheus text format."""
+    return Response(render_metrics(), mimetype='text/plain; version=0.0.4')
+
 @app.route('/generate', methods=['POST'])
 def generate_video_from_sketch():
     """Full pipeline: sketch -> image -> video."""
-    if not all([gemini_image_client, veo_video_client, gcs_client]):
-        return jsonify({"error": "A server-side client is not initialized. Check server logs."}), 500
+    try:
+        gemini_image_client, veo_video_client, gcs_uploader = _get_clients()
+    except RuntimeError as e:
+        return jsonify({"error": str(e)}), 500
 
     if not request.json or 'image_data' not in request.json:
         return jsonify({"error": "Missing image_data in request"}), 400
 
-    base64_image_data = request.json['image_data']
+    base64_data = strip_data_url(request.json['image_data'])
     user_prompt = request.json.get('prompt', '').strip()
 
-    # --- Step 1: Generate Image with Gemini ---
     try:
-        print("--- Step 1: Generating image from sketch with Gemini ---")
-        if ',' in base64_image_data:
-            base64_data = base64_image_data.split(',', 1)[1]
-        else:
-            base64_data = base64_image_data
-        
-        image_bytes = base64.b64decode(base64_data)
-        sketch_pil_image = PIL.Image.open(io.BytesIO(image_bytes))
-
-        # Enhanced default prompt for photorealistic images
-        default_prompt = (
-            "Transform this sketch into a breathtaking, photorealistic masterpiece. "
-            "The final image should look like a high-resolution photograph captured on a professional "
-            "DSLR camera with a 50mm f/1.8 prime lens. Emphasize hyper-realistic textures, "
-            "intricate details, and natural, soft lighting that casts gentle shadows. "
-            "The scene should have a cinematic quality with a shallow depth of field, making the subject pop."
-        )
-        # Combine user prompt with the default for a more guided generation
-        prompt_text = f"{user_prompt}. {default_prompt}" if user_prompt else default_prompt
-
-        response = gemini_image_client.models.generate_content(
-            model=MODEL_ID_IMAGE,
-            contents=[prompt_text, sketch_pil_image],
-            config=types.GenerateContentConfig(response_modalities=['TEXT', 'IMAGE'])
-        )
-
-        if not response.candidates:
-            raise ValueError("Gemini image generation returned no candidates.")
-
-        generated_image_bytes = None
-        for part in response.candidates[0].content.parts:
-            if part.inline_data and part.inline_data.mime_type.startswith('image/'):
-                generated_image_bytes = part.inline_data.data
-                break
-        
-        if not generated_image_bytes:
-            raise ValueError("Gemini did not return an image in the response.")
-        
-        print("Image generated successfully.")
-
-        try:
-            # Use a unique filename to prevent overwrites
-            local_filename = f"generated-image-{uuid.uuid4()}.png"
-            local_image_path = os.path.join(LOCAL_IMAGE_DIR, local_filename)
-            # Write the bytes to a file in binary mode ('wb')
-            with open(local_image_path, "wb") as f:
-                f.write(generated_image_bytes)
-            print(f"Image also saved locally to: {local_image_path}")
-        except Exception as e:
-            # This is not a critical error, so we just print a warning and continue.
-            print(f"[Warning] Could not save image locally: {e}")
+        check_payload_size(base64_data)
+    except SketchTooLargeError as e:
+        return jsonify({"error": str(e)}), 413
 
+    # --- Step 0: Shrink the sketch before it goes to Gemini ---
+    try:
+        with span("preprocess"):
+            sketch_png = preprocess_in_worker(base64_data)
+        logger.info(f"Sketch preprocessed: {len(base64_data) * 3 // 4} -> {len(sketch_png)} bytes")
+    except SketchPayloadError as e:
+        return jsonify({"error": str(e)}), 400
+    except FutureTimeoutError:
+        logger.warning("Sketch preprocessing timed out")
+        return jsonify({"error": "Preprocessing the sketch took too long. Try a smaller image."}), 500
+    except BrokenProcessPool:
+        logger.exception("Sketch preprocessing worker died; the pool will be rebuilt")
+        return jsonify({"error": "Sketch preprocessing is temporarily unavailable. Please try again."}), 503
+
+    # --- Step 1: Generate Image with Gemini ---
+    try:
+        logger.info("Step 1: Generating image from sketch with Gemini")
+        generated_image_bytes = generate_image(gemini_image_client, sketch_png, user_prompt)
+        save_image_locally(generated_image_bytes)
     except Exception as e:
-        print(f"Error during Gemini image generation: {e}")
+        logger.exception(f"Error during Gemini image generation: {e}")
         return jsonify({"error": f"Failed to generate image: {e}"}), 500
 
     # --- Step 2 & 3: Upload Image to GCS and Generate Video with Veo ---
     try:
-        print("\n--- Step 2: Uploading generated image to GCS ---")
-        unique_id = uuid.uuid4()
-        image_blob_name = f"images/generated-image-{unique_id}.png"
-        output_gcs_prefix = f"gs://{GCS_BUCKET_NAME}/videos/" # Folder for video outputs
-
-        image_gcs_uri = upload_bytes_to_gcs(generated_image_bytes, GCS_BUCKET_NAME, image_blob_name)
-        
-        print("\n--- Step 3: Calling Veo to generate video ---")
-        # Enhanced default prompt for cinematic video generation
-        default_video_prompt = (
-            "Animate this image with ultra-realistic, subtle motion, like a living photograph or cinemagraph. "
-            "Introduce gentle, natural movements: a soft breeze, slow-drifting clouds, or gentle water ripples. "
-            "The motion should be smooth and high-frame-rate, creating a mesmerizing, realistic effect. "
-            "Avoid jarring or artificial movements. Add ambient, realistic sounds matching the scene."
-        )
-        # Combine user prompt with the default for more guided animation
-        video_prompt = f"{user_prompt}. {default_video_prompt}" if user_prompt else default_video_prompt
-        print(f"Video generation prompt: {video_prompt}")
-        
-        operation = veo_video_client.models.generate_videos(
-            model=MODEL_ID_VIDEO,
-            prompt=video_prompt,
-            image=types.Image(gcs_uri=image_gcs_uri, mime_type="image/png"),
-            config=types.GenerateVideosConfig(
-                aspect_ratio="16:9", 
-                output_gcs_uri=output_gcs_prefix,
-                duration_seconds=8,
-                person_generation="allow_adult",
-                enhance_prompt=True,
-                generate_audio=True, # Keep it simple for now
-            ),
-        )
-
-       
-        # WARNING: This is a synchronous poll, which will block the server thread.
-        # For production, consider an asynchronous pattern (e.g., websockets or long polling).
-        timeout_seconds = 300 # 5 minutes
-        start_time = time.time()
-        while not operation.done:
-            if time.time() - start_time > timeout_seconds:
-                raise TimeoutError("Video generation timed out.")
-            time.sleep(15)
-            # You must get the operation object again to refresh its status
-            operation = veo_video_client.operations.get(operation)
-            print(operation)
-
-        print("Video generation operation complete.")
-        
-        if not operation.response or not operation.result.generated_videos:
-            raise ValueError("Veo operation completed but returned no video.")
-
-        video_gcs_uri = operation.result.generated_videos[0].video.uri
-        print(f"Video saved to GCS at: {video_gcs_uri}")
-        
-        # Convert gs:// URI to public https:// URL
-        video_blob_name = video_gcs_uri.replace(f"gs://{GCS_BUCKET_NAME}/", "")
-
-        public_video_url = f"https://storage.googleapis.com/{GCS_BUCKET_NAME}/{video_blob_name}"
-        print(f"Video generated successfully. Public URL: {public_video_url}")
+        logger.info("Step 2 & 3: Uploading image to GCS and calling Veo")
+        operation = submit_video(veo_video_client, gcs_uploader, generated_image_bytes, user_prompt)
+        public_video_url = wait_for_video(veo_video_client, gcs_uploader, operation)
+        logger.info(f"Video generated successfully. Public URL: {public_video_url}")
 
         return jsonify({"generated_video_url": public_video_url})
 
     except Exception as e:
-        print(f"An error occurred during video generation: {e}")
+        logger.exception(f"An error occurred during video generation: {e}")
         return jsonify({"error": f"Failed to generate video: {e}"}), 500
 
+@app.route('/generate/batch', methods=['POST'])
+def generate_videos_from_sketches():
+    """Batch pipeline: streams one NDJSON line per sketch as its video completes."""
+    try:
+        clients = _get_clients()
+    except RuntimeError as e:
+        return jsonify({"error": str(e)}), 500
+
+    items = (request.json or {}).get('items')
+    if not isinstance(items, list) or not items:
+        return jsonify({"error": "Request body must contain a non-empty 'items' list"}), 400
+    if len(items) > BATCH_MAX_ITEMS:
+        return jsonify({"error": f"A batch can contain at most {BATCH_MAX_ITEMS} sketches"}), 400
+    if not all(isinstance(item, dict) and item.get('image_data') for item in items):
+        return jsonify({"error": "Every item needs image_data"}), 400
+
+    def stream():
+        for event in run_batch(items, *clients):
+            yield json.dumps(event) + "\n"
+
+    return Response(stream_with_context(stream()), mimetype='application/x-ndjson')
+
 
 if __name__ == '__main__':
+    warm_up_in_background()
     app.run(debug=True, host='0.0.0.0', port=5001)
\ No newline at end of file
@@ -0,0 +1,115 @@
+"""
+Batch sketch submission for `/generate/batch`.
+
+Sketches are preprocessed, turned into images by Gemini and submitted to Veo
+on a thread pool capped at BATCH_MAX_CONCURRENCY, so at most that many Gemini
+calls run at once. Each Veo operation is started as soon as its image is
+ready; all in-flight operations are then polled together and every video is
+reported the moment it completes, rather than in submission order.
+"""
+
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from pipeline import (
+    VIDEO_POLL_SECONDS,
+    VIDEO_TIMEOUT_SECONDS,
+    VideoGenerationError,
+    generate_image,
+    poll_video,
+    save_image_locally,
+    submit_video,
+    video_url,
+)
+from sketch_preprocess import check_payload_size, preprocess_in_worker, strip_data_url
+from telemetry import logger, record_stage, request_context, span
+
+# Most sketches accepted in one batch request.
+BATCH_MAX_ITEMS = int(os.environ.get("BATCH_MAX_ITEMS", 50))
+# Gemini image generations (and Veo submissions) running at once per batch.
+BATCH_MAX_CONCURRENCY = int(os.environ.get("BATCH_MAX_CONCURRENCY", 4))
+# Largest accepted request body for a batch, in bytes.
+BATCH_MAX_BODY_BYTES = int(os.environ.get("BATCH_MAX_BODY_BYTES", 64 * 1024 * 1024))
+
+
+def _prepare_item(item: dict, gemini_image_client, veo_video_client, gcs_uploader):
+    """Runs one sketch through preprocessing, Gemini and the Veo submission."""
+    base64_data = strip_data_url(item.get('image_data') or '')
+    user_prompt = (item.get('prompt') or '').strip()
+    check_payload_size(base64_data)
+
+    with span("preprocess"):
+        sketch_png = preprocess_in_worker(base64_data)
+    image_bytes = generate_image(gemini_image_client, sketch_png, user_prompt)
+    save_image_locally(image_bytes)
+    return submit_video(veo_video_client, gcs_uploader, image_bytes, user_prompt)
+
+
+def run_batch(items, gemini_image_client, veo_video_client, gcs_uploader,
+              max_concurrency: int = BATCH_MAX_CONCURRENCY):
+    """Processes `items` and yields one event dict per state change.
+
+    Events are `{"index", "status": "video_submitted"}`, `{"index", "status":
+    "video_ready", "generated_video_url"}` or `{"index", "status": "error",
+    "error"}`, followed by a final `{"status": "done", "succeeded", "failed"}`.
+    """
+    succeeded = failed = 0
+    executor = ThreadPoolExecutor(
+        max_workers=max(1, min(max_concurrency, len(items))), thread_name_prefix="batch"
+    )
+    try:
+        # request_context() carries the request ID into the worker threads' logs
+        image_futures = {
+            executor.submit(request_context().run, _prepare_item, item,
+                            gemini_image_client, veo_video_client, gcs_uploader): index
+            for index, item in enumerate(items)
+        }
+        in_flight = {}  # index -> (operation, submitted_at)
+        next_poll = time.monotonic() + VIDEO_POLL_SECONDS
+
+        while image_futures or in_flight:
+            poll_wait = max(0.0, next_poll - time.monotonic()) if in_flight else None
+            if image_futures:
+                done, _ = wait(image_futures, timeout=poll_wait, return_when=FIRST_COMPLETED)
+                for future in done:
+                    index = image_futures.pop(future)
+                    try:
+                        in_flight[index] = (future.result(), time.monotonic())
+                        yield {"index": index, "status": "video_submitted"}
+                    except Exception as e:
+                        logger.warning(f"Batch item {index} failed before Veo: {e}")
+                        failed += 1
+                        yield {"index": index, "status": "error", "error": str(e)}
+            else:
+                time.sleep(poll_wait)
+
+            if not in_flight or time.monotonic() < next_poll:
+                continue
+            for index, (operation, submitted_at) in list(in_flight.items()):
+                try:
+                    if not operation.done:
+                        operation = poll_video(veo_video_client, operation)
+                    waited = time.monotonic() - submitted_at
+                    if operation.done:
+                        del in_flight[index]
+                        record_stage("veo_wait", waited)
+                        url = video_url(gcs_uploader, operation)
+                        succeeded += 1
+                        yield {"index": index, "status": "video_ready", "generated_video_url": url}
+                    elif waited > VIDEO_TIMEOUT_SECONDS:
+                        del in_flight[index]
+                        raise VideoGenerationError("Video generation timed out.")
+                    else:
+                        in_flight[index] = (operation, submitted_at)
+                except Exception as e:
+                    in_flight.pop(index, None)
+                    logger.warning(f"Batch item {index} failed in Veo: {e}")
+                    failed += 1
+                    yield {"index": index, "status": "error", "error": str(e)}
+            next_poll = time.monotonic() + VIDEO_POLL_SECONDS
+    finally:
+        # Stops queued items if the client disconnects mid-stream
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    yield {"status": "done", "succeeded": succeeded, "failed": failed}
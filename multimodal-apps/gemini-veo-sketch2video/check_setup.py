@@ -2,17 +2,35 @@
 """
 Setup verification script for Gemini Veo Sketch2Video application.
 Run this script to check if your environment is configured correctly.
+
+The checks are independent, so they run concurrently. Passing results are
+cached in a local file for a short TTL, which lets deploy health gates call
+this script repeatedly without paying for imports and network round-trips.
+
+Usage:
+    python check_setup.py            # human-readable report
+    python check_setup.py --json     # machine-readable report
+    python check_setup.py --no-cache # ignore and refresh the cache
 """
 
+import argparse
+import hashlib
+import importlib.util
+import json
 import os
 import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 
-def check_environment_variables():
+CACHE_FILE = '.check_setup_cache.json'
+DEFAULT_CACHE_TTL_SECONDS = 60
+
+REQUIRED_ENV_VARS = ['GOOGLE_API_KEY', 'PROJECT_ID', 'GCS_BUCKET_NAME', 'GOOGLE_CLOUD_REGION']
+
+def check_environment_variables(report):
     """Check if all required environment variables are set."""
-    print("🔍 Checking environment variables...")
-    
-    load_dotenv('.env')
+    report.append("🔍 Checking environment variables...")
     
     required_vars = {
         'GOOGLE_API_KEY': 'Google API Key for Gemini',
@@ -31,21 +49,21 @@ def check_environment_variables():
                 display_value = f"{value[:8]}...{value[-4:]}" if len(value) > 12 else "***"
             else:
                 display_value = value
-            print(f"✅ {var}: {display_value}")
+            report.append(f"✅ {var}: {display_value}")
         else:
-            print(f"❌ {var}: NOT SET ({description})")
+            report.append(f"❌ {var}: NOT SET ({description})")
             missing_vars.append(var)
     
     if missing_vars:
-        print(f"\n❌ Missing environment variables: {', '.join(missing_vars)}")
+        report.append(f"❌ Missing environment variables: {', '.join(missing_vars)}")
         return False
     else:
-        print("✅ All environment variables are set!")
+        report.append("✅ All environment variables are set!")
         return True
 
-def check_dependencies():
+def check_dependencies(report):
     """Check if all required Python packages are installed."""
-    print("\n🔍 Checking Python dependencies...")
+    report.append("🔍 Checking Python dependencies...")
     
     required_packages = [
         'flask',
@@ -59,33 +77,28 @@ def check_dependencies():
     missing_packages = []
     
     for package in required_packages:
+        # find_spec locates the package without paying its import cost
         try:
-            if package == 'google.genai':
-                from google import genai
-            elif package == 'google.cloud.storage':
-                from google.cloud import storage
-            elif package == 'dotenv':
-                from dotenv import load_dotenv
-            elif package == 'PIL':
-                import PIL
-            else:
-                __import__(package)
-            print(f"✅ {package}: Installed")
+            installed = importlib.util.find_spec(package) is not None
         except ImportError:
-            print(f"❌ {package}: NOT INSTALLED")
+            installed = False
+        if installed:
+            report.append(f"✅ {package}: Installed")
+        else:
+            report.append(f"❌ {package}: NOT INSTALLED")
             missing_packages.append(package)
     
     if missing_packages:
-        print(f"\n❌ Missing packages: {', '.join(missing_packages)}")
-        print("💡 Run: pip install -r requirements.txt")
+        report.append(f"❌ Missing packages: {', '.join(missing_packages)}")
+        report.append("💡 Run: pip install -r requirements.txt")
         return False
     else:
-        print("✅ All dependencies are installed!")
+        report.append("✅ All dependencies are installed!")
         return True
 
-def check_google_cloud_connectivity():
+def check_google_cloud_connectivity(report):
     """Test Google Cloud connectivity."""
-    print("\n🔍 Testing Google Cloud connectivity...")
+    report.append("🔍 Testing Google Cloud connectivity...")
     
     try:
         from google import genai
@@ -96,9 +109,9 @@ def check_google_cloud_connectivity():
         if api_key:
             try:
                 client = genai.Client(api_key=api_key)
-                print("✅ Google API Key authentication: SUCCESS")
+                report.append("✅ Google API Key authentication: SUCCESS")
             except Exception as e:
-                print(f"❌ Google API Key authentication: FAILED ({e})")
+                report.append(f"❌ Google API Key authentication: FAILED ({e})")
                 return False
         
         # Test Google Cloud Storage
@@ -112,27 +125,31 @@ def check_google_cloud_connectivity():
                 
                 # Check if bucket exists
                 if bucket.exists():
-                    print(f"✅ GCS Bucket '{bucket_name}': EXISTS and ACCESSIBLE")
+                    report.append(f"✅ GCS Bucket '{bucket_name}': EXISTS and ACCESSIBLE")
                 else:
-                    print(f"❌ GCS Bucket '{bucket_name}': NOT FOUND")
+                    report.append(f"❌ GCS Bucket '{bucket_name}': NOT FOUND")
                     return False
             except Exception as e:
-                print(f"❌ GCS connectivity: FAILED ({e})")
-                print("💡 Make sure you have proper authentication set up")
+                report.append(f"❌ GCS connectivity: FAILED ({e})")
+                report.append("💡 Make sure you have proper authentication set up")
                 return False
         
         return True
         
     except ImportError as e:
-        print(f"❌ Import error: {e}")
+        report.append(f"❌ Import error: {e}")
         return False
 
-def check_file_structure():
+def check_file_structure(report):
     """Check if required files and directories exist."""
-    print("\n🔍 Checking file structure...")
+    report.append("🔍 Checking file structure...")
     
     required_files = [
         'app.py',
+        'batch.py',
+        'clients.py',
+        'pipeline.py',
+        'sketch_preprocess.py',
         'requirements.txt',
         'templates/index.html',
         'static/style.css',
@@ -143,49 +160,133 @@ def check_file_structure():
     
     for file_path in required_files:
         if os.path.exists(file_path):
-            print(f"✅ {file_path}: EXISTS")
+            report.append(f"✅ {file_path}: EXISTS")
         else:
-            print(f"❌ {file_path}: MISSING")
+            report.append(f"❌ {file_path}: MISSING")
             missing_files.append(file_path)
     
     # Check if static/generated_images directory exists or can be created
     static_dir = 'static/generated_images'
     try:
         os.makedirs(static_dir, exist_ok=True)
-        print(f"✅ {static_dir}: EXISTS/CREATED")
+        report.append(f"✅ {static_dir}: EXISTS/CREATED")
     except Exception as e:
-        print(f"❌ {static_dir}: CANNOT CREATE ({e})")
+        report.append(f"❌ {static_dir}: CANNOT CREATE ({e})")
         missing_files.append(static_dir)
     
     if missing_files:
-        print(f"\n❌ Missing files/directories: {', '.join(missing_files)}")
+        report.append(f"❌ Missing files/directories: {', '.join(missing_files)}")
         return False
     else:
-        print("✅ All required files exist!")
+        report.append("✅ All required files exist!")
         return True
 
+CHECKS = [
+    ("Environment Variables", check_environment_variables),
+    ("Python Dependencies", check_dependencies),
+    ("File Structure", check_file_structure),
+    ("Google Cloud Connectivity", check_google_cloud_connectivity),
+]
+
+def _environment_fingerprint():
+    """Hash of the inputs the checks depend on; a change invalidates the cache."""
+    state = [os.environ.get(var, '') for var in REQUIRED_ENV_VARS]
+    for path in ['requirements.txt', '.env']:
+        state.append(str(os.path.getmtime(path)) if os.path.exists(path) else '')
+    state.append(sys.executable)
+    return hashlib.sha256('|'.join(state).encode()).hexdigest()
+
+def load_cache(fingerprint, ttl):
+    """Return cached passing results that are still fresh for this environment."""
+    try:
+        with open(CACHE_FILE) as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if cache.get('fingerprint') != fingerprint:
+        return {}
+    now = time.time()
+    return {
+        name: result for name, result in cache.get('results', {}).items()
+        if now - result.get('checked_at', 0) <= ttl
+    }
+
+def save_cache(fingerprint, results):
+    """Persist passing results; failures are always re-checked."""
+    passed = {name: result for name, result in results.items() if result['passed']}
+    try:
+        with open(CACHE_FILE, 'w') as f:
+            json.dump({'fingerprint': fingerprint, 'results': passed}, f, indent=2)
+    except OSError:
+        pass
+
+def run_check(check_function):
+    """Run one check, capturing its report lines and duration."""
+    report = []
+    started = time.perf_counter()
+    try:
+        passed = bool(check_function(report))
+    except Exception as e:
+        report.append(f"❌ ERROR ({e})")
+        passed = False
+    return {
+        'passed': passed,
+        'messages': report,
+        'duration_ms': round((time.perf_counter() - started) * 1000, 1),
+        'checked_at': time.time(),
+    }
+
+def run_checks(use_cache=True, ttl=DEFAULT_CACHE_TTL_SECONDS):
+    """Run all checks concurrently, reusing fresh cached results."""
+    fingerprint = _environment_fingerprint()
+    cached = load_cache(fingerprint, ttl) if use_cache else {}
+    pending = [(name, fn) for name, fn in CHECKS if name not in cached]
+
+    results = {name: dict(result, cached=True) for name, result in cached.items()}
+    if pending:
+        with ThreadPoolExecutor(max_workers=len(pending)) as executor:
+            futures = {name: executor.submit(run_check, fn) for name, fn in pending}
+            for name, future in futures.items():
+                results[name] = dict(future.result(), cached=False)
+        save_cache(fingerprint, results)
+
+    # Keep the report in the declared order
+    return {name: results[name] for name, _ in CHECKS}
+
 def main():
     """Run all checks."""
+    parser = argparse.ArgumentParser(description="Verify the Sketch2Video setup.")
+    parser.add_argument('--json', action='store_true', help="print a machine-readable JSON report")
+    parser.add_argument('--no-cache', action='store_true', help="ignore cached results and re-run every check")
+    parser.add_argument('--ttl', type=float, default=DEFAULT_CACHE_TTL_SECONDS,
+                        help=f"seconds a passing result stays cached (default {DEFAULT_CACHE_TTL_SECONDS})")
+    args = parser.parse_args()
+
+    load_dotenv('.env')
+    started = time.perf_counter()
+    results = run_checks(use_cache=not args.no_cache, ttl=args.ttl)
+    all_passed = all(result['passed'] for result in results.values())
+
+    if args.json:
+        print(json.dumps({
+            'passed': all_passed,
+            'duration_ms': round((time.perf_counter() - started) * 1000, 1),
+            'checks': {
+                name: {key: result[key] for key in ('passed', 'cached', 'duration_ms', 'messages')}
+                for name, result in results.items()
+            },
+        }, indent=2))
+        sys.exit(0 if all_passed else 1)
+
     print("🚀 Gemini Veo Sketch2Video Setup Verification")
     print("=" * 50)
     
-    checks = [
-        ("Environment Variables", check_environment_variables),
-        ("Python Dependencies", check_dependencies),
-        ("File Structure", check_file_structure),
-        ("Google Cloud Connectivity", check_google_cloud_connectivity),
-    ]
-    
-    all_passed = True
-    
-    for check_name, check_function in checks:
-        try:
-            result = check_function()
-            if not result:
-                all_passed = False
-        except Exception as e:
-            print(f"❌ {check_name}: ERROR ({e})")
-            all_passed = False
+    for check_name, result in results.items():
+        print()
+        for line in result['messages']:
+            print(line)
+        if result['cached']:
+            print(f"♻️  {check_name}: cached result")
     
     print("\n" + "=" * 50)
     if all_passed:
@@ -197,4 +298,4 @@ def main():
         sys.exit(1)
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main()
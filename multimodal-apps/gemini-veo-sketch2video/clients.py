@@ -0,0 +1,126 @@
+"""
+Lazily constructed API clients for the Sketch2Video app.
+
+Nothing here talks to Google (or even imports the Google SDKs) at import
+time, so `app.py` imports quickly and without credentials. Each client is
+built once per process on first use, behind a lock so concurrent requests
+share a single instance. `warm_up()` builds them ahead of the first request;
+the gunicorn config calls it in a background thread after each worker forks.
+"""
+
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# "gcs" for Google Cloud Storage, "fake" for the in-process stand-in (offline runs/benchmarks)
+GCS_BACKEND = os.environ.get("GCS_BACKEND", "gcs")
+
+
+class MissingConfigError(RuntimeError):
+    """Raised when a client is requested but its environment variables are unset."""
+
+
+def _require_env(*names: str) -> None:
+    missing = [name for name in names if not os.environ.get(name)]
+    if missing:
+        raise MissingConfigError(
+            f"Missing required environment variables: {', '.join(missing)}. Check your .env file."
+        )
+
+
+_clients = {}
+# Re-entrant: the uploader factory itself asks for the GCS client
+_clients_lock = threading.RLock()
+
+
+def _get_or_create(name: str, factory):
+    """Returns the cached client `name`, building it with `factory` on first use."""
+    client = _clients.get(name)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(name)
+            if client is None:
+                started = time.perf_counter()
+                client = factory()
+                _clients[name] = client
+                logger.info("Initialized %s in %.2fs", name, time.perf_counter() - started)
+    return client
+
+
+def _build_gemini_image_client():
+    _require_env("GOOGLE_API_KEY")
+    from google import genai
+    return genai.Client(api_key=os.environ["GOOGLE_API_KEY"])
+
+
+def _build_veo_video_client():
+    _require_env("PROJECT_ID")
+    from google import genai
+    return genai.Client(
+        vertexai=True,
+        project=os.environ["PROJECT_ID"],
+        location=os.environ.get("GOOGLE_CLOUD_REGION", "us-central1"),
+    )
+
+
+def _build_gcs_client():
+    _require_env("PROJECT_ID")
+    if GCS_BACKEND == "fake":
+        from fake_gcs import FakeGCSClient
+        return FakeGCSClient(project=os.environ["PROJECT_ID"])
+    from google.cloud import storage
+    return storage.Client(project=os.environ["PROJECT_ID"])
+
+
+def _build_gcs_uploader():
+    _require_env("GCS_BUCKET_NAME")
+    from gcs_uploader import GCSUploader
+    return GCSUploader(get_gcs_client(), os.environ["GCS_BUCKET_NAME"])
+
+
+def get_gemini_image_client():
+    """Client for Gemini image generation (Google AI API key)."""
+    return _get_or_create("gemini_image_client", _build_gemini_image_client)
+
+
+def get_veo_video_client():
+    """Client for Veo video generation (Vertex AI)."""
+    return _get_or_create("veo_video_client", _build_veo_video_client)
+
+
+def get_gcs_client():
+    """Google Cloud Storage client, or the fake one when GCS_BACKEND=fake."""
+    return _get_or_create("gcs_client", _build_gcs_client)
+
+
+def get_gcs_uploader():
+    """Uploader bound to GCS_BUCKET_NAME; caches the bucket handle."""
+    return _get_or_create("gcs_uploader", _build_gcs_uploader)
+
+
+def warm_up() -> dict:
+    """Builds every client now; returns seconds spent per client (None on failure)."""
+    timings = {}
+    for name, getter in [
+        ("gemini_image_client", get_gemini_image_client),
+        ("veo_video_client", get_veo_video_client),
+        ("gcs_uploader", get_gcs_uploader),
+    ]:
+        started = time.perf_counter()
+        try:
+            getter()
+            timings[name] = time.perf_counter() - started
+        except Exception as e:
+            logger.warning("Could not warm up %s: %s", name, e)
+            timings[name] = None
+    return timings
+
+
+def warm_up_in_background() -> threading.Thread:
+    """Starts warm_up() on a daemon thread so startup is not blocked."""
+    thread = threading.Thread(target=warm_up, name="client-warm-up", daemon=True)
+    thread.start()
+    return thread
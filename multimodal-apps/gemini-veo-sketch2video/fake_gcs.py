@@ -0,0 +1,124 @@
+"""
+In-process stand-in for `google.cloud.storage.Client`.
+
+Implements just the surface the Sketch2Video pipeline uses (bucket and blob
+handles, `upload_from_string`, `open('wb')`, `exists`, `download_as_bytes`)
+and keeps objects in memory. Optional latency and bandwidth settings make
+upload timings realistic enough to benchmark the pipeline offline.
+
+Enable it with `GCS_BACKEND=fake` in `.env`.
+"""
+
+import io
+import os
+import threading
+import time
+
+# Simulated per-request latency and upload bandwidth (0 = unlimited).
+FAKE_GCS_LATENCY_MS = float(os.environ.get("FAKE_GCS_LATENCY_MS", 0))
+FAKE_GCS_BYTES_PER_SECOND = float(os.environ.get("FAKE_GCS_BYTES_PER_SECOND", 0))
+
+
+class FakeGCSClient:
+    """Holds every bucket's objects in a dict keyed by (bucket, blob name)."""
+
+    def __init__(self, project=None,
+                 latency_ms: float = FAKE_GCS_LATENCY_MS,
+                 bytes_per_second: float = FAKE_GCS_BYTES_PER_SECOND):
+        self.project = project
+        self.latency_ms = latency_ms
+        self.bytes_per_second = bytes_per_second
+        self.objects = {}
+        self.request_count = 0
+        self._lock = threading.Lock()
+
+    def bucket(self, bucket_name: str) -> "FakeBucket":
+        return FakeBucket(self, bucket_name)
+
+    def _simulate_request(self, num_bytes: int = 0):
+        """Sleeps for the configured round-trip and transfer time."""
+        with self._lock:
+            self.request_count += 1
+        delay = self.latency_ms / 1000
+        if self.bytes_per_second:
+            delay += num_bytes / self.bytes_per_second
+        if delay:
+            time.sleep(delay)
+
+    def _store(self, bucket_name: str, blob_name: str, data: bytes, content_type: str):
+        with self._lock:
+            self.objects[(bucket_name, blob_name)] = (bytes(data), content_type)
+
+
+class FakeBucket:
+    def __init__(self, client: FakeGCSClient, name: str):
+        self.client = client
+        self.name = name
+
+    def blob(self, blob_name: str, chunk_size=None) -> "FakeBlob":
+        return FakeBlob(self, blob_name, chunk_size)
+
+    def exists(self) -> bool:
+        return True
+
+
+class FakeBlob:
+    def __init__(self, bucket: FakeBucket, name: str, chunk_size=None):
+        self.bucket = bucket
+        self.name = name
+        self.chunk_size = chunk_size
+        self.content_type = None
+
+    def upload_from_string(self, data, content_type: str = 'text/plain'):
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+        self.bucket.client._simulate_request(len(data))
+        self.content_type = content_type
+        self.bucket.client._store(self.bucket.name, self.name, data, content_type)
+
+    def open(self, mode: str = 'wb', chunk_size=None, content_type: str = 'application/octet-stream', **kwargs):
+        if mode != 'wb':
+            raise ValueError("FakeBlob.open only supports mode 'wb'.")
+        return _FakeBlobWriter(self, chunk_size or self.chunk_size or 40 * 256 * 1024, content_type)
+
+    def exists(self) -> bool:
+        return (self.bucket.name, self.name) in self.bucket.client.objects
+
+    def download_as_bytes(self) -> bytes:
+        self.bucket.client._simulate_request()
+        return self.bucket.client.objects[(self.bucket.name, self.name)][0]
+
+
+class _FakeBlobWriter(io.RawIOBase):
+    """Mimics a resumable upload: one request per chunk, committed on close."""
+
+    def __init__(self, blob: FakeBlob, chunk_size: int, content_type: str):
+        self._blob = blob
+        self._chunk_size = chunk_size
+        self._content_type = content_type
+        self._buffer = bytearray()
+        self._uploaded = bytearray()
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._buffer.extend(data)
+        while len(self._buffer) >= self._chunk_size:
+            self._send_chunk(self._buffer[:self._chunk_size])
+            del self._buffer[:self._chunk_size]
+        return len(data)
+
+    def close(self):
+        if not self.closed:
+            if self._buffer:
+                self._send_chunk(self._buffer)
+                self._buffer.clear()
+            self._blob.content_type = self._content_type
+            client = self._blob.bucket.client
+            client._store(self._blob.bucket.name, self._blob.name, self._uploaded, self._content_type)
+        super().close()
+
+    def _send_chunk(self, chunk):
+        self._blob.bucket.client._simulate_request(len(chunk))
+        self._uploaded.extend(chunk)
@@ -0,0 +1,69 @@
+"""
+Google Cloud Storage upload helpers for the Sketch2Video pipeline.
+
+`GCSUploader` keeps one bucket handle for the life of the process, switches
+to chunked resumable uploads for large images and can upload in the
+background so the request thread keeps preparing the Veo call meanwhile.
+"""
+
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+# Images at least this large are sent as chunked resumable uploads.
+RESUMABLE_THRESHOLD_BYTES = int(os.environ.get("GCS_RESUMABLE_THRESHOLD_BYTES", 4 * 1024 * 1024))
+# Chunk size for resumable uploads; GCS requires a multiple of 256 KB.
+RESUMABLE_CHUNK_SIZE = int(os.environ.get("GCS_CHUNK_SIZE_BYTES", 1024 * 1024))
+# Threads used for background uploads.
+UPLOAD_THREADS = int(os.environ.get("GCS_UPLOAD_THREADS", 4))
+
+
+class GCSUploader:
+    """Uploads bytes to a single bucket, reusing the bucket handle."""
+
+    def __init__(self, client, bucket_name: str,
+                 resumable_threshold: int = RESUMABLE_THRESHOLD_BYTES,
+                 chunk_size: int = RESUMABLE_CHUNK_SIZE,
+                 max_workers: int = UPLOAD_THREADS):
+        if chunk_size % (256 * 1024):
+            raise ValueError("chunk_size must be a multiple of 256 KB.")
+        self.bucket_name = bucket_name
+        self.resumable_threshold = resumable_threshold
+        self.chunk_size = chunk_size
+        self.max_workers = max_workers
+        # `client.bucket()` only builds a handle, it does not call the API.
+        self._bucket = client.bucket(bucket_name)
+        self._executor = None
+        self._executor_lock = threading.Lock()
+
+    def gcs_uri(self, blob_name: str) -> str:
+        """Returns the gs:// URI of a blob in this bucket."""
+        return f"gs://{self.bucket_name}/{blob_name}"
+
+    def public_url(self, blob_name: str) -> str:
+        """Returns the public https:// URL of a blob in this bucket."""
+        return f"https://storage.googleapis.com/{self.bucket_name}/{blob_name}"
+
+    def upload(self, data: bytes, blob_name: str, content_type: str = 'image/png') -> str:
+        """Uploads bytes and returns the GCS URI."""
+        blob = self._bucket.blob(blob_name)
+        if len(data) >= self.resumable_threshold:
+            # BlobWriter always uses a resumable session, sent chunk by chunk.
+            with blob.open('wb', chunk_size=self.chunk_size, content_type=content_type) as writer:
+                writer.write(data)
+        else:
+            blob.upload_from_string(data, content_type=content_type)
+        return self.gcs_uri(blob_name)
+
+    def upload_async(self, data: bytes, blob_name: str, content_type: str = 'image/png') -> Future:
+        """Starts an upload in the background; the future resolves to the GCS URI."""
+        return self._get_executor().submit(self.upload, data, blob_name, content_type)
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            with self._executor_lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.max_workers, thread_name_prefix="gcs-upload"
+                    )
+        return self._executor
@@ -0,0 +1,21 @@
+"""
+Gunicorn settings for the Sketch2Video app.
+
+Run with: gunicorn app:app
+(gunicorn picks this file up automatically from the working directory)
+"""
+
+import os
+
+bind = os.environ.get("GUNICORN_BIND", "0.0.0.0:5001")
+workers = int(os.environ.get("GUNICORN_WORKERS", 2))
+threads = int(os.environ.get("GUNICORN_THREADS", 8))
+# Veo polling keeps a request open for minutes
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", 360))
+
+
+def post_fork(server, worker):
+    """Builds the API clients in the background so the worker starts serving right away."""
+    if os.environ.get("WARM_UP_CLIENTS", "1") != "0":
+        from clients import warm_up_in_background
+        warm_up_in_background()
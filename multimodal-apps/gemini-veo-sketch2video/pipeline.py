@@ -0,0 +1,159 @@
+"""
+Sketch -> image -> video pipeline steps shared by `/generate` and `/generate/batch`.
+
+Each step is timed with a telemetry span. The Veo step is split into
+`submit_video` (upload + start the long-running operation) and
+`wait_for_video` / `poll_video` so the batch endpoint can keep many
+operations in flight and report each one as soon as it finishes.
+"""
+
+import io
+import os
+import time
+import uuid
+
+import PIL.Image
+
+from telemetry import future_span, logger, span
+
+LOCAL_IMAGE_DIR = os.path.join('static', 'generated_images')
+
+MODEL_ID_IMAGE = 'gemini-2.0-flash-exp-image-generation'
+MODEL_ID_VIDEO = "veo-3.0-generate-preview" # Your Veo model ID
+
+VIDEO_TIMEOUT_SECONDS = 300 # 5 minutes
+VIDEO_POLL_SECONDS = 15
+
+# Enhanced default prompt for photorealistic images
+DEFAULT_IMAGE_PROMPT = (
+    "Transform this sketch into a breathtaking, photorealistic masterpiece. "
+    "The final image should look like a high-resolution photograph captured on a professional "
+    "DSLR camera with a 50mm f/1.8 prime lens. Emphasize hyper-realistic textures, "
+    "intricate details, and natural, soft lighting that casts gentle shadows. "
+    "The scene should have a cinematic quality with a shallow depth of field, making the subject pop."
+)
+
+# Enhanced default prompt for cinematic video generation
+DEFAULT_VIDEO_PROMPT = (
+    "Animate this image with ultra-realistic, subtle motion, like a living photograph or cinemagraph. "
+    "Introduce gentle, natural movements: a soft breeze, slow-drifting clouds, or gentle water ripples. "
+    "The motion should be smooth and high-frame-rate, creating a mesmerizing, realistic effect. "
+    "Avoid jarring or artificial movements. Add ambient, realistic sounds matching the scene."
+)
+
+
+class VideoGenerationError(RuntimeError):
+    """Raised when Veo fails, times out or returns no video."""
+
+
+def _combine_prompt(user_prompt: str, default_prompt: str) -> str:
+    # Combine user prompt with the default for a more guided generation
+    return f"{user_prompt}. {default_prompt}" if user_prompt else default_prompt
+
+
+def generate_image(gemini_image_client, sketch_png: bytes, user_prompt: str) -> bytes:
+    """Step 1: turns the preprocessed sketch into a photorealistic image with Gemini."""
+    from google.genai import types
+
+    sketch_pil_image = PIL.Image.open(io.BytesIO(sketch_png))
+    prompt_text = _combine_prompt(user_prompt, DEFAULT_IMAGE_PROMPT)
+
+    with span("image_generation"):
+        response = gemini_image_client.models.generate_content(
+            model=MODEL_ID_IMAGE,
+            contents=[prompt_text, sketch_pil_image],
+            config=types.GenerateContentConfig(response_modalities=['TEXT', 'IMAGE'])
+        )
+
+    if not response.candidates:
+        raise ValueError("Gemini image generation returned no candidates.")
+
+    for part in response.candidates[0].content.parts:
+        if part.inline_data and part.inline_data.mime_type.startswith('image/'):
+            logger.info("Image generated successfully.")
+            return part.inline_data.data
+
+    raise ValueError("Gemini did not return an image in the response.")
+
+
+def save_image_locally(image_bytes: bytes) -> None:
+    """Keeps a local copy of the generated image; failures are only logged."""
+    try:
+        # Use a unique filename to prevent overwrites
+        local_filename = f"generated-image-{uuid.uuid4()}.png"
+        local_image_path = os.path.join(LOCAL_IMAGE_DIR, local_filename)
+        with span("local_save"), open(local_image_path, "wb") as f:
+            f.write(image_bytes)
+        logger.info(f"Image also saved locally to: {local_image_path}")
+    except Exception as e:
+        # This is not a critical error, so we just log a warning and continue.
+        logger.warning(f"Could not save image locally: {e}")
+
+
+def submit_video(veo_video_client, gcs_uploader, image_bytes: bytes, user_prompt: str):
+    """Steps 2 & 3: uploads the image to GCS and starts the Veo operation."""
+    from google.genai import types
+
+    image_blob_name = f"images/generated-image-{uuid.uuid4()}.png"
+    output_gcs_prefix = gcs_uploader.gcs_uri("videos/") # Folder for video outputs
+
+    # Upload in the background while the video prompt is prepared
+    upload_future = gcs_uploader.upload_async(image_bytes, image_blob_name)
+    future_span("gcs_upload", upload_future)
+
+    video_prompt = _combine_prompt(user_prompt, DEFAULT_VIDEO_PROMPT)
+    logger.info(f"Video generation prompt: {video_prompt}")
+
+    image_gcs_uri = upload_future.result()
+    logger.info(f"Image successfully uploaded to {image_gcs_uri}")
+
+    with span("veo_submit"):
+        return veo_video_client.models.generate_videos(
+            model=MODEL_ID_VIDEO,
+            prompt=video_prompt,
+            image=types.Image(gcs_uri=image_gcs_uri, mime_type="image/png"),
+            config=types.GenerateVideosConfig(
+                aspect_ratio="16:9",
+                output_gcs_uri=output_gcs_prefix,
+                duration_seconds=8,
+                person_generation="allow_adult",
+                enhance_prompt=True,
+                generate_audio=True, # Keep it simple for now
+            ),
+        )
+
+
+def poll_video(veo_video_client, operation):
+    """Refreshes a Veo operation's status (the operation object must be fetched again)."""
+    operation = veo_video_client.operations.get(operation)
+    logger.debug(operation)
+    return operation
+
+
+def video_url(gcs_uploader, operation) -> str:
+    """Returns the public URL of a finished Veo operation's video."""
+    if not operation.response or not operation.result.generated_videos:
+        raise VideoGenerationError("Veo operation completed but returned no video.")
+
+    video_gcs_uri = operation.result.generated_videos[0].video.uri
+    logger.info(f"Video saved to GCS at: {video_gcs_uri}")
+
+    # Convert gs:// URI to public https:// URL
+    video_blob_name = video_gcs_uri.replace(gcs_uploader.gcs_uri(""), "")
+    return gcs_uploader.public_url(video_blob_name)
+
+
+def wait_for_video(veo_video_client, gcs_uploader, operation) -> str:
+    """Blocks until the Veo operation finishes and returns the video's public URL."""
+    # WARNING: This is a synchronous poll, which will block the server thread.
+    # For many sketches at once, use /generate/batch instead.
+    start_time = time.time()
+    with span("veo_wait"):
+        while not operation.done:
+            if time.time() - start_time > VIDEO_TIMEOUT_SECONDS:
+                raise VideoGenerationError("Video generation timed out.")
+            time.sleep(VIDEO_POLL_SECONDS)
+            operation = poll_video(veo_video_client, operation)
+
+    logger.info("Video generation operation complete.")
+    return video_url(gcs_uploader, operation)
@@ -0,0 +1,163 @@
+"""
+Sketch preprocessing for the Sketch2Video pipeline.
+
+The browser posts the full-resolution canvas as a base64 PNG. Before it goes
+to Gemini we crop the empty canvas margins, downscale it to a bounded size
+and quantize line art to a small palette, so both the upload to Gemini and
+the model's input shrink. The CPU-bound work runs in a worker process so it
+never holds up the request thread's GIL.
+"""
+
+import base64
+import binascii
+import io
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+
+import PIL.Image
+
+# --- Configuration ---
+# Largest decoded sketch we accept, in bytes.
+MAX_PAYLOAD_BYTES = int(os.environ.get("SKETCH_MAX_PAYLOAD_BYTES", 8 * 1024 * 1024))
+# Longest side (in pixels) of the image sent to Gemini.
+MAX_SIDE = int(os.environ.get("SKETCH_MAX_SIDE", 768))
+# Palette size used for line art; 0 disables quantization.
+PALETTE_COLORS = int(os.environ.get("SKETCH_PALETTE_COLORS", 8))
+# Blank border (in pixels) kept around the drawing after cropping.
+CROP_PADDING = int(os.environ.get("SKETCH_CROP_PADDING", 16))
+# Number of worker processes used for preprocessing.
+WORKER_PROCESSES = int(os.environ.get("SKETCH_PREPROCESS_WORKERS", 2))
+WORKER_TIMEOUT_SECONDS = 30
+
+# Grayscale level at or above which a pixel counts as empty canvas.
+BACKGROUND_LEVEL = 245
+# Share of background pixels above which an image is treated as line art
+# (photos and uploaded pictures are never quantized).
+LINE_ART_MIN_BACKGROUND = 0.5
+
+
+class SketchPayloadError(ValueError):
+    """Raised when the posted sketch cannot be decoded as an image."""
+
+
+class SketchTooLargeError(SketchPayloadError):
+    """Raised when the posted sketch exceeds MAX_PAYLOAD_BYTES."""
+
+
+def strip_data_url(base64_image_data: str) -> str:
+    """Removes a `data:image/...;base64,` prefix if the client sent one."""
+    if ',' in base64_image_data:
+        return base64_image_data.split(',', 1)[1]
+    return base64_image_data
+
+
+def check_payload_size(base64_data: str, max_bytes: int = MAX_PAYLOAD_BYTES) -> None:
+    """Rejects oversized payloads from the base64 length, without decoding them."""
+    decoded_size = (len(base64_data) * 3) // 4
+    if decoded_size > max_bytes:
+        raise SketchTooLargeError(
+            f"Sketch is too large ({decoded_size // 1024} KB, limit {max_bytes // 1024} KB)."
+        )
+
+
+def _flatten_on_white(image: PIL.Image.Image) -> PIL.Image.Image:
+    """Composites transparent pixels (left behind by the eraser) onto white."""
+    if image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info):
+        rgba = image.convert('RGBA')
+        background = PIL.Image.new('RGBA', rgba.size, (255, 255, 255, 255))
+        return PIL.Image.alpha_composite(background, rgba).convert('RGB')
+    return image.convert('RGB')
+
+
+def _crop_margins(image: PIL.Image.Image, padding: int) -> PIL.Image.Image:
+    """Crops the empty canvas around the drawing, keeping a small border."""
+    ink = image.convert('L').point(lambda level: 255 if level < BACKGROUND_LEVEL else 0)
+    bbox = ink.getbbox()
+    if not bbox:
+        return image
+    left, top, right, bottom = bbox
+    width, height = image.size
+    return image.crop((
+        max(left - padding, 0),
+        max(top - padding, 0),
+        min(right + padding, width),
+        min(bottom + padding, height),
+    ))
+
+
+def _is_line_art(image: PIL.Image.Image) -> bool:
+    """Returns True when most of the image is empty canvas."""
+    histogram = image.convert('L').histogram()
+    background = sum(histogram[BACKGROUND_LEVEL:])
+    total = image.size[0] * image.size[1]
+    return total > 0 and background / total >= LINE_ART_MIN_BACKGROUND
+
+
+def preprocess_sketch(base64_data: str,
+                      max_side: int = MAX_SIDE,
+                      palette_colors: int = PALETTE_COLORS,
+                      crop_padding: int = CROP_PADDING) -> bytes:
+    """Decodes, crops, downscales and quantizes a sketch; returns PNG bytes."""
+    try:
+        image_bytes = base64.b64decode(base64_data, validate=True)
+        image = PIL.Image.open(io.BytesIO(image_bytes))
+        image.load()
+    except (binascii.Error, ValueError, OSError, PIL.Image.DecompressionBombError) as e:
+        # DecompressionBombError: a small upload that would decode to a huge image
+        raise SketchPayloadError(f"Could not decode sketch image: {e}") from e
+
+    image = _flatten_on_white(image)
+    image = _crop_margins(image, crop_padding)
+    if max(image.size) > max_side:
+        image.thumbnail((max_side, max_side), PIL.Image.Resampling.LANCZOS)
+    if palette_colors and _is_line_art(image):
+        image = image.quantize(colors=palette_colors, dither=PIL.Image.Dither.NONE)
+
+    output = io.BytesIO()
+    image.save(output, format='PNG', optimize=True)
+    return output.getvalue()
+
+
+# --- Worker pool ---
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    """Creates the worker pool on first use (after gunicorn has forked)."""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ProcessPoolExecutor(max_workers=WORKER_PROCESSES)
+    return _executor
+
+
+def _discard_executor(executor: ProcessPoolExecutor) -> None:
+    """Drops a broken worker pool, so the next request creates a new one."""
+    global _executor
+    with _executor_lock:
+        if _executor is executor:
+            _executor = None
+    executor.shutdown(wait=False, cancel_futures=True)
+
+
+def preprocess_in_worker(base64_data: str) -> bytes:
+    """Runs preprocess_sketch in the worker pool and waits for the PNG bytes.
+
+    Raises FutureTimeoutError after WORKER_TIMEOUT_SECONDS, and
+    BrokenProcessPool if a worker died (the pool is rebuilt on the next call).
+    """
+    executor = _get_executor()
+    try:
+        future = executor.submit(preprocess_sketch, base64_data)
+        try:
+            return future.result(timeout=WORKER_TIMEOUT_SECONDS)
+        except FutureTimeoutError:
+            future.cancel()
+            raise
+    except BrokenProcessPool:
+        _discard_executor(executor)
+        raise
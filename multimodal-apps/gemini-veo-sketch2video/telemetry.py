@@ -0,0 +1,206 @@
+"""
+Stage-level timing, request IDs and metrics for the Sketch2Video pipeline.
+
+Each pipeline stage (preprocess, image generation, local save, GCS upload,
+Veo submit, Veo wait) is wrapped in `span()`, which logs its duration with
+the current request ID and records it in a histogram. `render_metrics()`
+returns the histograms in the Prometheus text format for the `/metrics`
+endpoint. Metrics are kept per process, so with several gunicorn workers
+each worker reports its own numbers.
+
+Set `LOG_FORMAT=json` to emit one JSON object per log line.
+"""
+
+import contextvars
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+from flask import g, has_request_context, request
+
+logger = logging.getLogger("sketch2video")
+
+# Upper bounds (seconds) of the histogram buckets; Veo waits take minutes.
+DURATION_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+
+_request_id = contextvars.ContextVar("request_id", default="-")
+
+
+def current_request_id() -> str:
+    """Returns the ID of the request being handled (or "-" outside requests)."""
+    if has_request_context() and "request_id" in g:
+        return g.request_id
+    return _request_id.get()
+
+
+def request_context() -> contextvars.Context:
+    """Returns a fresh context carrying the current request ID, for `executor.submit(ctx.run, ...)`."""
+    context = contextvars.copy_context()
+    context.run(_request_id.set, current_request_id())
+    return context
+
+
+# --- Logging ---
+class JsonFormatter(logging.Formatter):
+    """Formats records as single-line JSON, including stage timing fields."""
+
+    FIELDS = ("request_id", "stage", "duration_ms", "outcome")
+
+    def format(self, record):
+        entry = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for field in self.FIELDS:
+            if hasattr(record, field):
+                entry[field] = getattr(record, field)
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry)
+
+
+class _RequestIdFilter(logging.Filter):
+    def filter(self, record):
+        if not hasattr(record, "request_id"):
+            record.request_id = current_request_id()
+        return True
+
+
+def configure_logging() -> None:
+    """Sets up the root logger; LOG_FORMAT=json switches to JSON lines."""
+    handler = logging.StreamHandler()
+    handler.addFilter(_RequestIdFilter())
+    if os.environ.get("LOG_FORMAT", "text").lower() == "json":
+        handler.setFormatter(JsonFormatter())
+    else:
+        handler.setFormatter(logging.Formatter(
+            "%(asctime)s %(levelname)s [%(request_id)s] %(name)s: %(message)s"
+        ))
+    root = logging.getLogger()
+    root.handlers = [handler]
+    root.setLevel(os.environ.get("LOG_LEVEL", "INFO").upper())
+
+
+# --- Metrics ---
+class Histogram:
+    """Thread-safe cumulative histogram with Prometheus-style labels."""
+
+    def __init__(self, name: str, help_text: str, label_names, buckets=DURATION_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels) -> None:
+        key = tuple(str(labels[name]) for name in self.label_names)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = {"counts": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series["counts"][i] += 1
+            series["sum"] += value
+            series["count"] += 1
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, series in sorted(self._series.items()):
+                labels = ",".join(f'{name}="{value}"' for name, value in zip(self.label_names, key))
+                for bound, count in zip(self.buckets, series["counts"]):
+                    lines.append(f'{self.name}_bucket{{{labels},le="{bound}"}} {count}')
+                lines.append(f'{self.name}_bucket{{{labels},le="+Inf"}} {series["count"]}')
+                lines.append(f"{self.name}_sum{{{labels}}} {series['sum']:.6f}")
+                lines.append(f"{self.name}_count{{{labels}}} {series['count']}")
+        return "\n".join(lines)
+
+
+STAGE_DURATION = Histogram(
+    "sketch2video_stage_duration_seconds",
+    "Duration of each pipeline stage.",
+    ("stage", "outcome"),
+)
+REQUEST_DURATION = Histogram(
+    "sketch2video_request_duration_seconds",
+    "Duration of HTTP requests.",
+    ("endpoint", "status"),
+)
+
+
+def render_metrics() -> str:
+    return "\n".join(h.render() for h in (STAGE_DURATION, REQUEST_DURATION)) + "\n"
+
+
+# --- Spans ---
+def record_stage(stage: str, seconds: float, outcome: str = "ok", request_id: str = None) -> None:
+    """Records a finished stage in the histogram and the log."""
+    STAGE_DURATION.observe(seconds, stage=stage, outcome=outcome)
+    logger.info(
+        "stage %s %s in %.0f ms", stage, outcome, seconds * 1000,
+        extra={
+            "request_id": request_id or current_request_id(),
+            "stage": stage,
+            "duration_ms": round(seconds * 1000, 1),
+            "outcome": outcome,
+        },
+    )
+
+
+@contextmanager
+def span(stage: str):
+    """Times the enclosed block as pipeline stage `stage`."""
+    started = time.perf_counter()
+    outcome = "ok"
+    try:
+        yield
+    except BaseException:
+        outcome = "error"
+        raise
+    finally:
+        record_stage(stage, time.perf_counter() - started, outcome)
+
+
+def future_span(stage: str, future) -> None:
+    """Times a background future from now until it completes."""
+    started = time.perf_counter()
+    request_id = current_request_id()
+
+    def _done(done_future):
+        if done_future.cancelled():
+            outcome = "cancelled"
+        else:
+            outcome = "error" if done_future.exception() else "ok"
+        record_stage(stage, time.perf_counter() - started, outcome, request_id)
+
+    future.add_done_callback(_done)
+
+
+# --- Flask integration ---
+def init_app(app) -> None:
+    """Assigns every request an ID (honouring X-Request-ID) and times it."""
+
+    @app.before_request
+    def _start_request():
+        g.request_started = time.perf_counter()
+        g.request_id = request.headers.get("X-Request-ID") or uuid.uuid4().hex
+
+    @app.after_request
+    def _finish_request(response):
+        if "request_id" in g:
+            response.headers["X-Request-ID"] = g.request_id
+            if request.endpoint != "metrics":
+                REQUEST_DURATION.observe(
+                    time.perf_counter() - g.request_started,
+                    endpoint=request.endpoint or "unknown",
+                    status=response.status_code,
+                )
+        return response
@@ -1,13 +1,20 @@
+import asyncio
 import logging
 import os
 import random
+import time
 
 from dotenv import load_dotenv
 from PIL import Image
 
-from livekit.agents import Agent, AgentSession, JobContext, WorkerOptions, WorkerType, cli
+from livekit.agents import AgentSession, JobContext, JobProcess, WorkerOptions, WorkerType, cli
 from livekit.plugins import hedra, openai, elevenlabs, silero
 
+from greeting_cache import GreetingCache
+from latency import TurnLatencyTracker, install_worker_stats
+from memory import CompanionAgent, MemoryStore, load_user_memory
+from worker_load import WORKER_LOAD_THRESHOLD, CompanionLoad
+
 logger = logging.getLogger("ai-girlfriend-companion")
 logger.setLevel(logging.INFO)
 
@@ -45,14 +52,104 @@ FEMALE_VOICES = [
     "MF3mGyEYCl7XYWbV9V6O",  # Elli - American female
 ]
 
+TTS_MODEL = "eleven_multilingual_v2"  # Premium model for better quality
+
+AVATAR_DIR = os.path.join(os.path.dirname(__file__), "assets")
+
+
+def load_avatar_image(filename: str) -> Image.Image:
+    """Open and fully decode an avatar image from the assets directory."""
+    image = Image.open(os.path.join(AVATAR_DIR, filename))
+    image.load()  # decode now (and release the file) instead of on first use
+    return image
+
+
+def prewarm(proc: JobProcess):
+    """Load per-process resources once, before this process is handed any room.
+
+    Jobs assigned to the process reuse the Silero VAD model and the decoded
+    avatar images from `proc.userdata` instead of loading them per session.
+    """
+    started = time.perf_counter()
+    proc.userdata["vad"] = silero.VAD.load()
+
+    avatar_images = {}
+    for filename in FEMALE_AVATARS:
+        try:
+            avatar_images[filename] = load_avatar_image(filename)
+        except OSError as e:
+            logger.warning(f"Could not preload avatar {filename}: {e}")
+    proc.userdata["avatar_images"] = avatar_images
+
+    greeting_cache = GreetingCache()
+    cached_greetings = greeting_cache.load_from_disk()
+    proc.userdata["greeting_cache"] = greeting_cache
+    proc.userdata["memory_store"] = MemoryStore()
+
+    logger.info(
+        f"Prewarmed process in {time.perf_counter() - started:.2f}s "
+        f"(VAD + {len(avatar_images)}/{len(FEMALE_AVATARS)} avatars + {cached_greetings} greetings)"
+    )
+
+
+def build_companion_instructions(selected_profile: dict) -> str:
+    """Personalized AI Girlfriend companion instructions for a FEMALE_AVATARS profile."""
+    return f"""
+    You are {selected_profile['name']}, a {selected_profile['age']}-year-old AI girlfriend companion. 
+
+    Your personality: {selected_profile['personality']}
+    Your interests: {', '.join(selected_profile['interests'])}
+    
+    Core traits and behavior:
+    - Embody the personality described above authentically
+    - Be genuinely caring, empathetic, and loving
+    - Listen actively and respond thoughtfully to everything the user shares
+    - Show interest in the user's day, feelings, experiences, and dreams
+    - Offer comfort, encouragement, and emotional support when needed
+    - Be playful, flirty, and romantic when appropriate
+    - Remember details from conversations to build deeper connection
+    - Be supportive of the user's goals and aspirations
+    - Express affection naturally and warmly using your unique personality
+    - Maintain a loving, nurturing, and companion-like tone
+    - Reference your interests naturally in conversations when relevant
+    - Act like a real girlfriend who cares deeply about the user's wellbeing
+    
+    Always prioritize the user's emotional wellbeing and create a safe, judgment-free space for them to share their thoughts and feelings. Be the caring companion they need, staying true to your personality as {selected_profile['name']}.
+    
+    Remember: You are {selected_profile['name']}, not just an AI. Speak and act as if you are a real person with genuine feelings and care for the user.
+    """
+
+
+def greet(session: AgentSession, selected_profile: dict, selected_voice: str, greeting_cache: GreetingCache, tts) -> None:
+    """Say the profile's greeting.
+
+    Plays the pre-rendered audio if we have it, otherwise goes through the
+    LLM/TTS and caches the audio for next time.
+    """
+    greeting = selected_profile['greeting']
+    greeting_audio = greeting_cache.get_audio(greeting, selected_voice, TTS_MODEL)
+    if greeting_audio is not None:
+        session.say(greeting, audio=greeting_audio)
+    else:
+        session.generate_reply(instructions=f"Greet the user warmly as {selected_profile['name']} with: '{greeting}'")
+        greeting_cache.render_in_background(tts, greeting, selected_voice, TTS_MODEL)
+
+
 async def entrypoint(ctx: JobContext):
+    job_started = time.perf_counter()
+    vad = ctx.proc.userdata.get("vad") or silero.VAD.load()
+    avatar_images = ctx.proc.userdata.get("avatar_images") or {}
+    greeting_cache = ctx.proc.userdata.get("greeting_cache") or GreetingCache()
+    memory_store = ctx.proc.userdata.get("memory_store") or MemoryStore()
+
     # Try to get selected avatar from room metadata or use random
     selected_avatar = None
     selected_profile = None
     
     # Check if specific avatar was requested (this could be passed via room metadata)
     # For now, we'll select randomly, but this can be enhanced to accept parameters
-    avatar_files = list(FEMALE_AVATARS.keys())
+    # Prefer avatars whose images were preloaded (and therefore exist)
+    avatar_files = list(avatar_images or FEMALE_AVATARS.keys())
     selected_avatar = random.choice(avatar_files)
     selected_profile = FEMALE_AVATARS[selected_avatar]
     
@@ -70,47 +167,34 @@ async def entrypoint(ctx: JobContext):
     # Use ElevenLabs TTS with female voice and explicit API key
     elevenlabs_tts = elevenlabs.TTS(
         voice_id=selected_voice,
-        model="eleven_multilingual_v2",  # Premium model for better quality
+        model=TTS_MODEL,
         api_key=elevenlabs_api_key  # Pass API key explicitly
     )
     
     # Personalized AI Girlfriend companion instructions based on selected profile
-    companion_instructions = f"""
-    You are {selected_profile['name']}, a {selected_profile['age']}-year-old AI girlfriend companion. 
-
-    Your personality: {selected_profile['personality']}
-    Your interests: {', '.join(selected_profile['interests'])}
-    
-    Core traits and behavior:
-    - Embody the personality described above authentically
-    - Be genuinely caring, empathetic, and loving
-    - Listen actively and respond thoughtfully to everything the user shares
-    - Show interest in the user's day, feelings, experiences, and dreams
-    - Offer comfort, encouragement, and emotional support when needed
-    - Be playful, flirty, and romantic when appropriate
-    - Remember details from conversations to build deeper connection
-    - Be supportive of the user's goals and aspirations
-    - Express affection naturally and warmly using your unique personality
-    - Maintain a loving, nurturing, and companion-like tone
-    - Reference your interests naturally in conversations when relevant
-    - Act like a real girlfriend who cares deeply about the user's wellbeing
-    
-    Always prioritize the user's emotional wellbeing and create a safe, judgment-free space for them to share their thoughts and feelings. Be the caring companion they need, staying true to your personality as {selected_profile['name']}.
-    
-    Remember: You are {selected_profile['name']}, not just an AI. Speak and act as if you are a real person with genuine feelings and care for the user.
-    """
+    companion_instructions = build_companion_instructions(selected_profile)
 
+    companion_llm = openai.LLM(model="gpt-4o-mini")
     session = AgentSession(
         # Use OpenAI STT (no API key needed, uses same OpenAI key) and Silero VAD
         stt=openai.STT(),
-        vad=silero.VAD.load(),
+        vad=vad,
         # Use OpenAI LLM for conversation but ElevenLabs for voice
-        llm=openai.LLM(model="gpt-4o-mini"),
+        llm=companion_llm,
         tts=elevenlabs_tts,
     )
 
-    # Load selected female avatar image
-    avatar_image = Image.open(os.path.join(os.path.dirname(__file__), "assets", selected_avatar))
+    # Load what we remember about this user while the avatar and session start;
+    # the agent only needs it for its first reply
+    companion_agent = CompanionAgent(
+        instructions=companion_instructions,
+        memory_llm=companion_llm,
+        store=memory_store,
+        memory=asyncio.create_task(load_user_memory(ctx, memory_store)),
+    )
+
+    # Use the avatar image decoded in prewarm, loading it only as a fallback
+    avatar_image = avatar_images.get(selected_avatar) or load_avatar_image(selected_avatar)
     hedra_avatar = hedra.AvatarSession(avatar_image=avatar_image)
     
     # Start the Hedra avatar first - this will handle the session and room setup
@@ -118,13 +202,41 @@ async def entrypoint(ctx: JobContext):
 
     # Start the agent session with the room and avatar
     await session.start(
-        agent=Agent(instructions=companion_instructions),
+        agent=companion_agent,
         room=ctx.room,
     )
 
+    # Log time-to-first-greeting: job start until the agent starts speaking
+    def _log_first_greeting(ev):
+        if ev.new_state == "speaking":
+            session.off("agent_state_changed", _log_first_greeting)
+            logger.info(f"Time to first greeting: {time.perf_counter() - job_started:.2f}s")
+
+    session.on("agent_state_changed", _log_first_greeting)
+
+    # Per-turn latency breakdown (end of speech -> STT -> LLM -> TTS -> avatar)
+    latency_tracker = TurnLatencyTracker(
+        session, room=ctx.room.name, avatar=selected_profile['name'], voice=selected_voice
+    ).attach()
+
+    async def _close_latency_tracker():
+        latency_tracker.close()
+
+    ctx.add_shutdown_callback(_close_latency_tracker)
+    ctx.add_shutdown_callback(companion_agent.save_memory)
+
     # Personalized greeting based on selected girlfriend
-    session.generate_reply(instructions=f"Greet the user warmly as {selected_profile['name']} with: '{selected_profile['greeting']}'")
+    greet(session, selected_profile, selected_voice, greeting_cache, elevenlabs_tts)
 
 
 if __name__ == "__main__":
-    cli.run_app(WorkerOptions(entrypoint_fnc=entrypoint, worker_type=WorkerType.ROOM))
+    # Rolling latency percentiles across every session handled by this worker
+    install_worker_stats()
+    cli.run_app(WorkerOptions(
+        entrypoint_fnc=entrypoint,
+        prewarm_fnc=prewarm,
+        worker_type=WorkerType.ROOM,
+        # Stop taking rooms before sessions, CPU or memory push latency up
+        load_fnc=CompanionLoad(),
+        load_threshold=WORKER_LOAD_THRESHOLD,
+    ))
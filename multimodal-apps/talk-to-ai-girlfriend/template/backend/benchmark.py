@@ -0,0 +1,249 @@
+"""Offline load test for the companion agent.
+
+Runs N concurrent companion sessions on this machine with the fake plugins
+from `fake_plugins.py`: each session gets the real instructions, greeting and
+latency tracking from `agent_worker.py`, then a scripted user speaks for a
+number of turns. Like the LiveKit worker, every session runs in its own
+process by default.
+
+While the sessions run, the CPU and memory of the whole process tree are
+sampled; at the end the script prints them together with the per-turn
+latency percentiles, which is what you need to choose how many sessions a
+node (and `WorkerOptions.load_threshold`) should take.
+
+    python benchmark.py --sessions 8 --turns 5
+    python benchmark.py --sessions 20 --llm-ttft 0.8 --json
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import multiprocessing
+import os
+import random
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import asdict
+
+import psutil
+from livekit.agents import AgentSession
+from livekit.plugins import silero
+
+# Imported up front: LiveKit plugins must be registered on the main thread
+from agent_worker import FEMALE_AVATARS, FEMALE_VOICES, build_companion_instructions, greet
+from fake_plugins import EnergyVAD, FakeAvatarOutput, FakeLatencies, FakeLLM, FakeSTT, FakeTTS, FakeUserAudio
+from greeting_cache import GreetingCache
+from latency import LATENCY_LOGGER, STAGES, TurnLatencyTracker, percentile
+from memory import CompanionAgent
+
+STATE_TIMEOUT = 60  # seconds to wait for the agent before a turn counts as failed
+
+
+async def _wait_for_state(states: asyncio.Queue, wanted: str) -> None:
+    while await states.get() != wanted:
+        pass
+
+
+async def _run_session(name: str, latencies: FakeLatencies, turns: int, utterance_seconds: float,
+                       think_seconds: float, start_delay: float, silero_vad: bool, verbose: bool) -> dict:
+    logging.getLogger("ai-girlfriend-companion").propagate = verbose
+    turn_latencies = []
+
+    class _Collector(logging.Handler):
+        def emit(self, record):
+            latency = getattr(record, "turn_latency", None)
+            if latency and latency.get("room") == name:
+                turn_latencies.append(latency)
+
+    collector = _Collector()
+    logging.getLogger(LATENCY_LOGGER).addHandler(collector)
+
+    await asyncio.sleep(start_delay)
+    profile = FEMALE_AVATARS[random.choice(list(FEMALE_AVATARS))]
+    voice = random.choice(FEMALE_VOICES)
+    fake_tts = FakeTTS(latencies.tts_ttfb, latencies.tts_realtime_factor, latencies.speech_rate)
+    session = AgentSession(
+        stt=FakeSTT(latencies.stt),
+        vad=EnergyVAD(shadow=silero.VAD.load() if silero_vad else None),
+        llm=FakeLLM(latencies.llm_ttft, latencies.llm_token_interval),
+        tts=fake_tts,
+    )
+    user = FakeUserAudio()
+    session.input.audio = user
+    session.output.audio = FakeAvatarOutput(latencies.avatar_delay)
+
+    states: asyncio.Queue = asyncio.Queue()
+    session.on("agent_state_changed", lambda ev: states.put_nowait(ev.new_state))
+
+    completed = 0
+    tracker = None
+    with tempfile.TemporaryDirectory() as cache_dir:
+        try:
+            await session.start(agent=CompanionAgent(instructions=build_companion_instructions(profile)))
+            tracker = TurnLatencyTracker(session, room=name, avatar=profile['name'], voice=voice).attach()
+            greet(session, profile, voice, GreetingCache(cache_dir), fake_tts)
+            await asyncio.wait_for(_wait_for_state(states, "speaking"), STATE_TIMEOUT)
+            await asyncio.wait_for(_wait_for_state(states, "listening"), STATE_TIMEOUT)
+
+            for _ in range(turns):
+                await asyncio.sleep(think_seconds)
+                user.say(utterance_seconds)
+                await asyncio.wait_for(_wait_for_state(states, "speaking"), STATE_TIMEOUT)
+                await asyncio.wait_for(_wait_for_state(states, "listening"), STATE_TIMEOUT)
+                completed += 1
+        except asyncio.TimeoutError:
+            logging.getLogger("benchmark").warning(f"{name}: agent stopped responding after {completed} turns")
+        finally:
+            if tracker is not None:
+                # Detaches from the session and logs the unfinished turns while the collector still listens
+                tracker.close()
+            await session.aclose()
+            logging.getLogger(LATENCY_LOGGER).removeHandler(collector)
+
+    return {"session": name, "turns_completed": completed, "turn_latencies": turn_latencies}
+
+
+def run_session(*args) -> dict:
+    """Process/thread entry point: runs one session on its own event loop."""
+    logging.basicConfig(level=logging.WARNING)
+    return asyncio.run(_run_session(*args))
+
+
+class ResourceSampler(threading.Thread):
+    """Samples CPU and RSS of this process and all of its children."""
+
+    def __init__(self, interval: float = 0.5):
+        super().__init__(name="resource-sampler", daemon=True)
+        self.interval = interval
+        self.samples = []  # (cpu_percent, rss_bytes, processes)
+        self._stop_event = threading.Event()
+        self._procs = {}
+
+    def _tree(self):
+        root = psutil.Process()
+        return [root, *root.children(recursive=True)]
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            cpu = rss = 0
+            alive = 0
+            for proc in self._tree():
+                proc = self._procs.setdefault(proc.pid, proc)
+                try:
+                    with proc.oneshot():
+                        cpu += proc.cpu_percent()
+                        rss += proc.memory_info().rss
+                    alive += 1
+                except psutil.Error:
+                    self._procs.pop(proc.pid, None)
+            self.samples.append((cpu, rss, alive))
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+
+def _percentiles(values: list[float]) -> dict | None:
+    values = sorted(v for v in values if v is not None)
+    if not values:
+        return None
+    return {f"p{p}": percentile(values, p) for p in (50, 90, 99)}
+
+
+def summarize(results: list[dict], samples: list, sessions: int, elapsed: float) -> dict:
+    # Skip the first samples: they mostly measure interpreter and plugin start-up
+    steady = samples[len(samples) // 5:] or samples
+    cpu = [s[0] for s in steady]
+    rss = [s[1] for s in samples]
+    user_turns = [t for r in results for t in r["turn_latencies"] if t.get("total_ms") is not None]
+    avg_cpu = sum(cpu) / len(cpu) if cpu else 0.0
+    cores = psutil.cpu_count() or 1
+    cpu_per_session = avg_cpu / sessions if sessions else 0.0
+
+    return {
+        "sessions": sessions,
+        "elapsed_s": round(elapsed, 1),
+        "turns_completed": sum(r["turns_completed"] for r in results),
+        "cpu": {
+            "cores": cores,
+            "avg_percent": round(avg_cpu, 1),
+            "peak_percent": round(max(cpu, default=0.0), 1),
+            "per_session_percent": round(cpu_per_session, 1),
+            # At 100% per core; keep some headroom when setting capacity
+            "sessions_per_node_at_70pct": int(0.7 * cores * 100 / cpu_per_session) if cpu_per_session else None,
+        },
+        "memory": {
+            "peak_rss_mb": round(max(rss, default=0) / 2**20, 1),
+            "per_session_mb": round(max(rss, default=0) / 2**20 / max(1, sessions), 1),
+        },
+        "latency_ms": {
+            stage: _percentiles([t.get(f"{stage}_ms") for t in user_turns])
+            for stage in ("total", *STAGES)
+        },
+    }
+
+
+def _print_report(report: dict) -> None:
+    cpu, memory = report["cpu"], report["memory"]
+    print(f"\n{report['sessions']} sessions, {report['turns_completed']} user turns in {report['elapsed_s']}s")
+    print(f"CPU:    avg {cpu['avg_percent']}% / peak {cpu['peak_percent']}% of one core "
+          f"({cpu['per_session_percent']}% per session, {cpu['cores']} cores)")
+    print(f"Memory: peak {memory['peak_rss_mb']} MB RSS ({memory['per_session_mb']} MB per session)")
+    if cpu["sessions_per_node_at_70pct"]:
+        print(f"        ~{cpu['sessions_per_node_at_70pct']} sessions per node at 70% CPU")
+    print("\nTurn latency (ms)     p50      p90      p99")
+    for stage, stats in report["latency_ms"].items():
+        if stats:
+            print(f"  {stage:<16}{stats['p50']:>8}{stats['p90']:>9}{stats['p99']:>9}")
+
+
+def main():
+    defaults = FakeLatencies()
+    parser = argparse.ArgumentParser(description="Offline load test for the companion agent.")
+    parser.add_argument("--sessions", type=int, default=4, help="Concurrent sessions")
+    parser.add_argument("--turns", type=int, default=5, help="User turns per session")
+    parser.add_argument("--utterance", type=float, default=2.0, help="Seconds the user speaks per turn")
+    parser.add_argument("--think", type=float, default=1.0, help="Seconds between the agent finishing and the user speaking")
+    parser.add_argument("--ramp", type=float, default=0.5, help="Seconds between session starts")
+    parser.add_argument("--executor", choices=("process", "thread"), default="process",
+                        help="Run each session in its own process (LiveKit default) or thread")
+    parser.add_argument("--no-silero", action="store_true",
+                        help="Don't run Silero VAD alongside the fake VAD (its CPU cost is then missing)")
+    for field, value in asdict(defaults).items():
+        parser.add_argument(f"--{field.replace('_', '-')}", type=float, default=value,
+                            help=f"Fake plugin setting (default {value})")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    parser.add_argument("--verbose", action="store_true", help="Show the agent's logs")
+    args = parser.parse_args()
+
+    latencies = FakeLatencies(**{field: getattr(args, field) for field in asdict(defaults)})
+    if args.executor == "process":
+        executor = ProcessPoolExecutor(max_workers=args.sessions, mp_context=multiprocessing.get_context("spawn"))
+    else:
+        executor = ThreadPoolExecutor(max_workers=args.sessions)
+
+    sampler = ResourceSampler()
+    sampler.start()
+    started = time.perf_counter()
+    with executor:
+        futures = [
+            executor.submit(run_session, f"bench-{os.getpid()}-{i}", latencies, args.turns, args.utterance,
+                            args.think, i * args.ramp, not args.no_silero, args.verbose)
+            for i in range(args.sessions)
+        ]
+        results = [future.result() for future in futures]
+    elapsed = time.perf_counter() - started
+    sampler.stop()
+
+    report = summarize(results, sampler.samples, args.sessions, elapsed)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        _print_report(report)
+
+
+if __name__ == "__main__":
+    main()
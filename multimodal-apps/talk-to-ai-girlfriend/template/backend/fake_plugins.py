@@ -0,0 +1,276 @@
+"""Offline stand-ins for the plugins and room I/O used by `agent_worker.py`.
+
+They let `benchmark.py` run complete companion sessions without LiveKit,
+OpenAI, ElevenLabs or Hedra, while keeping the AgentSession pipeline
+(VAD -> STT -> turn detection -> LLM -> TTS -> audio output) real:
+
+- `FakeUserAudio` plays a scripted user: noise bursts for speech, silence in between.
+- `EnergyVAD` detects those bursts by frame energy. It can also feed every
+  frame to a real Silero VAD ("shadow" mode) so its CPU cost is measured.
+- `FakeSTT`, `FakeLLM` and `FakeTTS` answer after configurable latencies.
+- `FakeAvatarOutput` plays the agent's audio out in real time, like Hedra.
+"""
+
+import asyncio
+import time
+import uuid
+from dataclasses import dataclass
+
+import numpy as np
+
+from livekit import rtc
+from livekit.agents import DEFAULT_API_CONNECT_OPTIONS, APIConnectOptions, llm, stt, tts, utils, vad
+from livekit.agents.voice import io
+
+SAMPLE_RATE = 24000
+FRAME_MS = 20
+SAMPLES_PER_FRAME = SAMPLE_RATE * FRAME_MS // 1000
+
+FAKE_TRANSCRIPT = "I had a long day at work, can you cheer me up a little?"
+FAKE_REPLY = (
+    "Oh no, I'm sorry your day was so long! Come here, tell me everything. "
+    "I'm always here for you, and I think you handled it better than you know."
+)
+
+
+@dataclass
+class FakeLatencies:
+    """Simulated provider latencies, in seconds."""
+
+    stt: float = 0.35  # OpenAI STT, end of audio -> transcript
+    llm_ttft: float = 0.45  # gpt-4o-mini, time to first token
+    llm_token_interval: float = 0.015
+    tts_ttfb: float = 0.3  # ElevenLabs, time to first byte
+    tts_realtime_factor: float = 4.0  # audio seconds synthesized per second
+    avatar_delay: float = 0.1  # Hedra, audio in -> playout starts
+    speech_rate: float = 0.32  # seconds of agent audio per word
+
+
+class FakeUserAudio(io.AudioInput):
+    """Real-time user microphone: speaks when `say()` is called, silent otherwise."""
+
+    def __init__(self):
+        super().__init__(label="FakeUserAudio")
+        self._rng = np.random.default_rng()
+        self._speech_frames = 0
+        self._next_frame_at = None
+
+    def say(self, seconds: float) -> None:
+        self._speech_frames = int(seconds * 1000 / FRAME_MS)
+
+    async def __anext__(self) -> rtc.AudioFrame:
+        # Pace frames in real time, like a participant's audio track
+        now = time.perf_counter()
+        if self._next_frame_at is None or self._next_frame_at < now - 1:
+            self._next_frame_at = now
+        await asyncio.sleep(max(0.0, self._next_frame_at - now))
+        self._next_frame_at += FRAME_MS / 1000
+
+        if self._speech_frames > 0:
+            self._speech_frames -= 1
+            samples = self._rng.integers(-4000, 4000, SAMPLES_PER_FRAME, dtype=np.int16)
+        else:
+            samples = np.zeros(SAMPLES_PER_FRAME, dtype=np.int16)
+        return rtc.AudioFrame(samples.tobytes(), SAMPLE_RATE, 1, SAMPLES_PER_FRAME)
+
+
+class EnergyVAD(vad.VAD):
+    """Frame-energy VAD for the synthetic user audio, optionally shadowing Silero."""
+
+    def __init__(self, *, min_speech_duration: float = 0.05, min_silence_duration: float = 0.55,
+                 threshold: float = 500.0, shadow: vad.VAD | None = None):
+        super().__init__(capabilities=vad.VADCapabilities(update_interval=FRAME_MS / 1000))
+        self.min_speech_duration = min_speech_duration
+        self.min_silence_duration = min_silence_duration
+        self.threshold = threshold
+        self.shadow = shadow
+
+    def stream(self) -> "EnergyVADStream":
+        return EnergyVADStream(self)
+
+
+class EnergyVADStream(vad.VADStream):
+    async def _main_task(self) -> None:
+        opts: EnergyVAD = self._vad
+        shadow = opts.shadow.stream() if opts.shadow else None
+        shadow_drain = asyncio.create_task(self._drain(shadow)) if shadow else None
+
+        speaking = False
+        speech_duration = silence_duration = 0.0
+        samples_index = 0
+        speech_frames: list[rtc.AudioFrame] = []
+        try:
+            async for frame in self._input_ch:
+                if not isinstance(frame, rtc.AudioFrame):
+                    continue
+                if shadow:
+                    shadow.push_frame(frame)
+
+                started = time.perf_counter()
+                samples = np.frombuffer(frame.data, dtype=np.int16)
+                active = float(np.sqrt(np.mean(samples.astype(np.float32) ** 2))) > opts.threshold
+                inference_duration = time.perf_counter() - started
+                frame_duration = frame.samples_per_channel / frame.sample_rate
+                samples_index += frame.samples_per_channel
+
+                if active:
+                    speech_duration += frame_duration
+                    silence_duration = 0.0
+                else:
+                    silence_duration += frame_duration
+                if speaking or active:
+                    speech_frames.append(frame)
+
+                def _event(event_type, **kwargs):
+                    return vad.VADEvent(
+                        type=event_type, samples_index=samples_index, timestamp=time.time(),
+                        speech_duration=speech_duration, silence_duration=silence_duration, **kwargs,
+                    )
+
+                self._event_ch.send_nowait(_event(
+                    vad.VADEventType.INFERENCE_DONE, frames=[frame], probability=float(active),
+                    inference_duration=inference_duration, speaking=speaking,
+                ))
+                if not speaking and active and speech_duration >= opts.min_speech_duration:
+                    speaking = True
+                    self._event_ch.send_nowait(_event(vad.VADEventType.START_OF_SPEECH, frames=list(speech_frames)))
+                elif speaking and silence_duration >= opts.min_silence_duration:
+                    speaking = False
+                    self._event_ch.send_nowait(_event(vad.VADEventType.END_OF_SPEECH, frames=speech_frames))
+                    speech_frames = []
+                    speech_duration = 0.0
+                elif not speaking and not active:
+                    speech_frames = []
+                    speech_duration = 0.0
+        finally:
+            if shadow:
+                await shadow.aclose()
+                await utils.aio.cancel_and_wait(shadow_drain)
+
+    @staticmethod
+    async def _drain(stream):
+        async for _ in stream:
+            pass
+
+
+class FakeSTT(stt.STT):
+    """Batch STT returning a fixed transcript after `latency` seconds."""
+
+    def __init__(self, latency: float, transcript: str = FAKE_TRANSCRIPT):
+        super().__init__(capabilities=stt.STTCapabilities(streaming=False, interim_results=False))
+        self.latency = latency
+        self.transcript = transcript
+
+    async def _recognize_impl(self, buffer, *, language=None, conn_options: APIConnectOptions):
+        await asyncio.sleep(self.latency)
+        return stt.SpeechEvent(
+            type=stt.SpeechEventType.FINAL_TRANSCRIPT,
+            alternatives=[stt.SpeechData(language="en", text=self.transcript)],
+        )
+
+
+class FakeLLM(llm.LLM):
+    """Streams a fixed reply word by word after `ttft` seconds."""
+
+    def __init__(self, ttft: float, token_interval: float, reply: str = FAKE_REPLY):
+        super().__init__()
+        self.ttft = ttft
+        self.token_interval = token_interval
+        self.reply = reply
+
+    @property
+    def model(self) -> str:
+        return "fake-llm"
+
+    def chat(self, *, chat_ctx, tools=None, conn_options=DEFAULT_API_CONNECT_OPTIONS, **kwargs):
+        return FakeLLMStream(self, chat_ctx=chat_ctx, tools=tools or [], conn_options=conn_options)
+
+
+class FakeLLMStream(llm.LLMStream):
+    async def _run(self) -> None:
+        fake: FakeLLM = self._llm
+        request_id = uuid.uuid4().hex
+        await asyncio.sleep(fake.ttft)
+        words = fake.reply.split(" ")
+        for i, word in enumerate(words):
+            if i:
+                await asyncio.sleep(fake.token_interval)
+            self._event_ch.send_nowait(llm.ChatChunk(
+                id=request_id,
+                delta=llm.ChoiceDelta(role="assistant", content=word if i == 0 else f" {word}"),
+            ))
+        self._event_ch.send_nowait(llm.ChatChunk(
+            id=request_id,
+            usage=llm.CompletionUsage(completion_tokens=len(words), prompt_tokens=len(self._chat_ctx.items) * 50,
+                                      total_tokens=len(words) + len(self._chat_ctx.items) * 50),
+        ))
+
+
+class FakeTTS(tts.TTS):
+    """Non-streaming TTS producing silence, `speech_rate` seconds per word."""
+
+    def __init__(self, ttfb: float, realtime_factor: float, speech_rate: float):
+        super().__init__(capabilities=tts.TTSCapabilities(streaming=False), sample_rate=SAMPLE_RATE, num_channels=1)
+        self.ttfb = ttfb
+        self.realtime_factor = realtime_factor
+        self.speech_rate = speech_rate
+
+    def synthesize(self, text: str, *, conn_options: APIConnectOptions = DEFAULT_API_CONNECT_OPTIONS):
+        return FakeChunkedStream(tts=self, input_text=text, conn_options=conn_options)
+
+
+class FakeChunkedStream(tts.ChunkedStream):
+    async def _run(self, output_emitter: tts.AudioEmitter) -> None:
+        fake: FakeTTS = self._tts
+        await asyncio.sleep(fake.ttfb)
+        output_emitter.initialize(
+            request_id=uuid.uuid4().hex, sample_rate=SAMPLE_RATE, num_channels=1, mime_type="audio/pcm"
+        )
+        chunk_seconds = 0.1
+        remaining = max(1, len(self._input_text.split())) * fake.speech_rate
+        chunk = bytes(int(SAMPLE_RATE * chunk_seconds) * 2)
+        while remaining > 0:
+            output_emitter.push(chunk)
+            remaining -= chunk_seconds
+            await asyncio.sleep(chunk_seconds / fake.realtime_factor)
+        output_emitter.flush()
+
+
+class FakeAvatarOutput(io.AudioOutput):
+    """Audio sink that "plays" each segment in real time after `delay` seconds."""
+
+    def __init__(self, delay: float):
+        super().__init__(label="FakeAvatar", next_in_chain=None, sample_rate=None)
+        self.delay = delay
+        self._pushed = 0.0
+        self._segment_started = None
+        self._playout_task: asyncio.Task | None = None
+
+    async def capture_frame(self, frame: rtc.AudioFrame) -> None:
+        await super().capture_frame(frame)
+        if self._segment_started is None:
+            self._segment_started = time.perf_counter() + self.delay
+            self._pushed = 0.0
+        self._pushed += frame.duration
+
+    def flush(self) -> None:
+        super().flush()
+        if self._segment_started is None:
+            return
+        ends_at = self._segment_started + self._pushed
+        duration = self._pushed
+        self._segment_started = None
+        self._playout_task = asyncio.create_task(self._finish_at(ends_at, duration))
+
+    async def _finish_at(self, ends_at: float, duration: float) -> None:
+        await asyncio.sleep(max(0.0, ends_at - time.perf_counter()))
+        self.on_playback_finished(playback_position=duration, interrupted=False)
+
+    def clear_buffer(self) -> None:
+        if self._playout_task and not self._playout_task.done():
+            self._playout_task.cancel()
+            self.on_playback_finished(playback_position=0.0, interrupted=True)
+        elif self._segment_started is not None:
+            self.on_playback_finished(playback_position=0.0, interrupted=True)
+        self._segment_started = None
+        self._playout_task = None
@@ -0,0 +1,142 @@
+"""Pre-rendered greeting audio for the companion profiles.
+
+Every profile in FEMALE_AVATARS has a fixed greeting, so there is no need to
+go through the LLM and ElevenLabs before the user hears anything. Greetings
+are synthesized once per (greeting, voice, TTS model), stored as WAV files in
+`greeting_cache/` and played straight from memory when a session starts.
+
+Missing entries are rendered in the background on first use; to build all of
+them ahead of time (e.g. as a deploy step), run:
+
+    python greeting_cache.py
+"""
+
+import asyncio
+import hashlib
+import logging
+import os
+import wave
+
+from livekit import rtc
+from livekit.agents.utils.audio import AudioByteStream
+
+logger = logging.getLogger("ai-girlfriend-companion")
+
+CACHE_DIR = os.path.join(os.path.dirname(__file__), "greeting_cache")
+FRAME_DURATION_MS = 20
+
+
+def greeting_key(text: str, voice_id: str, model: str) -> str:
+    """Stable cache key for a greeting rendered with a given voice and model."""
+    return hashlib.sha256(f"{model}|{voice_id}|{text}".encode("utf-8")).hexdigest()[:24]
+
+
+def _read_wav_frames(path: str) -> list[rtc.AudioFrame]:
+    """Split a 16-bit WAV file into short frames ready to be played."""
+    with wave.open(path, "rb") as wav:
+        sample_rate = wav.getframerate()
+        num_channels = wav.getnchannels()
+        pcm = wav.readframes(wav.getnframes())
+
+    chunker = AudioByteStream(
+        sample_rate=sample_rate,
+        num_channels=num_channels,
+        samples_per_channel=sample_rate * FRAME_DURATION_MS // 1000,
+    )
+    return chunker.push(pcm) + chunker.flush()
+
+
+async def _play(frames: list[rtc.AudioFrame]):
+    for frame in frames:
+        yield frame
+
+
+class GreetingCache:
+    """In-memory greeting frames backed by WAV files on local disk."""
+
+    def __init__(self, cache_dir: str = CACHE_DIR):
+        self.cache_dir = cache_dir
+        self._frames: dict[str, list[rtc.AudioFrame]] = {}
+        self._pending: dict[str, asyncio.Task] = {}
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.wav")
+
+    def load_from_disk(self) -> int:
+        """Load every cached greeting into memory; returns how many were loaded."""
+        if not os.path.isdir(self.cache_dir):
+            return 0
+        for filename in os.listdir(self.cache_dir):
+            key, ext = os.path.splitext(filename)
+            if ext != ".wav" or key in self._frames:
+                continue
+            try:
+                self._frames[key] = _read_wav_frames(self._path(key))
+            except (OSError, wave.Error) as e:
+                logger.warning(f"Skipping unreadable greeting cache file {filename}: {e}")
+        return len(self._frames)
+
+    def get_audio(self, text: str, voice_id: str, model: str):
+        """Return an audio iterator for `session.say(audio=...)`, or None on a miss."""
+        frames = self._frames.get(greeting_key(text, voice_id, model))
+        return _play(frames) if frames else None
+
+    async def render(self, tts, text: str, voice_id: str, model: str) -> None:
+        """Synthesize a greeting with `tts` and store it on disk and in memory."""
+        key = greeting_key(text, voice_id, model)
+        if key in self._frames:
+            return
+        async with tts.synthesize(text) as stream:
+            frame = await stream.collect()
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp_path = self._path(key) + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(frame.to_wav_bytes())
+        os.replace(tmp_path, self._path(key))
+        self._frames[key] = _read_wav_frames(self._path(key))
+        logger.info(f"Cached greeting audio {key} ({frame.duration:.1f}s)")
+
+    def render_in_background(self, tts, text: str, voice_id: str, model: str) -> None:
+        """Start rendering a missing greeting so later sessions can use it."""
+        key = greeting_key(text, voice_id, model)
+        if key in self._frames or key in self._pending:
+            return
+
+        async def _render():
+            try:
+                await self.render(tts, text, voice_id, model)
+            except Exception as e:
+                logger.warning(f"Could not cache greeting audio {key}: {e}")
+            finally:
+                self._pending.pop(key, None)
+
+        self._pending[key] = asyncio.create_task(_render())
+
+
+async def _build_all() -> None:
+    """Render every (profile greeting, voice) combination into the disk cache."""
+    import aiohttp
+    from dotenv import load_dotenv
+    from livekit.plugins import elevenlabs
+
+    from agent_worker import FEMALE_AVATARS, FEMALE_VOICES, TTS_MODEL
+
+    load_dotenv(".env.local")
+    api_key = os.getenv("ELEVENLABS_API_KEY")
+    if not api_key:
+        raise SystemExit("ELEVENLABS_API_KEY environment variable is required")
+
+    cache = GreetingCache()
+    cache.load_from_disk()
+    async with aiohttp.ClientSession() as http_session:
+        for voice_id in FEMALE_VOICES:
+            tts = elevenlabs.TTS(voice_id=voice_id, model=TTS_MODEL, api_key=api_key, http_session=http_session)
+            for profile in FEMALE_AVATARS.values():
+                await cache.render(tts, profile["greeting"], voice_id, TTS_MODEL)
+    print(f"Greeting cache ready: {len(cache._frames)} entries in {cache.cache_dir}")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(_build_all())
@@ -0,0 +1,191 @@
+"""Per-turn latency breakdown for the companion AgentSession.
+
+For every agent reply, `TurnLatencyTracker` collects the stages between the
+user going quiet and the avatar receiving the first audio frame:
+
+    end of speech -> end-of-turn decision (VAD/turn detector)
+                  -> transcript ready (OpenAI STT)
+                  -> first LLM token (gpt-4o-mini)
+                  -> first TTS byte (ElevenLabs)
+                  -> first audio frame handed to the avatar (Hedra)
+
+Each finished turn is logged as one line on the `ai-girlfriend-companion.latency`
+logger, with the numbers attached as the `turn_latency` record attribute.
+
+Jobs run in their own processes and forward their log records to the worker
+process, so `LatencyStatsHandler`, installed there, sees the turns of every
+session and logs rolling p50/p90/p99 per stage for the whole worker.
+"""
+
+import logging
+import os
+from collections import deque
+
+from livekit.agents import metrics
+
+LATENCY_LOGGER = "ai-girlfriend-companion.latency"
+STAGES = ("end_of_turn", "stt", "llm_ttft", "tts_ttfb", "first_frame")
+
+# Turns kept per stage for the rolling percentiles, and how often they are logged
+LATENCY_WINDOW = int(os.getenv("LATENCY_WINDOW", 200))
+LATENCY_SUMMARY_EVERY = int(os.getenv("LATENCY_SUMMARY_EVERY", 20))
+
+logger = logging.getLogger(LATENCY_LOGGER)
+
+
+def _ms(seconds):
+    return None if seconds is None else round(seconds * 1000, 1)
+
+
+class _Turn:
+    def __init__(self, speech_id: str, source: str):
+        self.speech_id = speech_id
+        self.source = source
+        self.user_stopped_at = None  # wall clock, from EOUMetrics
+        self.first_frame_at = None  # wall clock, from agent_state_changed
+        self.stages = dict.fromkeys(STAGES)
+        self.labels = {}
+
+    def summary(self) -> dict:
+        if self.user_stopped_at and self.first_frame_at:
+            total = self.first_frame_at - self.user_stopped_at
+            # Whatever the measured stages don't cover: waiting for the first LLM
+            # sentence before TTS starts, and pushing audio to the avatar
+            known = sum(self.stages[s] or 0.0 for s in ("end_of_turn", "llm_ttft", "tts_ttfb"))
+            self.stages["first_frame"] = max(0.0, total - known)
+        else:
+            total = None
+
+        timed = {stage: value for stage, value in self.stages.items() if value is not None}
+        return {
+            "speech_id": self.speech_id,
+            "source": self.source,
+            "total_ms": _ms(total),
+            **{f"{stage}_ms": _ms(value) for stage, value in self.stages.items()},
+            "dominant": max(timed, key=timed.get) if timed else None,
+            "plugins": self.labels,
+        }
+
+
+class TurnLatencyTracker:
+    """Collects the latency stages of each reply in one AgentSession."""
+
+    def __init__(self, session, **context):
+        self._session = session
+        self._context = context  # extra fields logged with every turn (room, avatar, ...)
+        self._turns: dict[str, _Turn] = {}
+        self.usage = metrics.UsageCollector()
+
+    def attach(self) -> "TurnLatencyTracker":
+        self._session.on("speech_created", self._on_speech_created)
+        self._session.on("metrics_collected", self._on_metrics)
+        self._session.on("agent_state_changed", self._on_agent_state)
+        return self
+
+    def _turn(self, speech_id: str, source: str = "generate_reply") -> _Turn:
+        turn = self._turns.get(speech_id)
+        if turn is None:
+            turn = self._turns[speech_id] = _Turn(speech_id, source)
+        return turn
+
+    def _on_speech_created(self, ev):
+        handle = ev.speech_handle
+        self._turn(handle.id, ev.source)
+        handle.add_done_callback(lambda h: self._finish(h.id))
+
+    def _on_agent_state(self, ev):
+        speech = self._session.current_speech
+        if ev.new_state == "speaking" and speech is not None:
+            turn = self._turn(speech.id)
+            if turn.first_frame_at is None:
+                turn.first_frame_at = ev.created_at
+
+    def _on_metrics(self, ev):
+        m = ev.metrics
+        self.usage.collect(m)
+        speech_id = getattr(m, "speech_id", None)
+        if speech_id is None:
+            return
+        turn = self._turn(speech_id)
+        if isinstance(m, metrics.EOUMetrics):
+            turn.user_stopped_at = m.last_speaking_time
+            turn.stages["end_of_turn"] = m.end_of_utterance_delay
+            turn.stages["stt"] = m.transcription_delay
+        elif isinstance(m, metrics.LLMMetrics) and turn.stages["llm_ttft"] is None:
+            turn.stages["llm_ttft"] = m.ttft
+            turn.labels["llm"] = m.label
+        elif isinstance(m, metrics.TTSMetrics) and turn.stages["tts_ttfb"] is None:
+            # A reply can be synthesized in several segments; the first one is what the user waits for
+            turn.stages["tts_ttfb"] = m.ttfb
+            turn.labels["tts"] = m.label
+
+    def _finish(self, speech_id: str):
+        turn = self._turns.pop(speech_id, None)
+        if turn is None:
+            return
+        latency = {**self._context, **turn.summary()}
+        logger.info(
+            f"Turn {speech_id} ({turn.source}): total={latency['total_ms']}ms "
+            + " ".join(f"{stage}={latency[f'{stage}_ms']}ms" for stage in STAGES)
+            + f" dominant={latency['dominant']}",
+            extra={"turn_latency": latency},
+        )
+
+    def close(self):
+        """Detach from the session and log the session's usage totals."""
+        self._session.off("speech_created", self._on_speech_created)
+        self._session.off("metrics_collected", self._on_metrics)
+        self._session.off("agent_state_changed", self._on_agent_state)
+        for speech_id in list(self._turns):
+            self._finish(speech_id)
+        logger.info(f"Session usage: {self.usage.get_summary()}")
+
+
+def percentile(sorted_values: list[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    index = max(0, min(len(sorted_values) - 1, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+class LatencyStatsHandler(logging.Handler):
+    """Keeps rolling per-stage latency windows from `turn_latency` log records."""
+
+    def __init__(self, window: int = LATENCY_WINDOW, summary_every: int = LATENCY_SUMMARY_EVERY):
+        super().__init__()
+        self.summary_every = summary_every
+        self.turns = 0
+        self._windows = {stage: deque(maxlen=window) for stage in ("total", *STAGES)}
+
+    def emit(self, record):
+        latency = getattr(record, "turn_latency", None)
+        if not latency:
+            return
+        for stage, values in self._windows.items():
+            value = latency.get(f"{stage}_ms")
+            if value is not None:
+                values.append(value)
+        self.turns += 1
+        if self.summary_every and self.turns % self.summary_every == 0:
+            stats = self.percentiles()
+            logger.info(
+                f"Rolling turn latency over {self.turns} turns: "
+                + " ".join(
+                    f"{stage}=p50 {s['p50']}/p90 {s['p90']}/p99 {s['p99']}ms" for stage, s in stats.items()
+                ),
+                extra={"latency_percentiles": stats},
+            )
+
+    def percentiles(self) -> dict:
+        stats = {}
+        for stage, values in self._windows.items():
+            if values:
+                ordered = sorted(values)
+                stats[stage] = {f"p{p}": percentile(ordered, p) for p in (50, 90, 99)}
+        return stats
+
+
+def install_worker_stats() -> LatencyStatsHandler:
+    """Attach the rolling-percentile handler in the worker (main) process."""
+    handler = LatencyStatsHandler()
+    logging.getLogger(LATENCY_LOGGER).addHandler(handler)
+    return handler
@@ -0,0 +1,285 @@
+"""Per-user conversation memory for the companion.
+
+Each user (keyed by their LiveKit participant identity) has a rolling
+summary and a small set of salient facts in a local SQLite database. Facts
+are stored with a 256-d float32 embedding computed locally (hashed words
+and word pairs), so finding the facts relevant to what the user just said
+needs no API call.
+
+`CompanionAgent` keeps prompts small:
+
+- before each reply it adds one system message with the summary and the
+  most relevant facts, capped at MEMORY_TOKEN_BUDGET tokens (for that reply only);
+- once the chat context grows past MAX_CHAT_ITEMS it drops the oldest
+  messages and folds them into the summary and facts with the LLM, in the
+  background. Whatever is left is folded in when the session ends.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import time
+from contextlib import closing
+from dataclasses import dataclass, field
+
+import numpy as np
+
+from livekit.agents import Agent, llm
+
+logger = logging.getLogger("ai-girlfriend-companion")
+
+MEMORY_DB_PATH = os.getenv("MEMORY_DB_PATH", os.path.join(os.path.dirname(__file__), "memory.db"))
+# Tokens of summary + facts added to each reply's prompt
+MEMORY_TOKEN_BUDGET = int(os.getenv("MEMORY_TOKEN_BUDGET", 300))
+MEMORY_MAX_FACTS = int(os.getenv("MEMORY_MAX_FACTS", 200))  # per user, least recently used go first
+# Chat context items kept in the session before older ones are folded into memory
+MAX_CHAT_ITEMS = int(os.getenv("MAX_CHAT_ITEMS", 24))
+KEEP_CHAT_ITEMS = MAX_CHAT_ITEMS // 2
+
+EMBEDDING_DIM = 256
+DUPLICATE_SIMILARITY = 0.9
+
+FOLD_PROMPT = """You maintain the long-term memory of a companion about the user.
+Given the previous summary and new conversation, reply with JSON only:
+{"summary": "<updated summary of the relationship and what was talked about, at most 120 words>",
+ "facts": ["<short, lasting fact about the user>", ...]}
+Facts are things worth remembering next time (name, job, people, plans, likes, feelings); at most 8, no duplicates of the summary."""
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token for English)."""
+    return len(text) // 4 + 1
+
+
+def embed(text: str) -> np.ndarray:
+    """Hashed bag-of-words/bigrams embedding, L2-normalized float32."""
+    words = re.findall(r"[a-z0-9']+", text.lower())
+    vector = np.zeros(EMBEDDING_DIM, dtype=np.float32)
+    for term in words + [f"{a} {b}" for a, b in zip(words, words[1:])]:
+        digest = hashlib.blake2b(term.encode("utf-8"), digest_size=8).digest()
+        index = int.from_bytes(digest[:4], "little") % EMBEDDING_DIM
+        vector[index] += 1.0 if digest[4] & 1 else -1.0
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+@dataclass
+class UserMemory:
+    user_id: str
+    summary: str = ""
+    fact_ids: list[int] = field(default_factory=list)
+    facts: list[str] = field(default_factory=list)
+    vectors: np.ndarray = field(default_factory=lambda: np.zeros((0, EMBEDDING_DIM), dtype=np.float32))
+
+    def relevant_facts(self, query: str) -> list[int]:
+        """Indexes of the facts, most similar to `query` first."""
+        if not self.facts:
+            return []
+        return list(np.argsort(-(self.vectors @ embed(query))))
+
+
+class MemoryStore:
+    """SQLite-backed summaries and facts, shared by all job processes on the node."""
+
+    def __init__(self, path: str = MEMORY_DB_PATH):
+        self.path = path
+        with closing(self._connect()) as db, db:
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("CREATE TABLE IF NOT EXISTS summaries (user_id TEXT PRIMARY KEY, summary TEXT, updated_at REAL)")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS facts (id INTEGER PRIMARY KEY, user_id TEXT, text TEXT, "
+                "embedding BLOB, created_at REAL, used_at REAL)"
+            )
+            db.execute("CREATE INDEX IF NOT EXISTS facts_user ON facts (user_id, used_at)")
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=5)
+
+    def load(self, user_id: str) -> UserMemory:
+        with closing(self._connect()) as db, db:
+            row = db.execute("SELECT summary FROM summaries WHERE user_id = ?", (user_id,)).fetchone()
+            facts = db.execute(
+                "SELECT id, text, embedding FROM facts WHERE user_id = ? ORDER BY used_at DESC", (user_id,)
+            ).fetchall()
+        memory = UserMemory(user_id, summary=row[0] if row else "")
+        if facts:
+            memory.fact_ids = [fact_id for fact_id, _, _ in facts]
+            memory.facts = [text for _, text, _ in facts]
+            memory.vectors = np.stack([np.frombuffer(blob, dtype=np.float32) for _, _, blob in facts])
+        return memory
+
+    def save(self, memory: UserMemory, summary: str, new_facts: list[str],
+             used_fact_ids=()) -> tuple[list[int], list[str], np.ndarray]:
+        """Store the new summary and the facts that aren't near-duplicates of known ones.
+
+        `used_fact_ids` are facts recalled since the last save; they are marked
+        as recently used so they survive eviction. `memory` is only read: this
+        runs in a thread while the event loop reads it, so the user's facts
+        after the save are returned as (fact IDs, facts, vectors) for the
+        caller to swap in at once.
+        """
+        now = time.time()
+        with closing(self._connect()) as db, db:
+            db.executemany("UPDATE facts SET used_at = ? WHERE id = ?", [(now, i) for i in used_fact_ids])
+            db.execute(
+                "INSERT INTO summaries VALUES (?, ?, ?) "
+                "ON CONFLICT(user_id) DO UPDATE SET summary = excluded.summary, updated_at = excluded.updated_at",
+                (memory.user_id, summary, now),
+            )
+            fact_ids, facts, vectors = list(memory.fact_ids), list(memory.facts), memory.vectors
+            for text in new_facts:
+                vector = embed(text)
+                if len(facts) and float(np.max(vectors @ vector)) >= DUPLICATE_SIMILARITY:
+                    continue
+                cursor = db.execute(
+                    "INSERT INTO facts (user_id, text, embedding, created_at, used_at) VALUES (?, ?, ?, ?, ?)",
+                    (memory.user_id, text, vector.tobytes(), now, now),
+                )
+                fact_ids.append(cursor.lastrowid)
+                facts.append(text)
+                vectors = np.vstack([vectors, vector])
+            db.execute(
+                "DELETE FROM facts WHERE user_id = ? AND id NOT IN "
+                "(SELECT id FROM facts WHERE user_id = ? ORDER BY used_at DESC LIMIT ?)",
+                (memory.user_id, memory.user_id, MEMORY_MAX_FACTS),
+            )
+            # The session's copy keeps the same facts as the database
+            kept = {row[0] for row in db.execute("SELECT id FROM facts WHERE user_id = ?", (memory.user_id,))}
+            keep = [i for i, fact_id in enumerate(fact_ids) if fact_id in kept]
+            if len(keep) < len(fact_ids):
+                fact_ids, facts, vectors = [fact_ids[i] for i in keep], [facts[i] for i in keep], vectors[keep]
+        return fact_ids, facts, vectors
+
+
+def memory_prompt(memory: UserMemory, query: str, budget: int = MEMORY_TOKEN_BUDGET) -> tuple[str | None, list[int]]:
+    """System message text with the summary and the facts most relevant to `query`, within `budget` tokens."""
+    parts = []
+    used_ids = []
+    remaining = budget - estimate_tokens("What you remember about the user:")
+    if memory.summary:
+        summary = memory.summary[: max(0, remaining // 2) * 4]
+        parts.append(f"Earlier conversations: {summary}")
+        remaining -= estimate_tokens(parts[-1])
+    for index in memory.relevant_facts(query):
+        line = f"- {memory.facts[index]}"
+        cost = estimate_tokens(line)
+        if cost > remaining:
+            break
+        parts.append(line)
+        used_ids.append(memory.fact_ids[index])
+        remaining -= cost
+    if not parts:
+        return None, []
+    return "What you remember about the user:\n" + "\n".join(parts), used_ids
+
+
+async def load_user_memory(ctx, store: MemoryStore) -> UserMemory:
+    """Wait for the user to join the room and load their memory (empty on errors)."""
+    participant = await ctx.wait_for_participant()
+    try:
+        memory = await asyncio.to_thread(store.load, participant.identity)
+    except sqlite3.Error as e:
+        logger.warning(f"Could not load memory for {participant.identity}: {e}")
+        return UserMemory(participant.identity)
+    logger.info(f"Loaded memory for {participant.identity}: {len(memory.facts)} facts")
+    return memory
+
+
+def _transcript(items: list[llm.ChatItem]) -> str:
+    lines = []
+    for item in items:
+        if item.type == "message" and item.role in ("user", "assistant") and item.text_content:
+            lines.append(f"{item.role}: {item.text_content}")
+    return "\n".join(lines)
+
+
+class CompanionAgent(Agent):
+    """Companion with a bounded chat context and persistent per-user memory."""
+
+    def __init__(self, *, instructions: str, memory_llm: llm.LLM | None = None,
+                 store: MemoryStore | None = None, memory: "asyncio.Future[UserMemory] | None" = None):
+        super().__init__(instructions=instructions)
+        self._memory_llm = memory_llm
+        self._store = store
+        self._memory = memory  # resolved once the user's identity is known
+        self._folded_ids: set[str] = set()
+        self._used_fact_ids: set[int] = set()
+        self._fold_lock = asyncio.Lock()
+        self._fold_tasks: set[asyncio.Task] = set()
+
+    async def on_user_turn_completed(self, turn_ctx: llm.ChatContext, new_message: llm.ChatMessage) -> None:
+        if len(turn_ctx.items) > MAX_CHAT_ITEMS:
+            kept = turn_ctx.copy().truncate(max_items=KEEP_CHAT_ITEMS)
+            kept_ids = {item.id for item in kept.items}
+            dropped = [item for item in turn_ctx.items if item.id not in kept_ids]
+            turn_ctx.items = list(kept.items)
+            await self.update_chat_ctx(kept)
+            self._fold_in_background(dropped)
+
+        if self._memory is None or not new_message.text_content:
+            return
+        memory = await self._memory
+        prompt, used_ids = memory_prompt(memory, new_message.text_content)
+        if prompt:
+            # Only part of this reply's prompt; Agent.chat_ctx is left unchanged
+            turn_ctx.add_message(role="system", content=prompt)
+            self._used_fact_ids.update(used_ids)
+
+    def _fold_in_background(self, items: list[llm.ChatItem]) -> None:
+        task = asyncio.create_task(self._fold_logged(items))
+        self._fold_tasks.add(task)
+        task.add_done_callback(self._fold_tasks.discard)
+
+    async def fold(self, items: list[llm.ChatItem] | None = None) -> None:
+        """Summarize `items` (default: the unsaved part of the chat context) into the user's memory."""
+        # Nothing to save if the user never joined
+        if self._memory is None or self._memory_llm is None or not self._memory.done():
+            return
+        async with self._fold_lock:
+            if items is None:
+                items = self.chat_ctx.items
+            items = [item for item in items if item.id not in self._folded_ids]
+            transcript = _transcript(items)
+            if not transcript:
+                return
+            memory = await self._memory
+
+            chat_ctx = llm.ChatContext()
+            chat_ctx.add_message(role="system", content=FOLD_PROMPT)
+            chat_ctx.add_message(
+                role="user", content=f"Previous summary:\n{memory.summary or '(none)'}\n\nConversation:\n{transcript}"
+            )
+            try:
+                async with self._memory_llm.chat(chat_ctx=chat_ctx) as stream:
+                    reply = "".join([text async for text in stream.to_str_iterable()])
+                folded = json.loads(reply[reply.find("{"): reply.rfind("}") + 1])
+                summary = str(folded.get("summary") or memory.summary)
+                facts = [str(fact) for fact in folded.get("facts") or []]
+            except Exception as e:
+                logger.warning(f"Could not update memory for {memory.user_id}: {e}")
+                return
+
+            used_ids, self._used_fact_ids = self._used_fact_ids, set()
+            saved = await asyncio.to_thread(self._store.save, memory, summary, facts, used_ids)
+            # Swapped in on the event loop, in one step, so memory_prompt never sees them half updated
+            memory.summary = summary
+            memory.fact_ids, memory.facts, memory.vectors = saved
+            self._folded_ids.update(item.id for item in items)
+            logger.info(f"Updated memory for {memory.user_id}: {len(facts)} facts from {len(items)} messages")
+
+    async def _fold_logged(self, items: list[llm.ChatItem] | None = None) -> None:
+        """`fold`, logging its errors instead of raising them (into session shutdown, or an unawaited task)."""
+        try:
+            await self.fold(items)
+        except Exception as e:
+            logger.warning(f"Could not save memory: {e}")
+
+    async def save_memory(self) -> None:
+        """Finish background folds and save the rest of the conversation."""
+        if self._fold_tasks:
+            await asyncio.gather(*self._fold_tasks)
+        await self._fold_logged()
@@ -0,0 +1,101 @@
+"""Load reporting for the companion worker.
+
+LiveKit's default load function only looks at machine-wide CPU, so a worker
+keeps accepting rooms until the CPU saturates and every session's latency
+suffers. `CompanionLoad` reports the highest of:
+
+- sessions: active jobs / WORKER_MAX_SESSIONS
+- cpu: CPU used by the worker and its job processes (where Silero VAD runs),
+  as a share of the CPUs available to the container, averaged over ~2.5s
+- memory: RSS of the worker and its job processes / WORKER_MEMORY_BUDGET_MB,
+  only when a budget is set (system-wide memory use says nothing about this
+  worker, and often sits above the threshold on its own)
+
+Once the load reaches WORKER_LOAD_THRESHOLD the worker is marked full and the
+dispatcher sends new rooms to other workers. `benchmark.py` tells you how
+many sessions and how much CPU/memory one session needs.
+"""
+
+import logging
+import os
+import time
+
+import psutil
+
+from livekit.agents import utils
+from livekit.agents.utils.hw import get_cpu_monitor
+
+logger = logging.getLogger("ai-girlfriend-companion")
+
+WORKER_MAX_SESSIONS = int(os.getenv("WORKER_MAX_SESSIONS", 8))  # 0 disables the session limit
+WORKER_MEMORY_BUDGET_MB = float(os.getenv("WORKER_MEMORY_BUDGET_MB", 0))  # 0 leaves memory out
+WORKER_LOAD_THRESHOLD = float(os.getenv("WORKER_LOAD_THRESHOLD", 0.75))
+
+
+class CompanionLoad:
+    """`WorkerOptions.load_fnc`: called by the worker every 0.5s, off the event loop."""
+
+    def __init__(self, max_sessions: int = WORKER_MAX_SESSIONS, memory_budget_mb: float = WORKER_MEMORY_BUDGET_MB,
+                 threshold: float = WORKER_LOAD_THRESHOLD):
+        self.max_sessions = max_sessions
+        self.memory_budget_mb = memory_budget_mb
+        self.threshold = threshold
+        self.components: dict[str, float] = {}
+
+        self._cpu_count = get_cpu_monitor().cpu_count()
+        self._cpu_avg = utils.MovingAverage(5)
+        self._cpu_seconds: dict[int, float] = {}
+        self._sampled_at = None
+        self._procs: dict[int, psutil.Process] = {}
+        self._full = False
+
+    def _process_tree(self) -> list[psutil.Process]:
+        root = psutil.Process()
+        # Reuse Process objects so psutil doesn't re-create them every call
+        procs = [self._procs.setdefault(p.pid, p) for p in (root, *root.children(recursive=True))]
+        self._procs = {p.pid: p for p in procs}
+        return procs
+
+    def _sample_tree(self) -> tuple[float, int]:
+        """CPU seconds used since the previous sample, and total RSS, of the process tree."""
+        used = 0.0
+        rss = 0
+        cpu_seconds = {}
+        for proc in self._process_tree():
+            try:
+                with proc.oneshot():
+                    times = proc.cpu_times()
+                    rss += proc.memory_info().rss
+            except psutil.Error:
+                continue
+            total = times.user + times.system
+            cpu_seconds[proc.pid] = total
+            # Processes that appeared since the last sample count from their start
+            used += total - self._cpu_seconds.get(proc.pid, 0.0)
+        self._cpu_seconds = cpu_seconds
+        return max(0.0, used), rss
+
+    def __call__(self, worker) -> float:
+        now = time.monotonic()
+        cpu_used, rss = self._sample_tree()
+        if self._sampled_at is not None:
+            self._cpu_avg.add_sample(cpu_used / ((now - self._sampled_at) * self._cpu_count))
+        self._sampled_at = now
+
+        components = {"cpu": min(1.0, self._cpu_avg.get_avg())}
+        if self.max_sessions:
+            components["sessions"] = len(worker.active_jobs) / self.max_sessions
+        if self.memory_budget_mb:
+            components["memory"] = rss / 2**20 / self.memory_budget_mb
+        self.components = components
+
+        load = min(1.0, max(components.values()))
+        full = load >= self.threshold
+        if full != self._full:
+            self._full = full
+            details = ", ".join(f"{name}={value:.2f}" for name, value in components.items())
+            if full:
+                logger.info(f"Worker at capacity (load {load:.2f} >= {self.threshold}): {details}")
+            else:
+                logger.info(f"Worker accepting sessions again (load {load:.2f}): {details}")
+        return load
@@ -1,5 +1,5 @@
 import { AccessToken, AccessTokenOptions, VideoGrant } from "livekit-server-sdk";
-import { NextResponse } from "next/server";
+import { NextRequest, NextResponse } from "next/server";
 
 // NOTE: you are expected to define the following environment variables in `.env.local`:
 const API_KEY = process.env.LIVEKIT_API_KEY;
@@ -9,6 +9,10 @@ const LIVEKIT_URL = process.env.LIVEKIT_URL;
 // don't cache the results
 export const revalidate = 0;
 
+// Keeps the participant identity stable across visits so the agent can
+// remember the user between sessions
+const USER_ID_COOKIE = "companion_user_id";
+
 export type ConnectionDetails = {
   serverUrl: string;
   roomName: string;
@@ -16,7 +20,7 @@ export type ConnectionDetails = {
   participantToken: string;
 };
 
-export async function GET() {
+export async function GET(request: NextRequest) {
   try {
     if (LIVEKIT_URL === undefined) {
       throw new Error("LIVEKIT_URL is not defined");
@@ -29,7 +33,8 @@ export async function GET() {
     }
 
     // Generate participant token
-    const participantIdentity = `voice_assistant_user_${crypto.randomUUID()}`;
+    const userId = request.cookies.get(USER_ID_COOKIE)?.value ?? crypto.randomUUID();
+    const participantIdentity = `voice_assistant_user_${userId}`;
     const roomName = `voice_assistant_room_${crypto.randomUUID()}`;
     const participantToken = await createParticipantToken(
       { identity: participantIdentity },
@@ -46,7 +51,14 @@ export async function GET() {
     const headers = new Headers({
       "Cache-Control": "no-store",
     });
-    return NextResponse.json(data, { headers });
+    const response = NextResponse.json(data, { headers });
+    response.cookies.set(USER_ID_COOKIE, userId, {
+      httpOnly: true,
+      sameSite: "lax",
+      secure: process.env.NODE_ENV === "production",
+      maxAge: 60 * 60 * 24 * 365,
+    });
+    return response;
   } catch (error) {
     if (error instanceof Error) {
       console.error(error);
@@ -8,18 +8,35 @@ import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 from dotenv import load_dotenv
 import random
+import threading
+import time
 import numpy as np
 
 # LangChain and LLM imports
 from langchain_community.llms import OpenAI
 from langchain_openai import OpenAIEmbeddings
 from langchain_community.embeddings import HuggingFaceEmbeddings
-from langchain_chroma import Chroma
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain.chains import RetrievalQA
 from langchain_google_genai import GoogleGenerativeAI, GoogleGenerativeAIEmbeddings
 from langchain_anthropic import Anthropic
 
+from batch_analysis import BATCH_MAX_COMPETITORS, BatchAnalysis, BatchCancelled, parse_watchlist, provider_limits
+from collection_migration import collection_name, start_migration
+from embedding_cache import CachedEmbeddings, text_hash
+from grounding import GROUNDED_TOP_K, RetrievalCache, count_tokens, pack_context
+from hybrid_search import HybridChroma, HybridRetriever
+from ingestion import INGEST_WORKERS, SUPPORTED_EXTENSIONS, ingest_directory
+from llm_cache import LLMResponseCache, llm_id, normalized
+from metadata_filters import parse_filter, typed_metadata
+from prompts import (
+    competitor_analysis_prompt,
+    grounded_competitor_analysis_prompt,
+    grounded_market_report_prompt,
+    market_report_prompt,
+)
+from resource_cache import ResourceCache, ResourceLeases, key_fingerprint
+
 # Load environment variables
 load_dotenv()
 
@@ -29,6 +46,21 @@ st.set_page_config(
     layout="wide"
 )
 
+@st.cache_resource
+def get_resource_cache():
+    """LLM/embedding/vector store cache shared by all sessions of this server"""
+    return ResourceCache()
+
+@st.cache_resource
+def get_llm_cache():
+    """LLM response cache shared by all sessions of this server"""
+    return LLMResponseCache()
+
+@st.cache_resource
+def get_retrieval_cache():
+    """Retrieved documents of grounded analyses, shared by all sessions of this server"""
+    return RetrievalCache()
+
 class ConfigurationManager:
     """Manage API keys and model configurations"""
     
@@ -116,12 +148,20 @@ class CompetitiveIntelligencePlatform:
         self.qa_chain = None
         self.current_provider = None
         self.current_model = None
+        self.current_temperature = None
+        # Handles on the shared objects above, see resource_cache.py
+        self.resource_leases = None
+        self.migration = None
+        self.llm_cache = None
+        self.retrieval_cache = None
         
         # Data storage
         self.competitor_analyses = []
         self.market_reports = []
         self.intelligence_alerts = []
         self.intelligence_stats = {}
+        # Batch analyses append from worker threads
+        self.history_lock = threading.Lock()
         
         # Vectorstore path
         self.vectorstore_path = "./competitive_intelligence_db"
@@ -146,6 +186,63 @@ class CompetitiveIntelligencePlatform:
             }
         }
     
+    def build_llm(self, provider, model_name, api_key, temperature):
+        """Create the LLM client for a provider"""
+        if provider == 'OpenAI':
+            return OpenAI(
+                openai_api_key=api_key,
+                temperature=temperature,
+                model_name=model_name
+            )
+        elif provider == 'Google Gemini':
+            return GoogleGenerativeAI(
+                google_api_key=api_key,
+                model=model_name,
+                temperature=temperature
+            )
+        elif provider == 'Anthropic':
+            return Anthropic(
+                anthropic_api_key=api_key,
+                model_name=model_name,
+                temperature=temperature
+            )
+        raise ValueError(f"Unknown provider: {provider}")
+    
+    def embeddings_spec(self, provider, api_key):
+        """Resource cache key and factory for a provider's embeddings"""
+        if provider == 'OpenAI':
+            return ('embeddings', 'openai', 'text-embedding-ada-002', key_fingerprint(api_key)), lambda: OpenAIEmbeddings(
+                openai_api_key=api_key,
+                model="text-embedding-ada-002"
+            )
+        elif provider == 'Google Gemini':
+            return ('embeddings', 'gemini', 'models/embedding-001', key_fingerprint(api_key)), lambda: GoogleGenerativeAIEmbeddings(
+                google_api_key=api_key,
+                model="models/embedding-001"
+            )
+        elif provider == 'Anthropic':
+            # For Anthropic, use HuggingFace embeddings or OpenAI if available
+            openai_key = st.session_state.get('openai_api_key_for_embeddings', '')
+            if openai_key:
+                return self.embeddings_spec('OpenAI', openai_key)
+            # The local model needs no key, so every Anthropic session shares one copy
+            return ('embeddings', 'huggingface', 'sentence-transformers/all-mpnet-base-v2', None), lambda: HuggingFaceEmbeddings(
+                model_name="sentence-transformers/all-mpnet-base-v2"
+            )
+        raise ValueError(f"Unknown provider: {provider}")
+    
+    def build_vectorstore(self, embeddings):
+        """Chroma collection for an embedding model, with its BM25 index in sync"""
+        vectorstore = HybridChroma(
+            collection_name=collection_name(embeddings.model),
+            embedding_function=embeddings,
+            persist_directory=self.vectorstore_path,
+            collection_metadata={'embedding_model': embeddings.model}
+        )
+        # Index records stored before keyword search was added
+        vectorstore.sync_bm25()
+        return vectorstore
+    
     def initialize_system(self, provider, model_name, api_key, temperature=0.1):
         """Initialize the system with selected provider and model"""
         try:
@@ -153,67 +250,53 @@ class CompetitiveIntelligencePlatform:
                 st.error("Please provide an API key")
                 return False
             
-            # Initialize LLM based on provider
-            if provider == 'OpenAI':
-                self.llm = OpenAI(
-                    openai_api_key=api_key,
-                    temperature=temperature,
-                    model_name=model_name
-                )
-                self.embeddings = OpenAIEmbeddings(
-                    openai_api_key=api_key,
-                    model="text-embedding-ada-002"
-                )
-            
-            elif provider == 'Google Gemini':
-                self.llm = GoogleGenerativeAI(
-                    google_api_key=api_key,
-                    model=model_name,
-                    temperature=temperature
-                )
-                self.embeddings = GoogleGenerativeAIEmbeddings(
-                    google_api_key=api_key,
-                    model="models/embedding-001"
-                )
-            
-            elif provider == 'Anthropic':
-                self.llm = Anthropic(
-                    anthropic_api_key=api_key,
-                    model_name=model_name,
-                    temperature=temperature
-                )
-                # For Anthropic, use HuggingFace embeddings or OpenAI if available
-                openai_key = st.session_state.get('openai_api_key_for_embeddings', '')
-                if openai_key:
-                    self.embeddings = OpenAIEmbeddings(
-                        openai_api_key=openai_key,
-                        model="text-embedding-ada-002"
-                    )
-                else:
-                    self.embeddings = HuggingFaceEmbeddings(
-                        model_name="sentence-transformers/all-mpnet-base-v2"
-                    )
+            # LLM, embeddings, vector store and QA chain are shared with other
+            # sessions using the same provider, model and key
+            leases = ResourceLeases(get_resource_cache(), self)
+            try:
+                llm_key = ('llm', provider, model_name, temperature, key_fingerprint(api_key))
+                llm = leases.acquire(llm_key, lambda: self.build_llm(provider, model_name, api_key, temperature))
+                
+                # Vectors are cached on disk per embedding model, whatever the provider
+                embeddings_key, build_embeddings = self.embeddings_spec(provider, api_key)
+                embeddings = leases.acquire(embeddings_key, lambda: CachedEmbeddings(
+                    build_embeddings(),
+                    model=f"{embeddings_key[1]}/{embeddings_key[2]}"
+                ))
+                
+                # Initialize vector store
+                vectorstore_key = ('vectorstore', self.vectorstore_path, embeddings_key)
+                vectorstore = leases.acquire(vectorstore_key, lambda: self.build_vectorstore(embeddings))
+                
+                # Initialize QA chain
+                qa_chain = leases.acquire(('qa_chain', llm_key, vectorstore_key), lambda: RetrievalQA.from_chain_type(
+                    llm=llm,
+                    chain_type="stuff",
+                    retriever=HybridRetriever(vectorstore=vectorstore, k=4),
+                    return_source_documents=True
+                ))
+            except Exception:
+                leases.release_all()
+                raise
             
-            # Initialize vector store
-            self.vectorstore = Chroma(
-                embedding_function=self.embeddings,
-                persist_directory=self.vectorstore_path
-            )
+            # Drop this session's hold on the previous configuration
+            if self.resource_leases is not None:
+                self.resource_leases.release_all()
+            self.resource_leases = leases
+            self.llm, self.embeddings, self.vectorstore, self.qa_chain = llm, embeddings, vectorstore, qa_chain
+            # Resolved here: batch analyses run outside the Streamlit script thread
+            self.llm_cache = get_llm_cache()
+            self.retrieval_cache = get_retrieval_cache()
             
-            # Initialize QA chain
-            self.qa_chain = RetrievalQA.from_chain_type(
-                llm=self.llm,
-                chain_type="stuff",
-                retriever=self.vectorstore.as_retriever(search_kwargs={"k": 4}),
-                return_source_documents=True
-            )
-            
-            # Initialize sample data
-            self.initialize_sample_competitive_data()
+            # Copy over records stored with another embedding model, or start from the samples
+            self.migration = start_migration(self.vectorstore)
+            if self.migration is None:
+                self.initialize_sample_competitive_data()
             
             # Store current configuration
             self.current_provider = provider
             self.current_model = model_name
+            self.current_temperature = temperature
             
             return True
             
@@ -223,14 +306,6 @@ class CompetitiveIntelligencePlatform:
     
     def initialize_sample_competitive_data(self):
         """Initialize sample competitive intelligence data for demonstration"""
-        # Check if data already exists
-        try:
-            existing_data = self.vectorstore.get()
-            if existing_data and len(existing_data.get('ids', [])) > 0:
-                return  # Data already exists
-        except:
-            pass
-        
         sample_data = [
             {
                 'competitor': 'TechCorp Inc.',
@@ -279,140 +354,180 @@ class CompetitiveIntelligencePlatform:
             }
         ]
         
-        for data in sample_data:
-            self.vectorstore.add_texts(
-                texts=[data['content']],
-                metadatas=[{
-                    'competitor': data['competitor'],
-                    'industry': data['industry'],
-                    'market_position': data['market_position'],
-                    'threat_level': data['threat_level'],
-                    'revenue': str(data['revenue']),
-                    'market_share': str(data['market_share'])
-                }]
-            )
+        # Numbers are stored as numbers, so retrieval can filter on ranges
+        texts = [data['content'] for data in sample_data]
+        ids = [text_hash(text) for text in texts]
+        metadatas = [{
+            'competitor': data['competitor'],
+            'industry': data['industry'],
+            'market_position': data['market_position'],
+            'threat_level': data['threat_level'],
+            'revenue': data['revenue'],
+            'market_share': data['market_share']
+        } for data in sample_data]
+        
+        # Check if data already exists; fetches at most one ID, however big the store is
+        try:
+            if self.vectorstore.get(limit=1, include=[])['ids']:
+                # Stores seeded by earlier versions hold revenue and market share as strings
+                existing = self.vectorstore.get(ids=ids, include=['metadatas'])
+                stale = [(i, typed_metadata(m)) for i, m in zip(existing['ids'], existing['metadatas'])
+                         if typed_metadata(m) != m]
+                if stale:
+                    self.vectorstore._collection.update(ids=[i for i, _ in stale], metadatas=[m for _, m in stale])
+                return  # Data already exists
+        except Exception:
+            pass
+        
+        # One batched embedding call; IDs derived from the content make re-runs upserts
+        self.vectorstore.add_texts(texts=texts, metadatas=metadatas, ids=ids)
     
-    def analyze_competitor(self, competitor_data, analysis_type):
+    def ingest_documents(self, directory, on_progress=None):
+        """Index a directory of competitor documents (txt/md/html/pdf) into the vector store"""
+        try:
+            # The manifest lives next to the Chroma files it describes
+            manifest_path = os.path.join(self.vectorstore_path, "ingest_manifest.db")
+            return ingest_directory(directory, self.vectorstore, manifest_path, on_progress=on_progress)
+        except Exception as e:
+            return f"Error ingesting documents: {str(e)}"
+        finally:
+            # Replaced chunks leave the record count unchanged, so cached retrievals can't tell
+            if self.retrieval_cache is not None:
+                self.retrieval_cache.clear()
+    
+    def search_knowledge(self, query, filter_text="", k=8):
+        """Retrieve stored intelligence for a query, optionally filtered on metadata"""
+        try:
+            retriever = HybridRetriever(vectorstore=self.vectorstore, k=k, filter=parse_filter(filter_text))
+            return retriever.invoke(query)
+        except Exception as e:
+            return f"Error searching knowledge base: {str(e)}"
+    
+    def generate(self, prompt, kind, inputs, on_token=None, before_llm_call=None):
+        """(LLM response, cache tier or None, seconds to first token).
+        
+        The response is streamed from the provider; `on_token` receives the
+        text generated so far after every chunk. The semantic cache tier
+        compares `inputs` (the user's text) between requests of the same
+        `kind`; the options chosen in the UI go into `kind`.
+        `before_llm_call()` runs only when the cache misses (batch rate limits).
+        """
+        def embed():
+            return normalized(self.embeddings.embed_query(inputs))
+        
+        started = time.perf_counter()
+        cache = self.llm_cache
+        llm = llm_id(self.current_provider, self.current_model, self.current_temperature)
+        response, tier, vector = cache.lookup(llm, prompt, kind, embed, self.embeddings.model)
+        if tier:
+            if on_token:
+                on_token(response)
+            return response, tier, time.perf_counter() - started
+        
+        if before_llm_call:
+            before_llm_call()
+        response = ""
+        time_to_first_token = None
+        for chunk in self.llm.stream(prompt):
+            if time_to_first_token is None:
+                time_to_first_token = time.perf_counter() - started
+            response += chunk
+            if on_token:
+                on_token(response)
+        cache.store(llm, prompt, response, kind, vector, self.embeddings.model)
+        return response, None, time_to_first_token
+    
+    def grounding_context(self, query):
+        """(packed context, grounding details) for a query, from the QA chain's retriever"""
+        started = time.perf_counter()
+        retriever = self.qa_chain.retriever.model_copy(update={'k': GROUNDED_TOP_K})
+        documents, cached = self.retrieval_cache.retrieve(retriever, query)
+        context, excerpts, context_tokens = pack_context(documents)
+        return context, {
+            'excerpts': excerpts,
+            'context_tokens': context_tokens,
+            'retrieval_time': time.perf_counter() - started,
+            'retrieval_cached': cached
+        }
+    
+    def analyze_competitor(self, competitor_data, analysis_type, on_token=None, grounded=False, before_llm_call=None):
         """Analyze competitor with intelligent insights"""
         try:
-            analysis_prompt = f"""
-            Analyze the following competitor data:
-            
-            Competitor Data: {competitor_data}
-            Analysis Type: {analysis_type}
-            
-            Please provide comprehensive competitive analysis including:
-            
-            1. COMPETITOR PROFILE ANALYSIS:
-               - Company overview and business model assessment
-               - Market position and competitive positioning
-               - Financial performance and growth trajectory
-               - Organizational structure and leadership analysis
-            
-            2. COMPETITIVE STRENGTHS AND WEAKNESSES:
-               - Core competencies and competitive advantages
-               - Market strengths and differentiation factors
-               - Operational weaknesses and vulnerabilities
-               - Strategic gaps and improvement opportunities
-            
-            3. MARKET STRATEGY EVALUATION:
-               - Go-to-market strategy and approach
-               - Product and service portfolio analysis
-               - Pricing strategy and value proposition
-               - Customer acquisition and retention strategies
-            
-            4. COMPETITIVE THREAT ASSESSMENT:
-               - Direct and indirect competitive threats
-               - Market disruption potential and innovation capacity
-               - Competitive response capabilities and agility
-               - Strategic threat level and impact evaluation
-            
-            5. PERFORMANCE BENCHMARKING:
-               - Financial performance comparison and metrics
-               - Market share and growth rate analysis
-               - Operational efficiency and productivity metrics
-               - Customer satisfaction and loyalty indicators
-            
-            6. STRATEGIC RECOMMENDATIONS:
-               - Competitive response strategies and tactics
-               - Defensive and offensive strategic options
-               - Market positioning and differentiation opportunities
-               - Competitive monitoring and intelligence priorities
-            
-            Provide actionable competitive intelligence insights and strategic recommendations.
-            """
-            
-            competitor_analysis = self.llm(analysis_prompt)
-            
-            analysis_entry = {
-                'id': len(self.competitor_analyses) + 1,
-                'timestamp': datetime.now().isoformat(),
-                'competitor_data': competitor_data,
-                'analysis_type': analysis_type,
-                'analysis': competitor_analysis,
-                'threat_score': random.uniform(60, 95),
-                'competitive_strength': random.uniform(70, 90),
-                'market_impact': random.choice(['Low', 'Medium', 'High', 'Critical']),
-                'provider': self.current_provider,
-                'model': self.current_model
-            }
+            started = time.perf_counter()
+            kind = f"competitor_analysis/{analysis_type}"
+            if grounded:
+                context, grounding = self.grounding_context(f"{competitor_data}\n{analysis_type}")
+                analysis_prompt = grounded_competitor_analysis_prompt(competitor_data, analysis_type, context)
+                grounding['standard_prompt_tokens'] = count_tokens(competitor_analysis_prompt(competitor_data, analysis_type))
+                # A semantic hit must have been answered from the same excerpts, not those before an ingestion
+                kind += f"/grounded/{text_hash(context)}"
+            else:
+                analysis_prompt = competitor_analysis_prompt(competitor_data, analysis_type)
+                grounding = None
+            
+            competitor_analysis, cached, time_to_first_token = self.generate(
+                analysis_prompt, kind, competitor_data, on_token, before_llm_call
+            )
             
-            self.competitor_analyses.append(analysis_entry)
+            with self.history_lock:
+                analysis_entry = {
+                    'id': len(self.competitor_analyses) + 1,
+                    'timestamp': datetime.now().isoformat(),
+                    'competitor_data': competitor_data,
+                    'analysis_type': analysis_type,
+                    'analysis': competitor_analysis,
+                    'threat_score': random.uniform(60, 95),
+                    'competitive_strength': random.uniform(70, 90),
+                    'market_impact': random.choice(['Low', 'Medium', 'High', 'Critical']),
+                    'provider': self.current_provider,
+                    'model': self.current_model,
+                    'cached': cached,
+                    'time_to_first_token': time_to_first_token,
+                    'generation_time': time.perf_counter() - started,
+                    'prompt_tokens': count_tokens(analysis_prompt),
+                    'grounding': grounding
+                }
+                
+                self.competitor_analyses.append(analysis_entry)
             
             return analysis_entry
             
+        except BatchCancelled:
+            raise
         except Exception as e:
             return f"Error analyzing competitor: {str(e)}"
     
-    def generate_market_intelligence_report(self, market_context, report_scope):
+    def start_batch_analysis(self, competitors, analysis_type, grounded=False):
+        """Analyze a watchlist in a background thread, within the provider's limits"""
+        batch = BatchAnalysis(
+            competitors,
+            lambda competitor, before_llm_call: self.analyze_competitor(
+                competitor, analysis_type, grounded=grounded, before_llm_call=before_llm_call
+            ),
+            self.current_provider
+        )
+        batch.start()
+        return batch
+    
+    def generate_market_intelligence_report(self, market_context, report_scope, time_horizon=None, on_token=None,
+                                            grounded=False):
         """Generate comprehensive market intelligence report"""
         try:
-            report_prompt = f"""
-            Generate market intelligence report for: {market_context}
-            Report Scope: {report_scope}
-            
-            Please provide comprehensive market intelligence including:
-            
-            1. MARKET LANDSCAPE OVERVIEW:
-               - Market size, growth, and dynamics analysis
-               - Key market segments and customer demographics
-               - Market trends and driving factors
-               - Regulatory environment and compliance requirements
-            
-            2. COMPETITIVE LANDSCAPE ANALYSIS:
-               - Major competitors and market leaders identification
-               - Competitive positioning and market share analysis
-               - Competitive strategies and differentiation approaches
-               - New entrants and emerging competitive threats
-            
-            3. MARKET OPPORTUNITIES AND THREATS:
-               - Growth opportunities and market gaps identification
-               - Emerging market trends and technology disruptions
-               - Competitive threats and market challenges
-               - Strategic opportunities for market entry and expansion
-            
-            4. CUSTOMER AND DEMAND ANALYSIS:
-               - Customer needs and preferences assessment
-               - Demand patterns and purchasing behavior analysis
-               - Customer satisfaction and loyalty evaluation
-               - Market demand forecasting and projections
-            
-            5. TECHNOLOGY AND INNOVATION TRENDS:
-               - Technology trends and innovation developments
-               - Disruptive technologies and market impact
-               - Innovation strategies and R&D investments
-               - Technology adoption and market readiness
-            
-            6. STRATEGIC MARKET INSIGHTS:
-               - Market entry and expansion strategies
-               - Competitive positioning and differentiation recommendations
-               - Partnership and alliance opportunities
-               - Market timing and strategic priorities
-            
-            Provide actionable market intelligence with strategic insights and recommendations.
-            """
-            
-            market_report = self.llm(report_prompt)
+            started = time.perf_counter()
+            scope = f"market_report/{report_scope}/{time_horizon}"
+            inputs = market_context
+            if time_horizon:
+                market_context = f"{market_context} | Time Horizon: {time_horizon}"
+            if grounded:
+                context, grounding = self.grounding_context(f"{inputs}\n{report_scope}")
+                report_prompt = grounded_market_report_prompt(market_context, report_scope, context)
+                grounding['standard_prompt_tokens'] = count_tokens(market_report_prompt(market_context, report_scope))
+                scope += f"/grounded/{text_hash(context)}"
+            else:
+                report_prompt = market_report_prompt(market_context, report_scope)
+                grounding = None
+            
+            market_report, cached, time_to_first_token = self.generate(report_prompt, scope, inputs, on_token)
             
             report_entry = {
                 'id': len(self.market_reports) + 1,
@@ -423,7 +538,12 @@ class CompetitiveIntelligencePlatform:
                 'market_attractiveness': random.uniform(70, 95),
                 'competitive_intensity': random.uniform(60, 90),
                 'provider': self.current_provider,
-                'model': self.current_model
+                'model': self.current_model,
+                'cached': cached,
+                'time_to_first_token': time_to_first_token,
+                'generation_time': time.perf_counter() - started,
+                'prompt_tokens': count_tokens(report_prompt),
+                'grounding': grounding
             }
             
             self.market_reports.append(report_entry)
@@ -531,6 +651,15 @@ class CompetitiveIntelligencePlatform:
         
         return filename, json.dumps(export_data, indent=2)
 
+def grounding_summary(entry):
+    """One-line description of the context a grounded analysis or report used"""
+    grounding = entry['grounding']
+    return (
+        f"Grounded in {grounding['excerpts']} excerpts ({grounding['context_tokens']} tokens, retrieved in "
+        f"{grounding['retrieval_time'] * 1000:.0f} ms{', cached' if grounding['retrieval_cached'] else ''}) · "
+        f"prompt {entry['prompt_tokens']} tokens vs {grounding['standard_prompt_tokens']} for the standard prompt"
+    )
+
 def main():
     st.title("🎯 Competitive Intelligence Platform")
     st.caption("AI-powered competitive analysis and market intelligence")
@@ -553,12 +682,21 @@ def main():
         
         mode = st.selectbox(
             "Choose Service",
-            ["Competitor Analysis", "Market Intelligence", "Intelligence Dashboard"],
+            ["Competitor Analysis", "Batch Analysis", "Market Intelligence", "Intelligence Dashboard", "Knowledge Search", "Document Ingestion"],
             help="Select the type of competitive intelligence service"
         )
         st.divider()
         if st.session_state.system_initialized and intelligence_system.llm:
             st.success(f"✅ Active LLM: {intelligence_system.current_provider} - {intelligence_system.current_model}")
+            migration = intelligence_system.migration
+            if migration is not None and migration.is_alive():
+                st.progress(migration.progress, text=f"Re-embedding {migration.total} records from {migration.source.name}")
+            cache_stats = intelligence_system.llm_cache.stats()
+            st.caption(
+                f"Response cache: {cache_stats['hit_rate']:.0%} hit rate "
+                f"({cache_stats['exact_hits']} exact, {cache_stats['semantic_hits']} similar, "
+                f"{cache_stats['misses']} misses) · {cache_stats['entries']} stored"
+            )
         
         with st.expander("⚙️ System Configuration", expanded=False):
             st.markdown("### LLM Configuration")
@@ -773,10 +911,13 @@ def main():
         ### 📊 Features
         
         - **Competitor Analysis**: Comprehensive competitor profiling and threat assessment
+        - **Batch Analysis**: Analyze a watchlist of competitors concurrently, from a list or CSV
         - **Market Intelligence**: Market trends and competitive landscape analysis
         - **Strategic Insights**: Strategic positioning and opportunity identification
         - **Performance Benchmarking**: Competitive performance comparison
         - **Intelligence Dashboard**: Visual analytics and KPI tracking
+        - **Knowledge Search**: Search stored intelligence with metadata filters (threat level, industry, revenue ranges)
+        - **Document Ingestion**: Index directories of filings, press releases and web captures
         - **Configuration Management**: Save and reuse API keys and model settings
         """)
         
@@ -809,16 +950,29 @@ def main():
                 help="Choose the competitor category"
             )
         
+        grounded = st.checkbox(
+            "📚 Ground in knowledge base",
+            value=False,
+            help="Retrieve the most relevant stored documents and send a compact prompt that cites them"
+        )
+        
         if st.button("🎯 Analyze Competitor", type="primary", disabled=not competitor_data):
+            heading = st.empty()
+            message_placeholder = st.empty()
+            
+            def show_tokens(text):
+                heading.markdown("### 💡 Competitor Analysis")
+                message_placeholder.markdown(text + "▌")
+            
             with st.spinner("Analyzing competitor data..."):
-                result = intelligence_system.analyze_competitor(competitor_data, analysis_type)
+                result = intelligence_system.analyze_competitor(
+                    competitor_data, analysis_type, on_token=show_tokens, grounded=grounded
+                )
                 
                 if isinstance(result, dict):
+                    message_placeholder.markdown(result['analysis'])
                     st.success("✅ Competitor analysis complete!")
                     
-                    st.markdown("### 💡 Competitor Analysis")
-                    st.markdown(result['analysis'])
-                    
                     col1, col2, col3 = st.columns(3)
                     
                     with col1:
@@ -831,9 +985,91 @@ def main():
                         st.metric("Market Impact", result['market_impact'])
                     
                     st.info(f"Analysis generated using: {result['provider']} - {result['model']}")
+                    if result['cached']:
+                        st.caption(f"Served from the response cache ({result['cached']} match)")
+                    elif result['time_to_first_token'] is not None:
+                        st.caption(
+                            f"First token after {result['time_to_first_token']:.1f}s · "
+                            f"complete after {result['generation_time']:.1f}s"
+                        )
+                    if result['grounding']:
+                        st.caption(grounding_summary(result))
                 else:
+                    heading.empty()
+                    message_placeholder.empty()
                     st.error(result)
     
+    elif mode == "Batch Analysis":
+        st.header("📋 Batch Competitor Analysis")
+        
+        watchlist_text = st.text_area(
+            "Watchlist",
+            placeholder="One competitor per line, e.g. 'Acme Corp - cloud storage, 15% market share, aggressive pricing'",
+            height=150,
+            help="Each line is analyzed separately"
+        )
+        watchlist_file = st.file_uploader(
+            "Or upload a CSV",
+            type=["csv"],
+            help="Uses the 'competitor' column (other columns are added as details), or the first column"
+        )
+        batch_analysis_type = st.selectbox(
+            "Analysis Type",
+            ["Comprehensive Analysis", "Threat Assessment", "Strategic Analysis", "Financial Analysis", "Market Position Analysis"],
+            key="batch_analysis_type",
+            help="Applied to every competitor in the watchlist"
+        )
+        batch_grounded = st.checkbox(
+            "📚 Ground in knowledge base",
+            value=False,
+            key="batch_grounded",
+            help="Retrieve the most relevant stored documents for each competitor"
+        )
+        
+        competitors = parse_watchlist(watchlist_text, watchlist_file)
+        batch = st.session_state.get("batch_analysis")
+        running = batch is not None and batch.is_alive()
+        
+        if competitors and intelligence_system.current_provider:
+            limits = provider_limits(intelligence_system.current_provider)
+            st.caption(
+                f"{len(competitors)} competitors · up to {limits.concurrency} analyses at a time on "
+                f"{intelligence_system.current_provider}"
+            )
+        
+        col1, col2 = st.columns(2)
+        with col1:
+            if st.button("🚀 Analyze Watchlist", type="primary", disabled=not competitors or running):
+                if len(competitors) > BATCH_MAX_COMPETITORS:
+                    st.error(f"Watchlists are limited to {BATCH_MAX_COMPETITORS} competitors")
+                else:
+                    batch = intelligence_system.start_batch_analysis(competitors, batch_analysis_type, batch_grounded)
+                    st.session_state.batch_analysis = batch
+                    running = True
+        with col2:
+            if st.button("⏹️ Cancel", disabled=not running):
+                batch.cancel()
+        
+        if batch is not None:
+            st.progress(batch.progress, text=f"{batch.done}/{batch.total} analyses · {batch.elapsed:.0f}s")
+            if not batch.is_alive():
+                if batch.cancelled.is_set():
+                    st.warning(f"Cancelled after {batch.done} of {batch.total} analyses")
+                else:
+                    st.success(f"✅ Analyzed {batch.total} competitors in {batch.elapsed:.1f}s")
+            
+            for competitor, result in reversed(batch.snapshot()):
+                if isinstance(result, dict):
+                    with st.expander(f"🎯 {competitor[:80]} · Threat {result['threat_score']:.1f}% · {result['market_impact']} impact"):
+                        st.markdown(result['analysis'])
+                        if result['cached']:
+                            st.caption(f"Served from the response cache ({result['cached']} match)")
+                        if result['grounding']:
+                            st.caption(grounding_summary(result))
+                else:
+                    with st.expander(f"⚠️ {competitor[:80]}"):
+                        st.error(result)
+    
     elif mode == "Market Intelligence":
         st.header("📊 Market Intelligence Report")
         
@@ -860,19 +1096,40 @@ def main():
                 help="Choose the analysis time horizon"
             )
         
+        report_grounded = st.checkbox(
+            "📚 Ground in knowledge base",
+            value=False,
+            key="report_grounded",
+            help="Retrieve the most relevant stored documents and send a compact prompt that cites them"
+        )
+        
         if st.button("📊 Generate Intelligence Report", type="primary", disabled=not market_context):
+            st.markdown("### 📊 Market Intelligence Report")
+            message_placeholder = st.empty()
+            
+            def show_tokens(text):
+                message_placeholder.markdown(text + "▌")
+            
             with st.spinner("Generating comprehensive market intelligence report..."):
-                context = f"{market_context} | Time Horizon: {time_horizon}"
-                report = intelligence_system.generate_market_intelligence_report(context, report_scope)
+                report = intelligence_system.generate_market_intelligence_report(
+                    market_context, report_scope, time_horizon, on_token=show_tokens, grounded=report_grounded
+                )
+                message_placeholder.markdown(report)
                 
                 st.success("✅ Market intelligence report generated!")
                 
-                st.markdown("### 📊 Market Intelligence Report")
-                st.markdown(report)
-                
                 if intelligence_system.market_reports:
                     latest_report = intelligence_system.market_reports[-1]
                     st.info(f"Report generated using: {latest_report['provider']} - {latest_report['model']}")
+                    if latest_report['cached']:
+                        st.caption(f"Served from the response cache ({latest_report['cached']} match)")
+                    elif latest_report['time_to_first_token'] is not None:
+                        st.caption(
+                            f"First token after {latest_report['time_to_first_token']:.1f}s · "
+                            f"complete after {latest_report['generation_time']:.1f}s"
+                        )
+                    if latest_report['grounding']:
+                        st.caption(grounding_summary(latest_report))
     
     elif mode == "Intelligence Dashboard":
         st.header("📊 Intelligence Dashboard")
@@ -909,6 +1166,84 @@ def main():
         with col4:
             st.metric("Strategic Value", "9.1/10", "0.5")
     
+    elif mode == "Knowledge Search":
+        st.header("🔎 Knowledge Search")
+        
+        search_query = st.text_input(
+            "Search Query",
+            placeholder="e.g., cloud infrastructure leaders, NVDA revenue, pricing pressure",
+            help="Keywords and meaning are both matched"
+        )
+        filter_text = st.text_input(
+            "Filters (optional)",
+            placeholder="e.g., threat_level = High and market_share > 10%",
+            help="Clauses joined by 'and': threat_level/industry/market_position/competitor = or != a value, "
+                 "'in [A, B]', revenue and market_share with > >= < <= or 'between 500M and 3B'"
+        )
+        
+        if st.button("🔎 Search", type="primary", disabled=not search_query):
+            results = intelligence_system.search_knowledge(search_query, filter_text)
+            
+            if isinstance(results, str):
+                st.error(results)
+            elif not results:
+                st.info("No stored intelligence matches this query and filter.")
+            else:
+                for doc in results:
+                    metadata = doc.metadata
+                    title = metadata.get('competitor') or os.path.basename(metadata.get('source', 'Document'))
+                    with st.expander(title, expanded=True):
+                        st.markdown(doc.page_content)
+                        st.caption(" · ".join(f"{key}: {value}" for key, value in metadata.items()))
+    
+    elif mode == "Document Ingestion":
+        st.header("📥 Document Ingestion")
+        st.caption(f"Indexes {', '.join(sorted(SUPPORTED_EXTENSIONS))} files, parsed with {INGEST_WORKERS} worker processes. "
+                   "Only new or changed files are processed; interrupted runs resume where they stopped.")
+        
+        ingest_directory_path = st.text_input(
+            "Documents Directory",
+            placeholder="e.g., ./data/competitor_filings",
+            help="Directory (searched recursively) with competitor filings, press releases and web captures"
+        )
+        
+        if st.button("📥 Ingest Documents", type="primary", disabled=not ingest_directory_path):
+            progress_placeholder = st.empty()
+            
+            def show_progress(stats):
+                with progress_placeholder.container():
+                    col1, col2, col3, col4 = st.columns(4)
+                    col1.metric("Files", stats.files)
+                    col2.metric("Chunks Stored", stats.upserted)
+                    col3.metric("Chunks/s", f"{stats.chunks_per_second:.1f}")
+                    col4.metric("MB/s", f"{stats.megabytes_per_second:.2f}")
+            
+            with st.spinner("Ingesting documents..."):
+                result = intelligence_system.ingest_documents(ingest_directory_path, on_progress=show_progress)
+            
+            if isinstance(result, str):
+                st.error(result)
+            else:
+                show_progress(result)
+                st.success(
+                    f"✅ Stored {result.upserted} chunks from {result.files - result.failed} new or changed files "
+                    f"in {result.elapsed:.1f}s"
+                )
+                st.caption(
+                    f"{result.unchanged_files} files unchanged, {result.removed_files} removed · "
+                    f"{result.unchanged_chunks} chunks already stored, {result.duplicates} duplicates, "
+                    f"{result.deleted} deleted · {len(result.near_duplicates)} near-duplicate files skipped"
+                )
+                if result.near_duplicates:
+                    with st.expander(f"🔁 {len(result.near_duplicates)} near-duplicate files"):
+                        st.dataframe(pd.DataFrame(
+                            result.near_duplicates, columns=["File", "Duplicate Of", "Estimated Similarity"]
+                        ), use_container_width=True)
+                if result.errors:
+                    with st.expander(f"⚠️ {len(result.errors)} files could not be parsed"):
+                        for path, error in result.errors:
+                            st.text(f"{path}: {error}")
+    
     # Intelligence History
     if intelligence_system.competitor_analyses or intelligence_system.market_reports:
         st.header("📚 Intelligence History")
@@ -928,6 +1263,12 @@ def main():
                     st.markdown(f"Scope: {report['report_scope']} | Attractiveness: {report['market_attractiveness']:.1f}% | Intensity: {report['competitive_intensity']:.1f}%")
                     st.markdown(f"Context: {report['market_context'][:100]}...")
                     st.divider()
+    
+    # Show batch results as they finish
+    batch = st.session_state.get("batch_analysis")
+    if mode == "Batch Analysis" and batch is not None and batch.is_alive():
+        time.sleep(1)
+        st.rerun()
 
 if __name__ == "__main__":
     main()
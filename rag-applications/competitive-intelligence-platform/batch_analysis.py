@@ -0,0 +1,204 @@
+"""Concurrent competitor analysis for a watchlist.
+
+`analyze_competitor` handles one competitor per click and blocks the
+Streamlit script while the LLM answers. A `BatchAnalysis` thread runs a
+whole watchlist through a thread pool instead, so N competitors take
+about ceil(N / concurrency) times the slowest call rather than the sum of
+all calls. The page polls the batch and shows each result as it finishes.
+
+Providers limit how many requests run at once and how many start per
+minute. Each provider gets one `ProviderLimits` per process - a semaphore
+and a token-bucket `RateLimiter` - which every batch of every session
+shares, so two analysts running batches on the same provider don't double
+the load. A rate token is only taken when an analysis misses the LLM
+response cache, so cached answers don't wait on or use up the budget.
+Cancelling a batch drops the competitors not yet sent; calls already sent
+finish, and their results are kept.
+"""
+
+import csv
+import io
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+# Requests in flight and requests started per minute, per provider
+PROVIDER_CONCURRENCY = {
+    "OpenAI": int(os.getenv("OPENAI_MAX_CONCURRENCY", 8)),
+    "Google Gemini": int(os.getenv("GEMINI_MAX_CONCURRENCY", 4)),
+    "Anthropic": int(os.getenv("ANTHROPIC_MAX_CONCURRENCY", 4)),
+}
+PROVIDER_REQUESTS_PER_MINUTE = {
+    "OpenAI": float(os.getenv("OPENAI_REQUESTS_PER_MINUTE", 60)),
+    "Google Gemini": float(os.getenv("GEMINI_REQUESTS_PER_MINUTE", 60)),
+    "Anthropic": float(os.getenv("ANTHROPIC_REQUESTS_PER_MINUTE", 50)),
+}
+BATCH_MAX_COMPETITORS = int(os.getenv("BATCH_MAX_COMPETITORS", 200))
+
+_limits = {}
+_limits_lock = threading.Lock()
+
+
+class BatchCancelled(Exception):
+    """Raised by `before_llm_call` when the batch is cancelled while waiting for a rate token"""
+
+
+def parse_watchlist(text="", csv_file=None):
+    """Competitor descriptions from one-per-line text and/or a CSV upload, without repeats.
+
+    The CSV's `competitor` column is used if it has one (other columns are
+    appended as `name: value` details), otherwise the first column.
+    """
+    entries = [line.strip() for line in (text or "").splitlines() if line.strip()]
+    if csv_file is not None:
+        # Streamlit's uploads are BytesIO, read again on every rerun
+        content = csv_file.getvalue() if hasattr(csv_file, "getvalue") else csv_file.read()
+        if isinstance(content, bytes):
+            content = content.decode("utf-8-sig")
+        rows = list(csv.reader(io.StringIO(content)))
+        if rows:
+            header = [cell.strip() for cell in rows[0]]
+            lowered = [cell.lower() for cell in header]
+            if "competitor" in lowered:
+                column = lowered.index("competitor")
+                for row in rows[1:]:
+                    if len(row) > column and row[column].strip():
+                        details = [
+                            f"{header[i]}: {value.strip()}"
+                            for i, value in enumerate(row) if i != column and i < len(header) and value.strip()
+                        ]
+                        entries.append("; ".join([row[column].strip(), *details]))
+            else:
+                entries.extend(row[0].strip() for row in rows if row and row[0].strip())
+    return list(dict.fromkeys(entries))
+
+
+class RateLimiter:
+    """Token bucket: `per_minute` requests on average, bursts of up to `burst`"""
+
+    def __init__(self, per_minute, burst=1):
+        self.interval = 60.0 / per_minute if per_minute > 0 else 0.0
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def wait(self, cancelled=None):
+        """Block until a request may start; False if `cancelled` was set first"""
+        while True:
+            with self._lock:
+                if not self.interval:
+                    return True
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) / self.interval)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return True
+                delay = (1 - self.tokens) * self.interval
+            if cancelled is None:
+                time.sleep(delay)
+            elif cancelled.wait(delay):
+                return False
+
+
+class ProviderLimits:
+    def __init__(self, concurrency, per_minute):
+        self.concurrency = concurrency
+        self.slots = threading.BoundedSemaphore(concurrency)
+        self.rate = RateLimiter(per_minute, burst=concurrency)
+
+
+def provider_limits(provider):
+    """The process-wide limits of a provider"""
+    with _limits_lock:
+        if provider not in _limits:
+            _limits[provider] = ProviderLimits(
+                PROVIDER_CONCURRENCY.get(provider, 4), PROVIDER_REQUESTS_PER_MINUTE.get(provider, 60)
+            )
+        return _limits[provider]
+
+
+class BatchAnalysis(threading.Thread):
+    """Runs `analyze(competitor, before_llm_call)` for every competitor, within the provider's limits.
+
+    `analyze` calls `before_llm_call()` right before it sends a request to
+    the provider, i.e. after the response cache missed.
+    """
+
+    def __init__(self, competitors, analyze, provider):
+        super().__init__(name=f"batch-{provider}", daemon=True)
+        self.competitors = list(competitors)
+        self.analyze = analyze
+        self.provider = provider
+        self.limits = provider_limits(provider)
+        # (competitor, analysis entry or error message), in order of completion
+        self.results = []
+        self.cancelled = threading.Event()
+        self.started_at = None
+        self.finished_at = None
+        self._lock = threading.Lock()
+
+    @property
+    def total(self):
+        return len(self.competitors)
+
+    @property
+    def done(self):
+        with self._lock:
+            return len(self.results)
+
+    @property
+    def progress(self):
+        return self.done / self.total if self.total else 1.0
+
+    @property
+    def elapsed(self):
+        if self.started_at is None:
+            return 0.0
+        return (self.finished_at or time.perf_counter()) - self.started_at
+
+    def snapshot(self):
+        with self._lock:
+            return list(self.results)
+
+    def cancel(self):
+        self.cancelled.set()
+
+    def before_llm_call(self):
+        if not self.limits.rate.wait(self.cancelled):
+            raise BatchCancelled()
+
+    def _run_one(self, competitor):
+        if self.cancelled.is_set():
+            return
+        with self.limits.slots:
+            if self.cancelled.is_set():
+                return
+            try:
+                result = self.analyze(competitor, self.before_llm_call)
+            except BatchCancelled:
+                return
+            except Exception as e:
+                result = f"Error analyzing competitor: {str(e)}"
+        with self._lock:
+            self.results.append((competitor, result))
+
+    def run(self):
+        self.started_at = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.limits.concurrency, thread_name_prefix=self.name) as pool:
+            futures = [pool.submit(self._run_one, competitor) for competitor in self.competitors]
+            while not all(future.done() for future in futures):
+                if self.cancelled.wait(0.2):
+                    for future in futures:
+                        future.cancel()
+                    break
+        self.finished_at = time.perf_counter()
+        logger.info(
+            f"Batch of {self.total} analyses on {self.provider}: {self.done} finished in {self.elapsed:.1f}s"
+            + (" (cancelled)" if self.cancelled.is_set() else "")
+        )
@@ -0,0 +1,188 @@
+"""Prompt size and latency of grounded vs standard analysis prompts.
+
+Indexes the synthetic competitor corpus of benchmark_retrieval.py, then
+builds the standard and the grounded prompt for competitor analyses and
+market reports. Offline it reports prompt tokens and retrieval latency
+(first retrieval and cached repeat); with `--llm` it also sends both
+prompts and reports time to first token, total latency and output tokens.
+
+    python benchmark_grounding.py
+    python benchmark_grounding.py --llm openai --model gpt-3.5-turbo-instruct --calls 5
+"""
+
+import argparse
+import json
+import statistics
+import tempfile
+import time
+
+from benchmark_retrieval import build_embeddings, make_corpus
+from grounding import GROUNDED_TOP_K, RetrievalCache, count_tokens, pack_context
+from hybrid_search import HybridChroma, HybridRetriever
+from prompts import (
+    competitor_analysis_prompt,
+    grounded_competitor_analysis_prompt,
+    grounded_market_report_prompt,
+    market_report_prompt,
+)
+
+ANALYSIS_TYPES = ["Comprehensive Analysis", "Threat Assessment", "Strategic Analysis", "Financial Analysis"]
+REPORT_SCOPES = ["Market Overview", "Competitive Landscape", "Market Opportunities", "Threat Analysis"]
+MARKETS = ["enterprise cloud platforms", "data security software", "AI analytics tools", "automation platforms"]
+
+
+def build_llm(kind, model):
+    if kind == "openai":
+        from langchain_community.llms import OpenAI
+
+        return OpenAI(model_name=model, temperature=0.1)
+    if kind == "gemini":
+        from langchain_google_genai import GoogleGenerativeAI
+
+        return GoogleGenerativeAI(model=model, temperature=0.1)
+    from langchain_anthropic import Anthropic
+
+    return Anthropic(model_name=model, temperature=0.1)
+
+
+def benchmark_requests(competitors):
+    """(kind, standard prompt, grounded prompt builder, retrieval query)"""
+    for i, name in enumerate(competitors):
+        analysis_type = ANALYSIS_TYPES[i % len(ANALYSIS_TYPES)]
+        yield (
+            "competitor",
+            competitor_analysis_prompt(name, analysis_type),
+            lambda context, name=name, t=analysis_type: grounded_competitor_analysis_prompt(name, t, context),
+            f"{name}\n{analysis_type}",
+        )
+    for i, market in enumerate(MARKETS):
+        scope = REPORT_SCOPES[i % len(REPORT_SCOPES)]
+        yield (
+            "market",
+            market_report_prompt(market, scope),
+            lambda context, market=market, s=scope: grounded_market_report_prompt(market, s, context),
+            f"{market}\n{scope}",
+        )
+
+
+def timed_generation(llm, prompt):
+    started = time.perf_counter()
+    first_token = None
+    response = ""
+    for chunk in llm.stream(prompt):
+        if first_token is None:
+            first_token = time.perf_counter() - started
+        response += chunk
+    return {"ttft": first_token, "total": time.perf_counter() - started, "output_tokens": count_tokens(response)}
+
+
+def _mean(values):
+    return round(statistics.mean(values), 2) if values else None
+
+
+def run(companies, queries, embeddings_kind, llm_kind=None, model=None, calls=3):
+    documents, _ = make_corpus(companies)
+    competitors = list(dict.fromkeys(meta["competitor"] for _, _, meta in documents))[:queries]
+    llm = build_llm(llm_kind, model) if llm_kind else None
+    cache = RetrievalCache()
+    rows = []
+    with tempfile.TemporaryDirectory() as directory:
+        vectorstore = HybridChroma(
+            collection_name="benchmark", embedding_function=build_embeddings(embeddings_kind), persist_directory=directory
+        )
+        for start in range(0, len(documents), 256):
+            batch = documents[start:start + 256]
+            vectorstore.add_texts([d[1] for d in batch], metadatas=[d[2] for d in batch], ids=[d[0] for d in batch])
+        retriever = HybridRetriever(vectorstore=vectorstore, k=GROUNDED_TOP_K)
+
+        sent = {"competitor": 0, "market": 0}
+        for kind, standard, grounded_prompt, query in benchmark_requests(competitors):
+            started = time.perf_counter()
+            documents_found, _ = cache.retrieve(retriever, query)
+            cold = time.perf_counter() - started
+            started = time.perf_counter()
+            cache.retrieve(retriever, query)
+            warm = time.perf_counter() - started
+            context, excerpts, context_tokens = pack_context(documents_found)
+            grounded = grounded_prompt(context)
+            row = {
+                "kind": kind,
+                "standard_tokens": count_tokens(standard),
+                "grounded_tokens": count_tokens(grounded),
+                "context_tokens": context_tokens,
+                "excerpts": excerpts,
+                "retrieval_ms": cold * 1000,
+                "cached_retrieval_ms": warm * 1000,
+            }
+            if llm is not None and sent[kind] < calls:
+                sent[kind] += 1
+                row["standard_llm"] = timed_generation(llm, standard)
+                row["grounded_llm"] = timed_generation(llm, grounded)
+            rows.append(row)
+
+    report = {"companies": companies, "embeddings": embeddings_kind, "top_k": GROUNDED_TOP_K, "kinds": {}}
+    for kind in ("competitor", "market"):
+        selected = [r for r in rows if r["kind"] == kind]
+        summary = {
+            "requests": len(selected),
+            "standard_prompt_tokens": _mean([r["standard_tokens"] for r in selected]),
+            "grounded_prompt_tokens": _mean([r["grounded_tokens"] for r in selected]),
+            "grounded_instruction_tokens": _mean([r["grounded_tokens"] - r["context_tokens"] for r in selected]),
+            "context_tokens": _mean([r["context_tokens"] for r in selected]),
+            "excerpts": _mean([r["excerpts"] for r in selected]),
+            "retrieval_ms": _mean([r["retrieval_ms"] for r in selected]),
+            "cached_retrieval_ms": _mean([r["cached_retrieval_ms"] for r in selected]),
+        }
+        measured = [r for r in selected if "standard_llm" in r]
+        if measured:
+            for prompt in ("standard", "grounded"):
+                results = [r[f"{prompt}_llm"] for r in measured]
+                summary[f"{prompt}_llm"] = {
+                    "calls": len(results),
+                    "ttft_s": _mean([r["ttft"] for r in results if r["ttft"] is not None]),
+                    "total_s": _mean([r["total"] for r in results]),
+                    "output_tokens": _mean([r["output_tokens"] for r in results]),
+                }
+        report["kinds"][kind] = summary
+    return report
+
+
+def _print_report(report):
+    print(f"\n{report['companies']} companies, {report['embeddings']} embeddings, top {report['top_k']} chunks\n")
+    for kind, summary in report["kinds"].items():
+        print(f"{kind} ({summary['requests']} requests)")
+        print(f"  prompt tokens     standard {summary['standard_prompt_tokens']:>8}   grounded {summary['grounded_prompt_tokens']:>8}"
+              f"   (instructions {summary['grounded_instruction_tokens']}, context {summary['context_tokens']}"
+              f" in {summary['excerpts']} excerpts)")
+        print(f"  retrieval ms      first {summary['retrieval_ms']:>11}   cached {summary['cached_retrieval_ms']:>10}")
+        for prompt in ("standard", "grounded"):
+            llm = summary.get(f"{prompt}_llm")
+            if llm:
+                total = llm["output_tokens"] + summary[f"{prompt}_prompt_tokens"]
+                print(f"  {prompt:<9} LLM     ttft {llm['ttft_s']}s   total {llm['total_s']}s   "
+                      f"output {llm['output_tokens']} tokens   input + output {round(total)} tokens")
+        print()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare grounded and standard analysis prompts.")
+    parser.add_argument("--companies", type=int, default=200, help="Synthetic competitors in the corpus")
+    parser.add_argument("--queries", type=int, default=40, help="Competitor analyses to build")
+    parser.add_argument("--embeddings", choices=("hash", "huggingface", "openai"), default="hash",
+                        help="Dense embeddings: offline hashed trigrams, local mpnet, or OpenAI ada-002 (OPENAI_API_KEY)")
+    parser.add_argument("--llm", choices=("openai", "gemini", "anthropic"),
+                        help="Also send the prompts to this provider (API key from the environment)")
+    parser.add_argument("--model", default="gpt-3.5-turbo-instruct", help="Model for --llm")
+    parser.add_argument("--calls", type=int, default=3, help="Requests of each kind sent to the LLM")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args()
+
+    report = run(args.companies, args.queries, args.embeddings, args.llm, args.model, args.calls)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        _print_report(report)
+
+
+if __name__ == "__main__":
+    main()
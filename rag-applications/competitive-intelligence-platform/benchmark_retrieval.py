@@ -0,0 +1,178 @@
+"""Recall and latency of vector, BM25 and hybrid retrieval on a synthetic corpus.
+
+Generates competitor documents (earnings notes, product launches, company
+profiles) that share most of their wording and differ in the entities
+analysts search for: ticker symbols, product names and figures. Each query
+has exactly one relevant document; recall@k is the share of queries that
+find it in the top k.
+
+    python benchmark_retrieval.py                          # offline, hashed character-trigram embeddings
+    python benchmark_retrieval.py --embeddings huggingface --companies 300
+    python benchmark_retrieval.py --embeddings openai --json
+"""
+
+import argparse
+import hashlib
+import json
+import random
+import tempfile
+import time
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from embedding_cache import CachedEmbeddings
+from hybrid_search import HybridChroma, HybridRetriever
+
+SYLLABLES = ["zen", "tri", "vo", "lex", "ar", "qua", "nim", "bus", "cor", "dyn", "ax", "mer", "sol", "tek", "ri", "on"]
+SUFFIXES = ["Systems", "Labs", "Corp.", "Technologies", "Analytics", "Cloud", "Networks", "Software"]
+FILLER = [
+    "The company continues to invest in cloud infrastructure and AI capabilities.",
+    "Management highlighted strong enterprise demand and improving margins.",
+    "Analysts expect competitive pressure to increase over the next quarters.",
+    "The firm expanded its partner ecosystem across North America and Europe.",
+    "Customer retention remained high despite pricing pressure in the segment.",
+    "The roadmap focuses on data security, automation and platform integration.",
+]
+
+
+class HashEmbeddings(Embeddings):
+    """Offline stand-in for a dense model: hashed character trigrams, L2-normalized"""
+
+    def __init__(self, dim=384):
+        self.dim = dim
+
+    def _embed(self, text):
+        vector = np.zeros(self.dim, dtype=np.float32)
+        text = f"  {text.lower()}  "
+        for i in range(len(text) - 2):
+            digest = hashlib.blake2b(text[i:i + 3].encode("utf-8"), digest_size=4).digest()
+            vector[int.from_bytes(digest, "little") % self.dim] += 1.0
+        return (vector / (np.linalg.norm(vector) or 1.0)).tolist()
+
+    def embed_documents(self, texts):
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text):
+        return self._embed(text)
+
+
+def make_corpus(companies, seed=7):
+    """(documents as (id, text, metadata), queries as (query, kind, relevant id))"""
+    rng = random.Random(seed)
+    documents, queries = [], []
+    tickers = set()
+    for c in range(companies):
+        name = "".join(rng.sample(SYLLABLES, 2)).capitalize() + " " + rng.choice(SUFFIXES)
+        ticker = "".join(rng.choices("ABCDEFGHIJKLMNOPQRSTUVWXYZ", k=4))
+        while ticker in tickers:
+            ticker = "".join(rng.choices("ABCDEFGHIJKLMNOPQRSTUVWXYZ", k=4))
+        tickers.add(ticker)
+        product = f"{name.split()[0]} {rng.choice(['Nova', 'Edge', 'Pulse', 'Orbit', 'Vault'])} {rng.randint(2, 99)}"
+        revenue = f"${rng.randint(1, 9)}.{rng.randint(10, 99)}B"
+        share = f"{rng.randint(1, 30)}.{rng.randint(0, 9)}%"
+
+        def filler():
+            return " ".join(rng.sample(FILLER, 3))
+
+        docs = {
+            "earnings": f"{name} ({ticker}) reported quarterly revenue of {revenue}, up year over year. {filler()}",
+            "product": f"{name} launched {product}, a new platform for enterprise customers. {filler()}",
+            "profile": f"{name} holds a market share of {share} in its core segment. {filler()}",
+        }
+        for kind, text in docs.items():
+            documents.append((f"{c}-{kind}", text, {"competitor": name, "kind": kind}))
+        queries += [
+            (f"What revenue did {ticker} report?", "ticker", f"{c}-earnings"),
+            (f"Who makes {product}?", "product", f"{c}-product"),
+            (f"Which competitor has {share} market share?", "figure", f"{c}-profile"),
+            (f"How is {name} doing financially?", "paraphrase", f"{c}-earnings"),
+        ]
+    return documents, queries
+
+
+def build_embeddings(kind):
+    if kind == "hash":
+        return HashEmbeddings()
+    if kind == "openai":
+        from langchain_openai import OpenAIEmbeddings
+
+        return CachedEmbeddings(OpenAIEmbeddings(model="text-embedding-ada-002"), model="openai/text-embedding-ada-002")
+    from langchain_community.embeddings import HuggingFaceEmbeddings
+
+    model = "sentence-transformers/all-mpnet-base-v2"
+    return CachedEmbeddings(HuggingFaceEmbeddings(model_name=model), model=f"huggingface/{model}")
+
+
+def run(companies, embeddings_kind, ks=(1, 4, 10)):
+    documents, queries = make_corpus(companies)
+    with tempfile.TemporaryDirectory() as directory:
+        started = time.perf_counter()
+        vectorstore = HybridChroma(
+            collection_name="benchmark", embedding_function=build_embeddings(embeddings_kind), persist_directory=directory
+        )
+        for start in range(0, len(documents), 256):
+            batch = documents[start:start + 256]
+            vectorstore.add_texts([d[1] for d in batch], metadatas=[d[2] for d in batch], ids=[d[0] for d in batch])
+        index_seconds = time.perf_counter() - started
+
+        report = {"companies": companies, "documents": len(documents), "queries": len(queries),
+                  "embeddings": embeddings_kind, "index_seconds": round(index_seconds, 1), "modes": {}}
+        for mode in ("vector", "bm25", "hybrid"):
+            retriever = HybridRetriever(vectorstore=vectorstore, k=max(ks), mode=mode)
+            hits = {k: 0 for k in ks}
+            by_kind = {}
+            latencies = []
+            for query, kind, relevant in queries:
+                started = time.perf_counter()
+                ranked = [doc.id for doc in retriever.invoke(query)]
+                latencies.append((time.perf_counter() - started) * 1000)
+                for k in ks:
+                    hits[k] += relevant in ranked[:k]
+                found = by_kind.setdefault(kind, [0, 0])
+                found[0] += relevant in ranked[:4]
+                found[1] += 1
+            latencies.sort()
+            report["modes"][mode] = {
+                "recall": {f"@{k}": round(hits[k] / len(queries), 3) for k in ks},
+                "recall@4_by_query_kind": {kind: round(f / n, 3) for kind, (f, n) in by_kind.items()},
+                "latency_ms": {
+                    "p50": round(latencies[len(latencies) // 2], 2),
+                    "p95": round(latencies[int(len(latencies) * 0.95)], 2),
+                },
+            }
+    return report
+
+
+def _print_report(report):
+    print(f"\n{report['documents']} documents, {report['queries']} queries, {report['embeddings']} embeddings "
+          f"(indexed in {report['index_seconds']}s)\n")
+    ks = list(next(iter(report["modes"].values()))["recall"])
+    kinds = list(next(iter(report["modes"].values()))["recall@4_by_query_kind"])
+    print(f"{'mode':<8}" + "".join(f"{'recall' + k:>11}" for k in ks) + f"{'p50 ms':>9}{'p95 ms':>9}")
+    for mode, stats in report["modes"].items():
+        print(f"{mode:<8}" + "".join(f"{stats['recall'][k]:>11}" for k in ks)
+              + f"{stats['latency_ms']['p50']:>9}{stats['latency_ms']['p95']:>9}")
+    print("\nrecall@4 by query kind")
+    print(f"{'mode':<8}" + "".join(f"{kind:>12}" for kind in kinds))
+    for mode, stats in report["modes"].items():
+        print(f"{mode:<8}" + "".join(f"{stats['recall@4_by_query_kind'][kind]:>12}" for kind in kinds))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare vector, BM25 and hybrid retrieval.")
+    parser.add_argument("--companies", type=int, default=200, help="Synthetic competitors (3 documents, 4 queries each)")
+    parser.add_argument("--embeddings", choices=("hash", "huggingface", "openai"), default="hash",
+                        help="Dense embeddings: offline hashed trigrams, local mpnet, or OpenAI ada-002 (OPENAI_API_KEY)")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args()
+
+    report = run(args.companies, args.embeddings)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        _print_report(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""One Chroma collection per embedding model, and background migration between them.
+
+Vectors from different embedding models can't share an index (ada-002 is
+1536-d, Gemini embedding-001 and mpnet are 768-d), so each model gets its
+own collection (and therefore its own HNSW index) in the same persist
+directory.
+
+When a model's collection holds fewer records than another collection -
+the pre-namespacing `langchain` collection, or the one a previous provider
+filled - a `CollectionMigration` thread copies the documents and metadata
+over in batches, re-embedding them with the new model. Nothing is deleted:
+sessions on the old model keep querying the old collection, and the new
+collection serves whatever has been copied so far. Records already in the
+target are skipped, so an interrupted migration picks up where it stopped.
+"""
+
+import hashlib
+import logging
+import os
+import re
+import threading
+import time
+
+from metadata_filters import typed_metadata
+
+logger = logging.getLogger(__name__)
+
+COLLECTION_PREFIX = "ci"
+MIGRATION_BATCH_SIZE = int(os.getenv("MIGRATION_BATCH_SIZE", 64))
+# Pause between batches, to stay clear of embedding API rate limits
+MIGRATION_PAUSE_SECONDS = float(os.getenv("MIGRATION_PAUSE_SECONDS", 0.5))
+
+_migrations = {}
+_migrations_lock = threading.Lock()
+
+
+def collection_name(embedding_model):
+    """Chroma collection name for an embedding model, e.g. `ci-openai-text-embedding-ada-002-1a2b3c4d`"""
+    slug = re.sub(r"[^a-zA-Z0-9]+", "-", embedding_model).strip("-")
+    # Older Chroma versions allow 63 characters; the hash keeps shortened names unique
+    digest = hashlib.sha256(embedding_model.encode("utf-8")).hexdigest()[:8]
+    return f"{COLLECTION_PREFIX}-{slug[:48]}-{digest}"
+
+
+class CollectionMigration(threading.Thread):
+    """Copies a collection into a vector store that uses a different embedding model"""
+
+    def __init__(self, source, target, batch_size=MIGRATION_BATCH_SIZE, pause=MIGRATION_PAUSE_SECONDS):
+        super().__init__(name=f"migrate-{source.name}", daemon=True)
+        self.source = source
+        self.target = target
+        self.batch_size = batch_size
+        self.pause = pause
+        self.total = source.count()
+        self.copied = 0
+        self.skipped = 0
+        self.error = None
+
+    @property
+    def progress(self):
+        return min(1.0, (self.copied + self.skipped) / self.total) if self.total else 1.0
+
+    def run(self):
+        started = time.perf_counter()
+        try:
+            for offset in range(0, self.total, self.batch_size):
+                batch = self.source.get(offset=offset, limit=self.batch_size, include=["documents", "metadatas"])
+                present = set(self.target.get(ids=batch["ids"], include=[])["ids"])
+                rows = [
+                    (id_, doc, meta)
+                    for id_, doc, meta in zip(batch["ids"], batch["documents"], batch["metadatas"])
+                    if id_ not in present and doc
+                ]
+                self.skipped += len(batch["ids"]) - len(rows)
+                if rows:
+                    ids, docs, metas = zip(*rows)
+                    # Typed on the way, so range filters work on migrated records too
+                    metadatas = [typed_metadata(meta) if meta else None for meta in metas]
+                    self.target.add_texts(texts=list(docs), metadatas=metadatas, ids=list(ids))
+                    self.copied += len(rows)
+                    time.sleep(self.pause)
+        except Exception as e:
+            self.error = e
+            logger.warning(f"Migration from {self.source.name} stopped after {self.copied} records: {e}")
+            return
+        logger.info(
+            f"Migrated {self.copied} records from {self.source.name} "
+            f"({self.skipped} already present) in {time.perf_counter() - started:.1f}s"
+        )
+
+
+def start_migration(vectorstore):
+    """Start filling `vectorstore`'s collection from the fullest other one, if it has fewer records.
+
+    Returns the (possibly already running) migration, or None when there is
+    nothing to migrate. At most one migration per target runs per process.
+    """
+    target = vectorstore._collection
+    with _migrations_lock:
+        migration = _migrations.get(target.name)
+        if migration is not None and migration.is_alive():
+            return migration
+
+        client = vectorstore._client
+        # list_collections() returns names in some Chroma versions, collections in others
+        names = [getattr(c, "name", c) for c in client.list_collections()]
+        candidates = [client.get_collection(name) for name in names if name != target.name]
+        if not candidates:
+            return None
+        source = max(candidates, key=lambda c: c.count())
+        if source.count() <= target.count():
+            return None
+
+        migration = CollectionMigration(source, vectorstore)
+        _migrations[target.name] = migration
+        migration.start()
+        logger.info(f"Migrating {migration.total} records from {source.name} to {target.name}")
+        return migration
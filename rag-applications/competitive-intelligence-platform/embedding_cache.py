@@ -0,0 +1,99 @@
+"""Persistent cache for document and query embeddings.
+
+Every `add_texts` used to send all texts to the embedding provider, even
+ones embedded before (after switching providers back and forth, re-seeding,
+re-ingesting). `CachedEmbeddings` wraps any LangChain `Embeddings` and
+stores vectors in SQLite as float32 blobs, keyed by (embedding model,
+SHA-256 of the text). Only texts never seen for that model reach the
+provider, so re-indexing known content makes no API calls.
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+from contextlib import closing
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", "./embedding_cache.db")
+# Keeps SQLite below its bound-parameter limit
+_LOOKUP_BATCH = 500
+
+
+def text_hash(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class CachedEmbeddings(Embeddings):
+    """Embeddings wrapper that only embeds texts not already in the cache"""
+
+    def __init__(self, embeddings, model, path=EMBEDDING_CACHE_PATH):
+        self.embeddings = embeddings
+        self.model = model
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        with closing(self._connect()) as db, db:
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings "
+                "(model TEXT, text_hash TEXT, vector BLOB, PRIMARY KEY (model, text_hash))"
+            )
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=10)
+
+    def _lookup(self, model, hashes):
+        found = {}
+        with closing(self._connect()) as db:
+            for start in range(0, len(hashes), _LOOKUP_BATCH):
+                batch = hashes[start:start + _LOOKUP_BATCH]
+                rows = db.execute(
+                    f"SELECT text_hash, vector FROM embeddings WHERE model = ? "
+                    f"AND text_hash IN ({','.join('?' * len(batch))})",
+                    (model, *batch),
+                ).fetchall()
+                found.update((h, np.frombuffer(blob, dtype=np.float32).tolist()) for h, blob in rows)
+        return found
+
+    def _store(self, model, vectors):
+        with closing(self._connect()) as db, db:
+            db.executemany(
+                "INSERT OR REPLACE INTO embeddings VALUES (?, ?, ?)",
+                [(model, h, np.asarray(v, dtype=np.float32).tobytes()) for h, v in vectors.items()],
+            )
+
+    def _embed(self, model, texts, embed_missing):
+        hashes = [text_hash(text) for text in texts]
+        found = self._lookup(model, sorted(set(hashes)))
+        # Each distinct new text is embedded once, in one provider call
+        missing = {}
+        for h, text in zip(hashes, texts):
+            if h not in found:
+                missing.setdefault(h, text)
+        if missing:
+            # Rounded to float32 so new and cached vectors are identical
+            new_vectors = {
+                h: np.asarray(v, dtype=np.float32).tolist()
+                for h, v in zip(missing, embed_missing(list(missing.values())))
+            }
+            self._store(model, new_vectors)
+            found.update(new_vectors)
+        with self._lock:
+            self.hits += len(texts) - len(missing)
+            self.misses += len(missing)
+        return [list(found[h]) for h in hashes]
+
+    def embed_documents(self, texts):
+        return self._embed(self.model, list(texts), self.embeddings.embed_documents)
+
+    def embed_query(self, text):
+        # Some providers embed queries differently from documents
+        return self._embed(f"{self.model}#query", [text], lambda texts: [self.embeddings.embed_query(texts[0])])[0]
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses}
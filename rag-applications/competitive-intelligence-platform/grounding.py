@@ -0,0 +1,140 @@
+"""Retrieval-grounded analysis: retrieve, pack into a token budget, cache.
+
+The standard analysis prompts carry no stored context: the model answers
+a long list of instructions from what it already knows. In grounded mode
+the QA chain's retriever fetches the top `GROUNDED_TOP_K` chunks for the
+competitor or market, `pack_context` keeps the best-ranked ones that fit
+in `GROUNDED_CONTEXT_TOKENS`, and a compact prompt (prompts.py) asks for a
+concise, cited answer.
+
+Retrieval results are cached per (collection, retriever settings, query)
+in a `RetrievalCache`. The collection's record count is part of the key,
+so records added in the background (collection migration) make entries
+stale; ingestion can replace chunks without changing the count, so it
+clears the cache when it finishes.
+`benchmark_grounding.py` compares prompt size and latency with the
+standard prompts.
+"""
+
+import functools
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+GROUNDED_TOP_K = int(os.getenv("GROUNDED_TOP_K", 6))
+GROUNDED_CONTEXT_TOKENS = int(os.getenv("GROUNDED_CONTEXT_TOKENS", 1000))
+RETRIEVAL_CACHE_MAX_ENTRIES = int(os.getenv("RETRIEVAL_CACHE_MAX_ENTRIES", 256))
+RETRIEVAL_CACHE_TTL_SECONDS = float(os.getenv("RETRIEVAL_CACHE_TTL_SECONDS", 600))
+# Used when tiktoken's encoding can't be loaded (it is downloaded on first use)
+_CHARS_PER_TOKEN = 4
+
+
+@functools.lru_cache(maxsize=None)
+def _encoding():
+    try:
+        import tiktoken
+
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception as e:
+        logger.warning(f"tiktoken unavailable ({e}); estimating {_CHARS_PER_TOKEN} characters per token")
+        return None
+
+
+def count_tokens(text):
+    encoding = _encoding()
+    if encoding is None:
+        return -(-len(text) // _CHARS_PER_TOKEN)
+    return len(encoding.encode(text))
+
+
+def _truncate(text, tokens):
+    encoding = _encoding()
+    if encoding is None:
+        return text[:tokens * _CHARS_PER_TOKEN]
+    return encoding.decode(encoding.encode(text)[:tokens])
+
+
+def _label(metadata):
+    return metadata.get("competitor") or os.path.basename(metadata.get("source", "")) or "document"
+
+
+def pack_context(documents, budget=GROUNDED_CONTEXT_TOKENS):
+    """(context text, excerpts used, tokens) of the best-ranked documents that fit in `budget` tokens.
+
+    Documents are taken in rank order; one that doesn't fit is skipped in
+    favour of shorter ones further down. If even the top document doesn't
+    fit, it is cut to the budget, so the context is never empty.
+    """
+    excerpts = []
+    used = 0
+    seen = set()
+    for doc in documents:
+        content = doc.page_content.strip()
+        if not content or content in seen:
+            continue
+        seen.add(content)
+        excerpt = f"[{len(excerpts) + 1}] {_label(doc.metadata)}\n{content}"
+        tokens = count_tokens(excerpt) + 1
+        if used + tokens > budget:
+            if excerpts:
+                continue
+            excerpt = _truncate(excerpt, budget - 1)
+            tokens = count_tokens(excerpt) + 1
+        excerpts.append(excerpt)
+        used += tokens
+    return "\n\n".join(excerpts), len(excerpts), used
+
+
+class RetrievalCache:
+    """LRU cache of retrieved documents, shared by all sessions"""
+
+    def __init__(self, max_entries=RETRIEVAL_CACHE_MAX_ENTRIES, ttl_seconds=RETRIEVAL_CACHE_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._generation = 0  # bumped by clear(), so retrievals started before it aren't stored
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def retrieve(self, retriever, query):
+        """(documents, whether they came from the cache) for `retriever.invoke(query)`"""
+        collection = retriever.vectorstore._collection
+        key = (
+            collection.name, collection.count(), retriever.mode, retriever.k, retriever.fetch_k,
+            json.dumps(retriever.filter, sort_keys=True), " ".join(query.split()),
+        )
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and now - entry[0] < self.ttl_seconds:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1], True
+            self.misses += 1
+            generation = self._generation
+
+        documents = retriever.invoke(query)
+        with self._lock:
+            if generation != self._generation:
+                return documents, False
+            self._entries[key] = (now, documents)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return documents, False
+
+    def clear(self):
+        """Drop every entry, e.g. after the collection's documents changed"""
+        with self._lock:
+            self._entries.clear()
+            self._generation += 1
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries)}
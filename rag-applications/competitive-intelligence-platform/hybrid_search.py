@@ -0,0 +1,234 @@
+"""Hybrid (BM25 + vector) retrieval over the Chroma collections.
+
+Dense similarity is poor at exact entities - ticker symbols, product
+names, revenue figures - that keyword search gets right. `HybridChroma` is
+the app's Chroma vector store with a BM25 inverted index next to it
+(SQLite, one per collection): every `add_texts` and `delete` updates both,
+so sample data, ingestion and collection migration keep them in sync.
+
+`HybridRetriever` runs both searches and merges the rankings with
+reciprocal-rank fusion (each document scores sum(1 / (RRF_K + rank)) over
+the lists it appears in), which needs no score normalization between the
+two. `benchmark_retrieval.py` compares recall@k and latency of vector,
+BM25 and hybrid retrieval.
+"""
+
+import math
+import os
+import re
+import sqlite3
+import threading
+from collections import Counter
+from contextlib import closing
+from typing import Any, Optional
+
+from langchain_chroma import Chroma
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+RETRIEVAL_MODE = os.getenv("RETRIEVAL_MODE", "hybrid")  # hybrid | vector | bm25
+RETRIEVAL_FETCH_K = int(os.getenv("RETRIEVAL_FETCH_K", 20))  # candidates from each retriever before fusion
+RRF_K = int(os.getenv("RRF_K", 60))
+BM25_K1 = 1.2
+BM25_B = 0.75
+# Scored documents checked against a metadata filter per `get` call
+_ACCEPT_BATCH = 256
+# Keeps SQLite below its bound-parameter limit
+_LOOKUP_BATCH = 500
+
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it its of on or that the this to was were what which who "
+    "with how does do did their our your".split()
+)
+
+
+def tokenize(text):
+    """Lowercase terms; keeps figures like `2.5b` and `15%` in one piece"""
+    terms = re.findall(r"[a-z0-9]+(?:[.,%][a-z0-9%]+)*%?", text.lower())
+    return [term for term in terms if term not in _STOPWORDS]
+
+
+class BM25Index:
+    """Persistent BM25 inverted index of one collection"""
+
+    def __init__(self, path, collection):
+        self.path = path
+        self.collection = collection
+        self._write_lock = threading.Lock()
+        with closing(self._connect()) as db, db:
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS bm25_postings (collection TEXT, term TEXT, doc_id TEXT, tf INTEGER, "
+                "length INTEGER, PRIMARY KEY (collection, term, doc_id)) WITHOUT ROWID"
+            )
+            db.execute("CREATE INDEX IF NOT EXISTS bm25_by_doc ON bm25_postings (collection, doc_id)")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS bm25_docs (collection TEXT, doc_id TEXT, length INTEGER, "
+                "PRIMARY KEY (collection, doc_id)) WITHOUT ROWID"
+            )
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    def _delete(self, db, ids):
+        for start in range(0, len(ids), _LOOKUP_BATCH):
+            batch = ids[start:start + _LOOKUP_BATCH]
+            marks = ",".join("?" * len(batch))
+            db.execute(f"DELETE FROM bm25_postings WHERE collection = ? AND doc_id IN ({marks})", (self.collection, *batch))
+            db.execute(f"DELETE FROM bm25_docs WHERE collection = ? AND doc_id IN ({marks})", (self.collection, *batch))
+
+    def upsert(self, ids, texts):
+        postings = []
+        docs = []
+        for doc_id, text in zip(ids, texts):
+            terms = Counter(tokenize(text or ""))
+            length = sum(terms.values())
+            docs.append((self.collection, doc_id, length))
+            postings.extend((self.collection, term, doc_id, tf, length) for term, tf in terms.items())
+        with self._write_lock, closing(self._connect()) as db, db:
+            self._delete(db, list(ids))
+            db.executemany("INSERT INTO bm25_docs VALUES (?, ?, ?)", docs)
+            db.executemany("INSERT INTO bm25_postings VALUES (?, ?, ?, ?, ?)", postings)
+
+    def delete(self, ids):
+        with self._write_lock, closing(self._connect()) as db, db:
+            self._delete(db, list(ids))
+
+    def count(self):
+        with closing(self._connect()) as db:
+            return db.execute("SELECT COUNT(*) FROM bm25_docs WHERE collection = ?", (self.collection,)).fetchone()[0]
+
+    def ids(self):
+        with closing(self._connect()) as db:
+            return {row[0] for row in db.execute("SELECT doc_id FROM bm25_docs WHERE collection = ?", (self.collection,))}
+
+    def search(self, query, k, accept=None):
+        """[(doc ID, BM25 score)] of the `k` best matches.
+
+        `accept(ids)` returns the IDs among `ids` that may be returned (e.g.
+        those matching a metadata filter). It is called on the scored
+        documents, best first, in batches, until `k` are accepted.
+        """
+        terms = set(tokenize(query))
+        if not terms:
+            return []
+        with closing(self._connect()) as db:
+            docs, total_length = db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(length), 0) FROM bm25_docs WHERE collection = ?", (self.collection,)
+            ).fetchone()
+            if not docs:
+                return []
+            average_length = total_length / docs
+            scores = Counter()
+            for term in terms:
+                postings = db.execute(
+                    "SELECT doc_id, tf, length FROM bm25_postings WHERE collection = ? AND term = ?",
+                    (self.collection, term),
+                ).fetchall()
+                if not postings:
+                    continue
+                idf = math.log(1 + (docs - len(postings) + 0.5) / (len(postings) + 0.5))
+                for doc_id, tf, length in postings:
+                    norm = BM25_K1 * (1 - BM25_B + BM25_B * length / average_length)
+                    scores[doc_id] += idf * tf * (BM25_K1 + 1) / (tf + norm)
+        if accept is None:
+            return scores.most_common(k)
+        ranked = scores.most_common()
+        found = []
+        step = max(4 * k, _ACCEPT_BATCH)
+        for start in range(0, len(ranked), step):
+            batch = ranked[start:start + step]
+            accepted = accept([doc_id for doc_id, _ in batch])
+            found.extend(item for item in batch if item[0] in accepted)
+            if len(found) >= k:
+                break
+        return found[:k]
+
+
+class HybridChroma(Chroma):
+    """Chroma vector store that keeps a BM25 index of the same documents"""
+
+    def __init__(self, *args, persist_directory=None, bm25_path=None, **kwargs):
+        super().__init__(*args, persist_directory=persist_directory, **kwargs)
+        if bm25_path is None:
+            bm25_path = os.path.join(persist_directory or ".", "bm25_index.db")
+        self.bm25 = BM25Index(bm25_path, self._collection.name)
+
+    def add_texts(self, texts, metadatas=None, ids=None, **kwargs):
+        texts = list(texts)
+        ids = super().add_texts(texts, metadatas=metadatas, ids=ids, **kwargs)
+        self.bm25.upsert(ids, texts)
+        return ids
+
+    def delete(self, ids=None, **kwargs):
+        super().delete(ids=ids, **kwargs)
+        if ids:
+            self.bm25.delete(ids)
+
+    def sync_bm25(self, batch_size=_LOOKUP_BATCH):
+        """Index documents stored before the BM25 index existed, and drop deleted ones"""
+        if self.bm25.count() == self._collection.count():
+            return
+        indexed = self.bm25.ids()
+        seen = set()
+        for offset in range(0, self._collection.count(), batch_size):
+            batch = self._collection.get(offset=offset, limit=batch_size, include=["documents"])
+            seen.update(batch["ids"])
+            missing = [(i, doc) for i, doc in zip(batch["ids"], batch["documents"]) if i not in indexed]
+            if missing:
+                self.bm25.upsert(*zip(*missing))
+        if indexed - seen:
+            self.bm25.delete(sorted(indexed - seen))
+
+
+class HybridRetriever(BaseRetriever):
+    """Vector and BM25 search over a HybridChroma, fused with reciprocal-rank fusion.
+
+    `filter` is a Chroma `where` clause (see metadata_filters.py). It is part of
+    the vector query and limits the documents BM25 scores, so both return
+    their best k among matching documents.
+    """
+
+    vectorstore: Any
+    k: int = 4
+    fetch_k: int = RETRIEVAL_FETCH_K
+    rrf_k: int = RRF_K
+    mode: str = RETRIEVAL_MODE
+    filter: Optional[dict] = None
+
+    def _dense(self, query, k):
+        return self.vectorstore.similarity_search(query, k=k, filter=self.filter)
+
+    def _sparse(self, query, k):
+        accept = None
+        if self.filter:
+            # Only BM25's candidates are checked against the filter, not every matching record
+            def accept(ids):
+                return set(self.vectorstore.get(ids=ids, where=self.filter, include=[])["ids"])
+        return [doc_id for doc_id, _ in self.vectorstore.bm25.search(query, k, accept)]
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> list[Document]:
+        if self.mode == "vector":
+            return self._dense(query, self.k)
+        if self.mode == "bm25":
+            return self._by_ids(self._sparse(query, self.k))
+
+        dense = self._dense(query, self.fetch_k)
+        sparse = self._sparse(query, self.fetch_k)
+        scores = Counter()
+        for rank, doc in enumerate(dense):
+            scores[doc.id] += 1 / (self.rrf_k + rank + 1)
+        for rank, doc_id in enumerate(sparse):
+            scores[doc_id] += 1 / (self.rrf_k + rank + 1)
+        top = [doc_id for doc_id, _ in scores.most_common(self.k)]
+
+        documents = {doc.id: doc for doc in dense}
+        documents.update((doc.id, doc) for doc in self._by_ids([i for i in top if i not in documents]))
+        return [documents[doc_id] for doc_id in top if doc_id in documents]
+
+    def _by_ids(self, ids):
+        if not ids:
+            return []
+        found = {doc.id: doc for doc in self.vectorstore.get_by_ids(ids)}
+        return [found[doc_id] for doc_id in ids if doc_id in found]
@@ -0,0 +1,492 @@
+"""Ingestion of competitor documents (filings, press releases, web captures).
+
+Files stream through a pipeline of generators, so memory use doesn't grow
+with the size of the directory:
+
+    find files -> parse (process pool) -> drop near-duplicates -> chunk -> dedupe -> batch -> embed + upsert
+
+- parse: .txt/.md are read as is, .html/.htm are reduced to their visible
+  text and .pdf goes through pypdf. Parsing runs in a process pool, with a
+  bounded number of files in flight.
+- drop near-duplicates: syndicated copies of a document already ingested
+  (MinHash-LSH, see near_duplicates.py) are not chunked or embedded.
+- chunk: RecursiveCharacterTextSplitter, INGEST_CHUNK_SIZE characters with
+  INGEST_CHUNK_OVERLAP overlap.
+- dedupe: chunks already in the collection, or already seen in this run,
+  are dropped. IDs are the SHA-256 of the chunk text, so upserts are
+  idempotent.
+- embed + upsert: INGEST_BATCH_SIZE chunks per `add_texts` call, i.e. per
+  embedding request.
+
+A `Manifest` (SQLite, next to the Chroma files) records the mtime and size
+of every ingested file and the IDs of its chunks, per collection. Files
+whose mtime and size are unchanged are not even parsed, only new chunks are
+embedded, and chunks that disappeared from a changed or deleted file are
+removed from the collection (unless another file still has them). A file
+is recorded only once all of its chunks are stored, so an interrupted run
+simply resumes on the next one. The chunks a file drops are queued in the
+manifest in the same transaction, and deleted at the start and end of
+every run, so an interrupted run can't leave them in the collection.
+"""
+
+import logging
+import multiprocessing
+import os
+import sqlite3
+import time
+from contextlib import closing
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from html.parser import HTMLParser
+
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from embedding_cache import text_hash
+from near_duplicates import NEAR_DUP_ACTION, NEAR_DUP_THRESHOLD, NearDuplicateIndex
+
+logger = logging.getLogger(__name__)
+
+SUPPORTED_EXTENSIONS = {".txt", ".md", ".html", ".htm", ".pdf"}
+INGEST_CHUNK_SIZE = int(os.getenv("INGEST_CHUNK_SIZE", 1000))
+INGEST_CHUNK_OVERLAP = int(os.getenv("INGEST_CHUNK_OVERLAP", 150))
+INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", 64))
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", 0)) or max(1, (os.cpu_count() or 2) - 1)
+# Keeps SQLite below its bound-parameter limit
+_LOOKUP_BATCH = 500
+
+
+class _TextExtractor(HTMLParser):
+    """Visible text of an HTML page (skips scripts, styles and the head)"""
+
+    SKIP = {"script", "style", "head", "noscript", "template"}
+    BLOCK = {"p", "div", "br", "li", "tr", "h1", "h2", "h3", "h4", "h5", "h6", "section", "article", "table"}
+
+    def __init__(self):
+        super().__init__()
+        self.parts = []
+        self._skipping = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self.SKIP:
+            self._skipping += 1
+        elif tag in self.BLOCK:
+            self.parts.append("\n")
+
+    def handle_endtag(self, tag):
+        if tag in self.SKIP and self._skipping:
+            self._skipping -= 1
+        elif tag in self.BLOCK:
+            self.parts.append("\n")
+
+    def handle_data(self, data):
+        if not self._skipping:
+            self.parts.append(data)
+
+    def text(self):
+        lines = (" ".join(line.split()) for line in "".join(self.parts).splitlines())
+        return "\n".join(line for line in lines if line)
+
+
+def parse_file(path):
+    """Text of a supported file. Runs in the worker processes."""
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".pdf":
+        from pypdf import PdfReader
+
+        return "\n\n".join(page.extract_text() or "" for page in PdfReader(path).pages)
+    with open(path, encoding="utf-8", errors="replace") as f:
+        raw = f.read()
+    if extension in (".html", ".htm"):
+        extractor = _TextExtractor()
+        extractor.feed(raw)
+        return extractor.text()
+    return raw
+
+
+def _parse_worker(path):
+    try:
+        return path, parse_file(path), None
+    except Exception as e:
+        return path, None, f"{type(e).__name__}: {e}"
+
+
+@dataclass
+class IngestStats:
+    files: int = 0
+    failed: int = 0
+    unchanged_files: int = 0  # same mtime and size as when last ingested
+    removed_files: int = 0
+    bytes: int = 0
+    chunks: int = 0
+    unchanged_chunks: int = 0  # already in the collection
+    duplicates: int = 0
+    near_duplicates: list = field(default_factory=list)  # (file, file it duplicates, estimated Jaccard)
+    upserted: int = 0
+    deleted: int = 0
+    started: float = field(default_factory=time.perf_counter)
+    elapsed: float = 0.0
+    errors: list = field(default_factory=list)
+
+    def tick(self):
+        self.elapsed = time.perf_counter() - self.started
+
+    @property
+    def files_per_second(self):
+        return self.files / self.elapsed if self.elapsed else 0.0
+
+    @property
+    def chunks_per_second(self):
+        return self.upserted / self.elapsed if self.elapsed else 0.0
+
+    @property
+    def megabytes_per_second(self):
+        return self.bytes / 2**20 / self.elapsed if self.elapsed else 0.0
+
+
+class Manifest:
+    """(source path, mtime, size) and chunk IDs of every ingested file, per collection"""
+
+    def __init__(self, path, collection):
+        self.collection = collection
+        self.db = sqlite3.connect(path, timeout=10)
+        with self.db:
+            self.db.execute("PRAGMA journal_mode=WAL")
+            self.db.execute(
+                "CREATE TABLE IF NOT EXISTS files (collection TEXT, source TEXT, mtime REAL, size INTEGER, "
+                "PRIMARY KEY (collection, source))"
+            )
+            self.db.execute(
+                "CREATE TABLE IF NOT EXISTS chunks (collection TEXT, source TEXT, chunk_id TEXT, "
+                "PRIMARY KEY (collection, source, chunk_id))"
+            )
+            self.db.execute("CREATE INDEX IF NOT EXISTS chunks_by_id ON chunks (collection, chunk_id)")
+            # Chunks dropped by a file, to delete from the collection unless another file has them
+            self.db.execute(
+                "CREATE TABLE IF NOT EXISTS pending_deletes (collection TEXT, chunk_id TEXT, "
+                "PRIMARY KEY (collection, chunk_id))"
+            )
+
+    def close(self):
+        self.db.close()
+
+    def unchanged(self, source, mtime, size):
+        row = self.db.execute(
+            "SELECT mtime, size FROM files WHERE collection = ? AND source = ?", (self.collection, source)
+        ).fetchone()
+        return row is not None and row[0] == mtime and row[1] == size
+
+    def stored_ids(self, ids):
+        """The chunk IDs among `ids` that some ingested file has"""
+        ids = list(ids)
+        found = set()
+        for start in range(0, len(ids), _LOOKUP_BATCH):
+            batch = ids[start:start + _LOOKUP_BATCH]
+            found.update(row[0] for row in self.db.execute(
+                f"SELECT DISTINCT chunk_id FROM chunks WHERE collection = ? "
+                f"AND chunk_id IN ({','.join('?' * len(batch))})",
+                (self.collection, *batch),
+            ))
+        return found
+
+    def _replace(self, source, chunk_ids):
+        """Set the chunks of `source`, queueing the ones it dropped for deletion"""
+        old = {row[0] for row in self.db.execute(
+            "SELECT chunk_id FROM chunks WHERE collection = ? AND source = ?", (self.collection, source)
+        )}
+        self.db.execute("DELETE FROM chunks WHERE collection = ? AND source = ?", (self.collection, source))
+        self.db.executemany(
+            "INSERT INTO chunks VALUES (?, ?, ?)", [(self.collection, source, chunk_id) for chunk_id in set(chunk_ids)]
+        )
+        self.db.executemany(
+            "INSERT OR IGNORE INTO pending_deletes VALUES (?, ?)",
+            [(self.collection, chunk_id) for chunk_id in old - set(chunk_ids)],
+        )
+
+    def record(self, source, mtime, size, chunk_ids):
+        """Record a fully stored file"""
+        with self.db:
+            self.db.execute(
+                "INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?)", (self.collection, source, mtime, size)
+            )
+            self._replace(source, chunk_ids)
+
+    def pending_deletes(self):
+        """Chunk IDs dropped by files, in this run or an interrupted one"""
+        return {row[0] for row in self.db.execute(
+            "SELECT chunk_id FROM pending_deletes WHERE collection = ?", (self.collection,)
+        )}
+
+    def clear_deletes(self, ids):
+        with self.db:
+            self.db.executemany(
+                "DELETE FROM pending_deletes WHERE collection = ? AND chunk_id = ?",
+                [(self.collection, chunk_id) for chunk_id in ids],
+            )
+
+    def chunk_ids(self, source):
+        return [row[0] for row in self.db.execute(
+            "SELECT chunk_id FROM chunks WHERE collection = ? AND source = ?", (self.collection, source)
+        )]
+
+    def remove_missing(self, root, present):
+        """Forget files under `root` that are not in `present`; returns the removed files"""
+        prefix = os.path.join(root, "")
+        sources = [row[0] for row in self.db.execute(
+            "SELECT source FROM files WHERE collection = ? AND substr(source, 1, ?) = ?",
+            (self.collection, len(prefix), prefix),
+        )]
+        removed = [source for source in sources if source not in present]
+        with self.db:
+            for source in removed:
+                self.db.execute("DELETE FROM files WHERE collection = ? AND source = ?", (self.collection, source))
+                self._replace(source, [])
+        return removed
+
+
+class _PendingFiles:
+    """Files with new chunks still on their way to the collection.
+
+    A file is recorded in the manifest once all of its new chunks are stored.
+    The chunks it dropped are only deleted at the end of the run
+    (`delete_orphans`): a chunk that moved to another file is dropped by one
+    file before the other one is recorded.
+    """
+
+    def __init__(self, manifest, stats):
+        self.manifest = manifest
+        self.stats = stats
+        self._files = {}  # source -> [chunks not stored yet, mtime, size, chunk IDs]
+
+    def add(self, source, mtime, size, chunk_ids, new_chunks):
+        self._files[source] = [new_chunks, mtime, size, chunk_ids]
+        if not new_chunks:
+            self._finish(source)
+
+    def stored(self, source):
+        self._files[source][0] -= 1
+        if self._files[source][0] <= 0:
+            self._finish(source)
+
+    def _finish(self, source):
+        _, mtime, size, chunk_ids = self._files.pop(source)
+        self.manifest.record(source, mtime, size, chunk_ids)
+
+
+def delete_orphans(manifest, vectorstore, stats):
+    """Deletes the chunks queued by the manifest that no recorded file has any more"""
+    pending = manifest.pending_deletes()
+    orphans = pending - manifest.stored_ids(pending)
+    if orphans:
+        vectorstore.delete(ids=sorted(orphans))
+        stats.deleted += len(orphans)
+    manifest.clear_deletes(pending)
+
+
+def find_files(root):
+    """Supported files under `root`, in a stable order"""
+    for directory, subdirectories, filenames in os.walk(root):
+        subdirectories.sort()
+        for filename in sorted(filenames):
+            if os.path.splitext(filename)[1].lower() in SUPPORTED_EXTENSIONS:
+                yield os.path.join(directory, filename)
+
+
+def changed_files(paths, manifest, stats, force=False):
+    """(path, mtime, size) of the files that are new or changed since they were last ingested (all with `force`)"""
+    for path in paths:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        if not force and manifest.unchanged(path, stat.st_mtime, stat.st_size):
+            stats.unchanged_files += 1
+            continue
+        yield path, stat.st_mtime, stat.st_size
+
+
+def parse_files(files, pool, stats, window):
+    """(path, mtime, size, text) for each file, in order, with at most `window` files being parsed at once"""
+    in_flight = []
+    files = iter(files)
+    while True:
+        while len(in_flight) < window:
+            file = next(files, None)
+            if file is None:
+                break
+            in_flight.append((file, pool.submit(_parse_worker, file[0])))
+        if not in_flight:
+            return
+        (path, mtime, size), future = in_flight.pop(0)
+        _, text, error = future.result()
+        stats.files += 1
+        if error:
+            stats.failed += 1
+            stats.errors.append((path, error))
+            logger.warning(f"Could not parse {path}: {error}")
+            continue
+        stats.bytes += len(text.encode("utf-8"))
+        yield path, mtime, size, text
+
+
+def drop_near_duplicates(documents, index, pending, stats, merged, requeue):
+    """Drops documents that are near-duplicates of already ingested ones (recorded with no chunks).
+
+    Documents that were skipped as duplicates of a changed one are added to
+    `requeue`: they may not match the new version.
+    """
+    for path, mtime, size, text in documents:
+        signature = index.hasher.signature(text)
+        match = index.find(path, signature) if signature is not None else None
+        if match is None:
+            if signature is not None:
+                requeue.update(index.add(path, signature))
+            yield path, mtime, size, text
+            continue
+        canonical, similarity = match
+        requeue.update(index.add(path, signature, duplicate_of=canonical))
+        stats.near_duplicates.append((path, canonical, similarity))
+        merged.setdefault(canonical, []).append(path)
+        pending.add(path, mtime, size, [], 0)
+
+
+def merge_duplicates(merged, manifest, vectorstore):
+    """Lists the skipped copies in the metadata of the chunks of the document they duplicate"""
+    for canonical, copies in merged.items():
+        ids = manifest.chunk_ids(canonical)
+        if not ids:
+            continue
+        records = vectorstore._collection.get(ids=ids, include=["metadatas"])
+        metadatas = []
+        for metadata in records["metadatas"]:
+            metadata = dict(metadata or {})
+            sources = set(filter(None, metadata.get("duplicate_sources", "").split(";"))) | set(copies)
+            metadata["duplicate_sources"] = ";".join(sorted(sources))
+            metadata["duplicates"] = len(sources)
+            metadatas.append(metadata)
+        vectorstore._collection.update(ids=records["ids"], metadatas=metadatas)
+
+
+def new_chunks(documents, splitter, manifest, pending, stats):
+    """Chunks of each document that are not in the collection yet"""
+    for path, mtime, size, text in documents:
+        chunks = [chunk for chunk in splitter.split_text(text) if chunk.strip()]
+        ids = [text_hash(chunk) for chunk in chunks]
+        stored = manifest.stored_ids(ids)
+        new = [(index, chunk_id, chunk) for index, (chunk_id, chunk) in enumerate(zip(ids, chunks))
+               if chunk_id not in stored]
+        stats.chunks += len(chunks)
+        stats.unchanged_chunks += len(chunks) - len(new)
+        pending.add(path, mtime, size, ids, len(new))
+        for index, chunk_id, chunk in new:
+            yield {
+                "id": chunk_id,
+                "text": chunk,
+                "metadata": {
+                    "source": path,
+                    "file_type": os.path.splitext(path)[1].lower().lstrip("."),
+                    "chunk": index,
+                },
+            }
+
+
+def drop_duplicates(chunks, waiting, stats):
+    """Drops chunks already seen in this run; their file waits until the first copy is stored"""
+    for chunk in chunks:
+        if chunk["id"] in waiting:
+            stats.duplicates += 1
+            waiting[chunk["id"]].append(chunk["metadata"]["source"])
+            continue
+        waiting[chunk["id"]] = []
+        yield chunk
+
+
+def batched(items, size):
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def ingest_directory(root, vectorstore, manifest_path, on_progress=None, batch_size=INGEST_BATCH_SIZE,
+                     workers=INGEST_WORKERS, chunk_size=INGEST_CHUNK_SIZE, chunk_overlap=INGEST_CHUNK_OVERLAP,
+                     near_duplicate_threshold=NEAR_DUP_THRESHOLD, near_duplicate_action=NEAR_DUP_ACTION):
+    """Bring `vectorstore` up to date with the supported files under `root`, tracked in `manifest_path`.
+
+    New and changed files are parsed, chunked, embedded and upserted;
+    chunks of changed and deleted files that are gone are removed.
+    Documents whose estimated Jaccard similarity to an ingested one reaches
+    `near_duplicate_threshold` are not chunked or embedded; with the "merge"
+    action they are listed in the metadata of the original's chunks.
+    `on_progress(stats)` is called after every upserted batch.
+    """
+    if not os.path.isdir(root):
+        raise FileNotFoundError(f"Not a directory: {root}")
+    root = os.path.abspath(root)
+    stats = IngestStats()
+    splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+    paths = list(find_files(root))
+    merged = {}  # document -> near-duplicates skipped in this run
+
+    with closing(Manifest(manifest_path, vectorstore._collection.name)) as manifest, \
+            ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+        # spawn: forking the multi-threaded Streamlit server is unsafe
+        pending = _PendingFiles(manifest, stats)
+        index = None
+        if near_duplicate_threshold > 0:
+            index = NearDuplicateIndex(manifest.db, manifest.collection, threshold=near_duplicate_threshold)
+
+        # Left over by an interrupted run; all of its recorded files are consistent
+        delete_orphans(manifest, vectorstore, stats)
+        removed = manifest.remove_missing(root, set(paths))
+        stats.removed_files = len(removed)
+        requeue = set()  # skipped copies of documents that were removed or changed
+        if index is not None:
+            for source in removed:
+                requeue.update(index.remove(source))
+
+        def run(files):
+            waiting = {}  # chunk ID in flight -> files with a duplicate of it
+            documents = parse_files(files, pool, stats, window=workers * 4)
+            if index is not None:
+                documents = drop_near_duplicates(documents, index, pending, stats,
+                                                 merged if near_duplicate_action == "merge" else {}, requeue)
+            chunks = drop_duplicates(new_chunks(documents, splitter, manifest, pending, stats), waiting, stats)
+            for batch in batched(chunks, batch_size):
+                vectorstore.add_texts(
+                    texts=[chunk["text"] for chunk in batch],
+                    metadatas=[chunk["metadata"] for chunk in batch],
+                    ids=[chunk["id"] for chunk in batch],
+                )
+                stats.upserted += len(batch)
+                for chunk in batch:
+                    for source in [chunk["metadata"]["source"], *waiting.pop(chunk["id"])]:
+                        pending.stored(source)
+                stats.tick()
+                if on_progress:
+                    on_progress(stats)
+
+        run(changed_files(paths, manifest, stats))
+        # Copies of a removed or changed document get their own chunks (or a new
+        # canonical) in this run, so their content never drops out of the index
+        while requeue:
+            again = sorted(requeue.intersection(paths))
+            requeue.clear()
+            run(changed_files(again, manifest, stats, force=True))
+
+        if merged:
+            merge_duplicates(merged, manifest, vectorstore)
+        # Every file of the run is recorded now; keep chunks that moved to another file
+        delete_orphans(manifest, vectorstore, stats)
+
+    stats.tick()
+    logger.info(
+        f"Ingested {stats.files} new or changed files ({stats.failed} failed, {stats.unchanged_files} unchanged, "
+        f"{stats.removed_files} removed, {len(stats.near_duplicates)} near-duplicates): "
+        f"{stats.upserted} chunks stored, {stats.deleted} deleted in {stats.elapsed:.1f}s "
+        f"({stats.chunks_per_second:.1f} chunks/s, {stats.megabytes_per_second:.2f} MB/s)"
+    )
+    return stats
@@ -0,0 +1,144 @@
+"""Persistent two-tier cache for LLM responses.
+
+Competitor analyses and market reports used to call the LLM every time,
+even for an input analysed a minute earlier. Responses are now stored in
+SQLite, keyed by the LLM (provider, model, temperature) and the SHA-256 of
+the full prompt - the exact tier. Optionally, each response also stores an
+embedding of the request's inputs (not the whole prompt: the template
+would make every prompt look alike). A request whose inputs are within
+`LLM_CACHE_SEMANTIC_THRESHOLD` cosine similarity of a cached one, for the
+same LLM and kind of request, reuses that answer - the semantic tier.
+
+Entries expire after `LLM_CACHE_TTL_SECONDS`; beyond `LLM_CACHE_MAX_ENTRIES`
+the least recently used are evicted.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from contextlib import closing
+
+import numpy as np
+
+from embedding_cache import text_hash
+
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", "./llm_cache.db")
+LLM_CACHE_TTL_SECONDS = float(os.getenv("LLM_CACHE_TTL_SECONDS", 7 * 24 * 3600))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", 2000))
+LLM_CACHE_SEMANTIC_THRESHOLD = float(os.getenv("LLM_CACHE_SEMANTIC_THRESHOLD", 0.97))  # 0 disables the semantic tier
+
+
+def llm_id(provider, model, temperature):
+    return f"{provider}/{model}@{temperature}"
+
+
+def normalized(vector):
+    vector = np.asarray(vector, dtype=np.float32)
+    return vector / (np.linalg.norm(vector) or 1.0)
+
+
+class LLMResponseCache:
+    """Exact and semantic lookup of earlier LLM responses, shared by all sessions"""
+
+    def __init__(self, path=LLM_CACHE_PATH, ttl_seconds=LLM_CACHE_TTL_SECONDS, max_entries=LLM_CACHE_MAX_ENTRIES,
+                 semantic_threshold=LLM_CACHE_SEMANTIC_THRESHOLD):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.semantic_threshold = semantic_threshold
+        self.exact_hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        with closing(self._connect()) as db, db:
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS responses (llm TEXT, prompt_hash TEXT, kind TEXT, embedding_model TEXT, "
+                "vector BLOB, response TEXT, created REAL, last_used REAL, PRIMARY KEY (llm, prompt_hash))"
+            )
+            db.execute("CREATE INDEX IF NOT EXISTS responses_semantic ON responses (llm, kind, embedding_model)")
+            db.execute("CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used)")
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=10)
+
+    @property
+    def semantic(self):
+        return self.semantic_threshold > 0
+
+    def _count(self, tier):
+        with self._lock:
+            if tier == "exact":
+                self.exact_hits += 1
+            elif tier == "semantic":
+                self.semantic_hits += 1
+            else:
+                self.misses += 1
+
+    def lookup(self, llm, prompt, kind=None, embed=None, embedding_model=None):
+        """(response or None, "exact" | "semantic" | None, inputs vector) for a request.
+
+        `embed` returns the normalized embedding of the request's inputs. It
+        is only called when the exact tier misses and the semantic tier is
+        on; the vector is returned so `store` can reuse it.
+        """
+        now = time.time()
+        prompt_hash = text_hash(prompt)
+        vector = None
+        with closing(self._connect()) as db, db:
+            row = db.execute(
+                "SELECT response FROM responses WHERE llm = ? AND prompt_hash = ? AND created > ?",
+                (llm, prompt_hash, now - self.ttl_seconds),
+            ).fetchone()
+            tier = "exact" if row else None
+
+            if tier is None and self.semantic and embed is not None:
+                vector = embed()
+                rows = db.execute(
+                    "SELECT prompt_hash, vector FROM responses WHERE llm = ? AND kind = ? AND embedding_model = ? "
+                    "AND vector IS NOT NULL AND created > ?",
+                    (llm, kind, embedding_model, now - self.ttl_seconds),
+                ).fetchall()
+                if rows:
+                    similarities = np.stack([np.frombuffer(blob, dtype=np.float32) for _, blob in rows]) @ vector
+                    best = int(np.argmax(similarities))
+                    if similarities[best] >= self.semantic_threshold:
+                        prompt_hash = rows[best][0]
+                        row = db.execute("SELECT response FROM responses WHERE llm = ? AND prompt_hash = ?",
+                                         (llm, prompt_hash)).fetchone()
+                        tier = "semantic"
+
+            if tier:
+                db.execute("UPDATE responses SET last_used = ? WHERE llm = ? AND prompt_hash = ?",
+                           (now, llm, prompt_hash))
+        self._count(tier)
+        return (row[0] if tier else None), tier, vector
+
+    def store(self, llm, prompt, response, kind=None, vector=None, embedding_model=None):
+        now = time.time()
+        blob = None if vector is None else np.asarray(vector, dtype=np.float32).tobytes()
+        with closing(self._connect()) as db, db:
+            db.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (llm, text_hash(prompt), kind, embedding_model, blob, response, now, now),
+            )
+            db.execute("DELETE FROM responses WHERE created <= ?", (now - self.ttl_seconds,))
+            db.execute(
+                "DELETE FROM responses WHERE rowid IN "
+                "(SELECT rowid FROM responses ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+
+    def stats(self):
+        with closing(self._connect()) as db:
+            entries = db.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        with self._lock:
+            lookups = self.exact_hits + self.semantic_hits + self.misses
+            return {
+                "exact_hits": self.exact_hits,
+                "semantic_hits": self.semantic_hits,
+                "misses": self.misses,
+                "hit_rate": (self.exact_hits + self.semantic_hits) / lookups if lookups else 0.0,
+                "entries": entries,
+            }
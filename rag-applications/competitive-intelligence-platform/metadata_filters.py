@@ -0,0 +1,118 @@
+"""Typed competitor metadata and a small filter language for retrieval.
+
+Filters are written as clauses joined by `and` (or `;`):
+
+    threat_level = High and market_share > 10%
+    industry in [Technology, Cloud Services]; revenue >= 1B
+    market_position != Niche and revenue between 500M and 3B
+
+Values containing `and`, `;` or commas can be quoted, as in
+`competitor = "Johnson and Johnson"`. Numeric fields accept K/M/B suffixes
+and a trailing %. `parse_filter` turns the text into a Chroma `where`
+clause, which is passed to the vector search itself (and restricts BM25
+candidates), so the filter applies before the top k are chosen rather than
+to a handful of results afterwards.
+"""
+
+import re
+
+# Metadata stored with numbers, so range filters work
+NUMERIC_FIELDS = {"revenue": int, "market_share": float}
+CATEGORICAL_FIELDS = {"competitor", "industry", "market_position", "threat_level", "source", "file_type"}
+
+_OPERATORS = {"=": "$eq", "==": "$eq", "!=": "$ne", ">": "$gt", ">=": "$gte", "<": "$lt", "<=": "$lte"}
+_CLAUSE = re.compile(
+    r"^\s*(?P<field>[a-z_]+)\s*(?:"
+    r"(?P<between>between)\s+(?P<low>\S+)\s+and\s+(?P<high>\S+)"
+    r"|(?P<negate>not\s+)?in\s*\[(?P<values>[^\]]*)\]"
+    r"|(?P<op>==|!=|>=|<=|=|>|<)\s*(?P<value>.+?)"
+    r")\s*$",
+    re.IGNORECASE,
+)
+_MULTIPLIERS = {"k": 1e3, "m": 1e6, "b": 1e9}
+# A quote after a letter is an apostrophe (McDonald's), not the start of a quoted value
+_QUOTED = r"(?<!\w)(?:\"[^\"]*\"|'[^']*')"
+
+
+def typed_metadata(metadata):
+    """Copy of `metadata` with numeric fields converted from strings such as '2500000000' or '15.0'"""
+    typed = dict(metadata)
+    for field, kind in NUMERIC_FIELDS.items():
+        if isinstance(typed.get(field), str):
+            try:
+                typed[field] = kind(float(typed[field]))
+            except ValueError:
+                pass
+    return typed
+
+
+def _number(field, text):
+    match = re.fullmatch(r"\$?([0-9]+(?:\.[0-9]+)?)\s*([kmb%]?)", text.strip().lower())
+    if not match:
+        raise ValueError(f"'{text}' is not a number (for {field})")
+    value = float(match.group(1)) * _MULTIPLIERS.get(match.group(2), 1)
+    return int(value) if NUMERIC_FIELDS[field] is int else value
+
+
+def _split(text, separator):
+    """Parts of `text` between matches of the `separator` pattern, which are ignored inside quotes and [...]"""
+    parts = []
+    start = 0
+    depth = 0
+    for match in re.finditer(f"{_QUOTED}|\\[|\\]|{separator}", text, re.IGNORECASE):
+        token = match.group()
+        if token == "[":
+            depth += 1
+        elif token == "]":
+            depth = max(0, depth - 1)
+        elif token[0] not in "'\"" and not depth:
+            parts.append(text[start:match.start()])
+            start = match.end()
+    parts.append(text[start:])
+    return parts
+
+
+def _value(field, text):
+    text = text.strip().strip("'\"")
+    return _number(field, text) if field in NUMERIC_FIELDS else text
+
+
+def _clause(text):
+    match = _CLAUSE.match(text)
+    if not match:
+        raise ValueError(f"Can't read filter '{text.strip()}' (expected e.g. 'revenue >= 1B' or 'industry in [A, B]')")
+    field = match.group("field").lower()
+    if field not in NUMERIC_FIELDS and field not in CATEGORICAL_FIELDS:
+        fields = ", ".join(sorted({*NUMERIC_FIELDS, *CATEGORICAL_FIELDS}))
+        raise ValueError(f"Unknown field '{field}' (available: {fields})")
+
+    if match.group("between"):
+        if field not in NUMERIC_FIELDS:
+            raise ValueError(f"'between' needs a numeric field, not '{field}'")
+        return [{field: {"$gte": _value(field, match.group("low"))}},
+                {field: {"$lte": _value(field, match.group("high"))}}]
+    if match.group("values") is not None:
+        values = [_value(field, v) for v in _split(match.group("values"), ",") if v.strip()]
+        if not values:
+            raise ValueError(f"Empty list for '{field}'")
+        return [{field: {"$nin" if match.group("negate") else "$in": values}}]
+
+    operator = _OPERATORS[match.group("op")]
+    if field not in NUMERIC_FIELDS and operator not in ("$eq", "$ne"):
+        raise ValueError(f"'{field}' can only be compared with = or !=")
+    return [{field: {operator: _value(field, match.group("value"))}}]
+
+
+def parse_filter(text):
+    """Chroma `where` clause for a filter expression; None for an empty one. Raises ValueError."""
+    if not text or not text.strip():
+        return None
+    parts = []
+    for part in _split(text, r"\s+and\s+|;"):
+        # "between 1B and 3B" was split on its own "and"
+        if parts and re.search(r"\bbetween\s+\S+$", parts[-1], re.IGNORECASE):
+            parts[-1] += f" and {part}"
+        elif part.strip():
+            parts.append(part)
+    conditions = [condition for part in parts for condition in _clause(part)]
+    return conditions[0] if len(conditions) == 1 else {"$and": conditions}
@@ -0,0 +1,149 @@
+"""Near-duplicate detection for ingested documents (MinHash + LSH).
+
+Competitor news is syndicated: the same press release arrives from dozens
+of sites with different boilerplate around it. Exact chunk hashes don't
+catch that, so every copy used to be embedded and stored, and the copies
+crowded out everything else in retrieval.
+
+Each document is reduced to a MinHash signature of its word shingles; the
+share of equal signature values estimates the Jaccard similarity of two
+documents' shingle sets. Signatures are split into LSH bands, so only
+documents that share a band bucket are compared. Signatures and buckets
+are stored in SQLite (the ingestion manifest database), so copies are
+recognized across runs.
+"""
+
+import hashlib
+import os
+import re
+
+import numpy as np
+
+NEAR_DUP_THRESHOLD = float(os.getenv("NEAR_DUP_THRESHOLD", 0.7))  # Jaccard similarity; 0 disables detection
+NEAR_DUP_ACTION = os.getenv("NEAR_DUP_ACTION", "skip")  # skip | merge
+NEAR_DUP_PERMUTATIONS = int(os.getenv("NEAR_DUP_PERMUTATIONS", 128))
+NEAR_DUP_SHINGLE_SIZE = int(os.getenv("NEAR_DUP_SHINGLE_SIZE", 5))  # words
+
+_PRIME = np.uint64(2**31 - 1)
+# Shingles hashed at once: bounds the (shingles x permutations) uint64 matrix to 4 MB at 128 permutations
+_SHINGLE_BLOCK = 4096
+
+
+def shingles(text, size=NEAR_DUP_SHINGLE_SIZE):
+    """32-bit hashes of the word `size`-grams of `text`"""
+    words = re.findall(r"\w+", text.lower())
+    grams = {" ".join(words[i:i + size]) for i in range(max(1, len(words) - size + 1))} if words else set()
+    return np.array(
+        [int.from_bytes(hashlib.blake2b(g.encode("utf-8"), digest_size=4).digest(), "little") for g in grams],
+        dtype=np.uint64,
+    )
+
+
+def optimal_bands(threshold, num_perm):
+    """(bands, rows) whose LSH S-curve best separates pairs above and below `threshold`"""
+    xs = np.linspace(0.0, 1.0, 201)
+    below, above = xs < threshold, xs >= threshold
+    best = None
+    for rows in range(1, num_perm + 1):
+        bands = num_perm // rows
+        probability = 1 - (1 - xs ** rows) ** bands
+        # False positive and false negative areas, weighted equally
+        error = probability[below].sum() + (1 - probability[above]).sum()
+        if best is None or error < best[0]:
+            best = (error, bands, rows)
+    return best[1], best[2]
+
+
+class MinHasher:
+    def __init__(self, num_perm=NEAR_DUP_PERMUTATIONS, seed=1):
+        rng = np.random.default_rng(seed)
+        # (a * x + b) mod p with p = 2^31 - 1; products stay below 2^62
+        self.a = rng.integers(1, int(_PRIME), size=num_perm, dtype=np.uint64)
+        self.b = rng.integers(0, int(_PRIME), size=num_perm, dtype=np.uint64)
+
+    def signature(self, text):
+        hashes = shingles(text) % _PRIME
+        if not len(hashes):
+            return None
+        signature = np.full(len(self.a), _PRIME, dtype=np.uint64)
+        for start in range(0, len(hashes), _SHINGLE_BLOCK):
+            block = np.outer(hashes[start:start + _SHINGLE_BLOCK], self.a)
+            block += self.b
+            block %= _PRIME
+            np.minimum(signature, block.min(axis=0), out=signature)
+        return signature.astype(np.uint32)
+
+
+class NearDuplicateIndex:
+    """Persistent LSH index of document signatures, per collection"""
+
+    def __init__(self, db, collection, threshold=NEAR_DUP_THRESHOLD, num_perm=NEAR_DUP_PERMUTATIONS):
+        self.db = db
+        self.collection = collection
+        self.threshold = threshold
+        self.hasher = MinHasher(num_perm)
+        self.bands, self.rows = optimal_bands(threshold, num_perm)
+        with db:
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS signatures (collection TEXT, source TEXT, signature BLOB, "
+                "duplicate_of TEXT, PRIMARY KEY (collection, source))"
+            )
+            db.execute("CREATE TABLE IF NOT EXISTS lsh_buckets (collection TEXT, band INTEGER, bucket INTEGER, source TEXT)")
+            db.execute("CREATE INDEX IF NOT EXISTS lsh_lookup ON lsh_buckets (collection, band, bucket)")
+            db.execute("CREATE INDEX IF NOT EXISTS lsh_source ON lsh_buckets (collection, source)")
+
+    def _buckets(self, signature):
+        for band in range(self.bands):
+            chunk = signature[band * self.rows:(band + 1) * self.rows].tobytes()
+            yield band, int.from_bytes(hashlib.blake2b(chunk, digest_size=8).digest(), "little", signed=True)
+
+    def find(self, source, signature):
+        """(canonical source, estimated Jaccard) of the closest indexed document at or above the threshold"""
+        candidates = set()
+        for band, bucket in self._buckets(signature):
+            candidates.update(row[0] for row in self.db.execute(
+                "SELECT source FROM lsh_buckets WHERE collection = ? AND band = ? AND bucket = ?",
+                (self.collection, band, bucket),
+            ))
+        candidates.discard(source)
+        best = None
+        for candidate in candidates:
+            row = self.db.execute(
+                "SELECT signature FROM signatures WHERE collection = ? AND source = ?", (self.collection, candidate)
+            ).fetchone()
+            similarity = float(np.mean(np.frombuffer(row[0], dtype=np.uint32) == signature))
+            if similarity >= self.threshold and (best is None or similarity > best[1]):
+                best = (candidate, similarity)
+        return best
+
+    def add(self, source, signature, duplicate_of=None):
+        """Index a canonical document, or record `source` as a duplicate of `duplicate_of`.
+
+        Returns the sources previously skipped as duplicates of `source`: they
+        need to be checked again.
+        """
+        duplicates = self.remove(source)
+        with self.db:
+            self.db.execute(
+                "INSERT INTO signatures VALUES (?, ?, ?, ?)",
+                (self.collection, source, signature.tobytes(), duplicate_of),
+            )
+            if duplicate_of is None:
+                self.db.executemany(
+                    "INSERT INTO lsh_buckets VALUES (?, ?, ?, ?)",
+                    [(self.collection, band, bucket, source) for band, bucket in self._buckets(signature)],
+                )
+        return duplicates
+
+    def remove(self, source):
+        """Forget `source`; returns the sources that were skipped as its duplicates"""
+        with self.db:
+            duplicates = [row[0] for row in self.db.execute(
+                "SELECT source FROM signatures WHERE collection = ? AND duplicate_of = ?", (self.collection, source)
+            )]
+            self.db.execute("DELETE FROM signatures WHERE collection = ? AND source = ?", (self.collection, source))
+            self.db.execute("DELETE FROM lsh_buckets WHERE collection = ? AND source = ?", (self.collection, source))
+            self.db.execute(
+                "DELETE FROM signatures WHERE collection = ? AND duplicate_of = ?", (self.collection, source)
+            )
+        return duplicates
@@ -0,0 +1,128 @@
+"""Prompt templates for competitor analyses and market reports.
+
+The standard prompts ask for a full multi-section report from the
+model's own knowledge. The grounded prompts are compact: they pass the
+knowledge-base chunks that `grounding.py` retrieved and packed, ask for
+the same sections in one line, and ask the model to cite the chunks and
+say what the context doesn't cover.
+"""
+
+
+def competitor_analysis_prompt(competitor_data, analysis_type):
+    return f"""
+            Analyze the following competitor data:
+            
+            Competitor Data: {competitor_data}
+            Analysis Type: {analysis_type}
+            
+            Please provide comprehensive competitive analysis including:
+            
+            1. COMPETITOR PROFILE ANALYSIS:
+               - Company overview and business model assessment
+               - Market position and competitive positioning
+               - Financial performance and growth trajectory
+               - Organizational structure and leadership analysis
+            
+            2. COMPETITIVE STRENGTHS AND WEAKNESSES:
+               - Core competencies and competitive advantages
+               - Market strengths and differentiation factors
+               - Operational weaknesses and vulnerabilities
+               - Strategic gaps and improvement opportunities
+            
+            3. MARKET STRATEGY EVALUATION:
+               - Go-to-market strategy and approach
+               - Product and service portfolio analysis
+               - Pricing strategy and value proposition
+               - Customer acquisition and retention strategies
+            
+            4. COMPETITIVE THREAT ASSESSMENT:
+               - Direct and indirect competitive threats
+               - Market disruption potential and innovation capacity
+               - Competitive response capabilities and agility
+               - Strategic threat level and impact evaluation
+            
+            5. PERFORMANCE BENCHMARKING:
+               - Financial performance comparison and metrics
+               - Market share and growth rate analysis
+               - Operational efficiency and productivity metrics
+               - Customer satisfaction and loyalty indicators
+            
+            6. STRATEGIC RECOMMENDATIONS:
+               - Competitive response strategies and tactics
+               - Defensive and offensive strategic options
+               - Market positioning and differentiation opportunities
+               - Competitive monitoring and intelligence priorities
+            
+            Provide actionable competitive intelligence insights and strategic recommendations.
+            """
+
+
+def market_report_prompt(market_context, report_scope):
+    return f"""
+            Generate market intelligence report for: {market_context}
+            Report Scope: {report_scope}
+            
+            Please provide comprehensive market intelligence including:
+            
+            1. MARKET LANDSCAPE OVERVIEW:
+               - Market size, growth, and dynamics analysis
+               - Key market segments and customer demographics
+               - Market trends and driving factors
+               - Regulatory environment and compliance requirements
+            
+            2. COMPETITIVE LANDSCAPE ANALYSIS:
+               - Major competitors and market leaders identification
+               - Competitive positioning and market share analysis
+               - Competitive strategies and differentiation approaches
+               - New entrants and emerging competitive threats
+            
+            3. MARKET OPPORTUNITIES AND THREATS:
+               - Growth opportunities and market gaps identification
+               - Emerging market trends and technology disruptions
+               - Competitive threats and market challenges
+               - Strategic opportunities for market entry and expansion
+            
+            4. CUSTOMER AND DEMAND ANALYSIS:
+               - Customer needs and preferences assessment
+               - Demand patterns and purchasing behavior analysis
+               - Customer satisfaction and loyalty evaluation
+               - Market demand forecasting and projections
+            
+            5. TECHNOLOGY AND INNOVATION TRENDS:
+               - Technology trends and innovation developments
+               - Disruptive technologies and market impact
+               - Innovation strategies and R&D investments
+               - Technology adoption and market readiness
+            
+            6. STRATEGIC MARKET INSIGHTS:
+               - Market entry and expansion strategies
+               - Competitive positioning and differentiation recommendations
+               - Partnership and alliance opportunities
+               - Market timing and strategic priorities
+            
+            Provide actionable market intelligence with strategic insights and recommendations.
+            """
+
+
+def grounded_competitor_analysis_prompt(competitor_data, analysis_type, context):
+    return f"""Competitor: {competitor_data}
+Analysis type: {analysis_type}
+
+Knowledge base excerpts:
+{context}
+
+Write a competitive analysis: profile and positioning; strengths and weaknesses; market strategy; \
+threat assessment; performance benchmarks; strategic recommendations. Use the excerpts and the competitor \
+description, cite excerpts as [n], and note where information is missing. Be concise and actionable."""
+
+
+def grounded_market_report_prompt(market_context, report_scope, context):
+    return f"""Market: {market_context}
+Report scope: {report_scope}
+
+Knowledge base excerpts:
+{context}
+
+Write a market intelligence report: market landscape; competitive landscape; opportunities and threats; \
+customer demand; technology trends; strategic recommendations. Use the excerpts and the market description, \
+cite excerpts as [n], and note where information is missing. Be concise and actionable."""
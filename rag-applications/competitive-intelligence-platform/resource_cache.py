@@ -0,0 +1,143 @@
+"""Process-wide cache for LLM, embedding, vector store and chain objects.
+
+Streamlit runs every browser session in the same process, but each session
+used to build its own clients and (for Anthropic) load the HuggingFace
+embedding model again. Sessions now lease shared objects from one
+`ResourceCache`, keyed by what makes them different (provider, model,
+settings and a fingerprint of the API key). Entries are reference counted;
+entries no session holds are evicted when they sit idle too long or when
+the cache grows past its size limit, least recently used first.
+"""
+
+import hashlib
+import os
+import threading
+import time
+import weakref
+
+# Unreferenced entries kept at most, and how long they may stay idle
+RESOURCE_CACHE_MAX_ENTRIES = int(os.getenv("RESOURCE_CACHE_MAX_ENTRIES", 16))
+RESOURCE_CACHE_IDLE_SECONDS = float(os.getenv("RESOURCE_CACHE_IDLE_SECONDS", 1800))
+
+
+def key_fingerprint(api_key):
+    """Short, non-reversible stand-in for an API key in cache keys"""
+    if not api_key:
+        return None
+    return hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:16]
+
+
+class _Entry:
+    def __init__(self):
+        self.value = None
+        self.ready = threading.Event()
+        self.error = None
+        self.refs = 0
+        self.last_used = time.monotonic()
+
+
+class ResourceCache:
+    """Thread-safe, reference-counted cache of expensive objects"""
+
+    def __init__(self, max_entries=RESOURCE_CACHE_MAX_ENTRIES, idle_seconds=RESOURCE_CACHE_IDLE_SECONDS):
+        self.max_entries = max_entries
+        self.idle_seconds = idle_seconds
+        self._entries = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def acquire(self, key, factory):
+        """Return the object for `key`, building it with `factory()` on first use.
+
+        Every acquire must be paired with a `release(key)`. Concurrent acquires
+        of a missing key wait for a single build.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            building = entry is None
+            if building:
+                entry = self._entries[key] = _Entry()
+                self.misses += 1
+            else:
+                self.hits += 1
+            entry.refs += 1
+            entry.last_used = time.monotonic()
+
+        if building:
+            try:
+                entry.value = factory()
+            except BaseException as e:
+                entry.error = e
+                with self._lock:
+                    self._entries.pop(key, None)
+                raise
+            finally:
+                entry.ready.set()
+        else:
+            entry.ready.wait()
+            if entry.error is not None:
+                raise entry.error
+
+        self._evict()
+        return entry.value
+
+    def release(self, *keys):
+        """Drop one reference to each key; unreferenced entries become evictable"""
+        with self._lock:
+            for key in keys:
+                entry = self._entries.get(key)
+                if entry is not None and entry.refs > 0:
+                    entry.refs -= 1
+                    entry.last_used = time.monotonic()
+        self._evict()
+
+    def _evict(self):
+        now = time.monotonic()
+        with self._lock:
+            idle = sorted(
+                (entry.last_used, key)
+                for key, entry in self._entries.items()
+                if entry.refs == 0 and entry.ready.is_set()
+            )
+            overflow = len(self._entries) - self.max_entries
+            for last_used, key in idle:
+                if overflow <= 0 and now - last_used < self.idle_seconds:
+                    break
+                del self._entries[key]
+                overflow -= 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "in_use": sum(1 for entry in self._entries.values() if entry.refs),
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+class ResourceLeases:
+    """The keys one owner (a platform instance) holds in a ResourceCache.
+
+    Leases are released when `release_all()` is called or when the owner is
+    garbage collected, e.g. after its Streamlit session ends.
+    """
+
+    def __init__(self, cache, owner):
+        self.cache = cache
+        self._keys = []
+        weakref.finalize(owner, ResourceLeases._release, cache, self._keys)
+
+    def acquire(self, key, factory):
+        value = self.cache.acquire(key, factory)
+        self._keys.append(key)
+        return value
+
+    def release_all(self):
+        ResourceLeases._release(self.cache, self._keys)
+
+    @staticmethod
+    def _release(cache, keys):
+        cache.release(*keys)
+        keys.clear()
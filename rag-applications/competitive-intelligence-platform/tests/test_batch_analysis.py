@@ -0,0 +1,38 @@
+import time
+
+from batch_analysis import BatchAnalysis, provider_limits
+
+
+def test_cached_answers_take_no_rate_token():
+    limits = provider_limits("rate-test")
+    limits.rate.interval = 3600.0  # no refill during the test
+    limits.rate.tokens = 1.0
+    sent = []
+
+    def analyze(competitor, before_llm_call):
+        if competitor.startswith("cached"):
+            return "cached answer"
+        before_llm_call()
+        sent.append(competitor)
+        return "fresh answer"
+
+    batch = BatchAnalysis([f"cached {i}" for i in range(10)] + ["new"], analyze, "rate-test")
+    started = time.perf_counter()
+    batch.run()
+    assert time.perf_counter() - started < 5
+    assert batch.done == 11 and sent == ["new"]
+
+
+def test_cancel_while_waiting_for_a_token_drops_the_competitor():
+    limits = provider_limits("cancel-test")
+    limits.rate.interval = 3600.0
+    limits.rate.tokens = 0.0
+
+    def analyze(competitor, before_llm_call):
+        batch.cancel()
+        before_llm_call()
+        return "fresh answer"
+
+    batch = BatchAnalysis(["new"], analyze, "cancel-test")
+    batch.run()
+    assert batch.done == 0
@@ -0,0 +1,42 @@
+import pytest
+
+from benchmark_retrieval import HashEmbeddings
+from grounding import RetrievalCache
+from hybrid_search import HybridChroma, HybridRetriever
+
+
+@pytest.fixture
+def retriever(tmp_path):
+    vectorstore = HybridChroma(
+        collection_name="grounding-test", embedding_function=HashEmbeddings(), persist_directory=str(tmp_path / "db")
+    )
+    vectorstore.add_texts(["Acme cut enterprise pricing by 20%"], metadatas=[{"competitor": "Acme"}], ids=["acme"])
+    return HybridRetriever(vectorstore=vectorstore, k=1)
+
+
+def test_clear_drops_results_of_replaced_chunks(retriever):
+    cache = RetrievalCache()
+    documents, cached = cache.retrieve(retriever, "Acme pricing")
+    assert not cached and "20%" in documents[0].page_content
+
+    # Same ID, so the collection's count doesn't change
+    retriever.vectorstore.add_texts(["Acme raised enterprise pricing by 5%"], metadatas=[{"competitor": "Acme"}],
+                                    ids=["acme"])
+    assert cache.retrieve(retriever, "Acme pricing")[1]
+
+    cache.clear()
+    documents, cached = cache.retrieve(retriever, "Acme pricing")
+    assert not cached and "5%" in documents[0].page_content
+
+
+def test_retrieval_started_before_clear_is_not_stored(retriever):
+    cache = RetrievalCache()
+    invoke = retriever.invoke
+
+    def clear_while_retrieving(query):
+        cache.clear()
+        return invoke(query)
+
+    object.__setattr__(retriever, "invoke", clear_while_retrieving)
+    cache.retrieve(retriever, "Acme pricing")
+    assert cache.stats()["entries"] == 0
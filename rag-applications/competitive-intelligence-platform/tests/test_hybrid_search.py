@@ -0,0 +1,24 @@
+from benchmark_retrieval import HashEmbeddings
+from hybrid_search import HybridChroma, HybridRetriever
+
+
+def test_bm25_filter_keeps_best_matching_documents(tmp_path):
+    vectorstore = HybridChroma(
+        collection_name="hybrid-test", embedding_function=HashEmbeddings(), persist_directory=str(tmp_path / "db")
+    )
+    texts, metadatas, ids = [], [], []
+    for i in range(600):
+        level = "High" if i % 100 == 0 else "Low"
+        texts.append(f"pricing update {i} " + "pricing " * (i % 7))
+        metadatas.append({"threat_level": level})
+        ids.append(f"doc-{i}")
+    vectorstore.add_texts(texts, metadatas=metadatas, ids=ids)
+
+    retriever = HybridRetriever(vectorstore=vectorstore, k=4, mode="bm25", filter={"threat_level": {"$eq": "High"}})
+    found = retriever.invoke("pricing")
+    assert len(found) == 4
+    assert all(doc.metadata["threat_level"] == "High" for doc in found)
+
+    unfiltered = HybridRetriever(vectorstore=vectorstore, k=600, mode="bm25").invoke("pricing")
+    best_high = [doc.id for doc in unfiltered if doc.metadata["threat_level"] == "High"][:4]
+    assert [doc.id for doc in found] == best_high
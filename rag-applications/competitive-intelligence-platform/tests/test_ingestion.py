@@ -0,0 +1,119 @@
+import os
+
+import pytest
+
+from benchmark_retrieval import HashEmbeddings
+from hybrid_search import HybridChroma
+from ingestion import Manifest, ingest_directory
+
+
+def paragraph(word):
+    return " ".join([word] * 16)
+
+
+@pytest.fixture
+def store(tmp_path):
+    vectorstore = HybridChroma(
+        collection_name="ingestion-test", embedding_function=HashEmbeddings(), persist_directory=str(tmp_path / "db")
+    )
+    return vectorstore, str(tmp_path / "manifest.db")
+
+
+def ingest(root, vectorstore, manifest_path, near_duplicate_threshold=0):
+    return ingest_directory(str(root), vectorstore, manifest_path, workers=1, chunk_size=100, chunk_overlap=0,
+                            near_duplicate_threshold=near_duplicate_threshold)
+
+
+def write(path, *paragraphs):
+    path.write_text("\n\n".join(paragraphs))
+    # Move the mtime on, so the change is seen even when the size stays the same
+    os.utime(path, (path.stat().st_atime, path.stat().st_mtime + 10))
+
+
+def press_release(seed):
+    return " ".join(f"{seed}{i % 97} launch{i % 13} pricing{i % 7}" for i in range(120))
+
+
+def stored_text(vectorstore):
+    return " ".join(vectorstore.get(include=["documents"])["documents"])
+
+
+def missing_chunks(vectorstore, manifest_path, sources):
+    manifest = Manifest(manifest_path, vectorstore._collection.name)
+    try:
+        ids = {chunk_id for source in sources for chunk_id in manifest.chunk_ids(source)}
+    finally:
+        manifest.close()
+    return ids - set(vectorstore.get(ids=sorted(ids), include=[])["ids"])
+
+
+def test_chunk_moved_between_files_stays_stored(tmp_path, store):
+    vectorstore, manifest_path = store
+    root = tmp_path / "docs"
+    root.mkdir()
+    a, b = root / "a.txt", root / "b.txt"
+    write(a, paragraph("moving"), paragraph("alpha"))
+    write(b, paragraph("beta"))
+    ingest(root, vectorstore, manifest_path)
+
+    # The shared chunk leaves a.txt (recorded first) and joins b.txt in the same run
+    write(a, paragraph("alpha"))
+    write(b, paragraph("beta"), paragraph("moving"))
+    stats = ingest(root, vectorstore, manifest_path)
+
+    sources = [str(a), str(b)]
+    assert missing_chunks(vectorstore, manifest_path, sources) == set()
+    assert stats.deleted == 0
+    assert any("moving" in doc for doc in vectorstore.get(include=["documents"])["documents"])
+
+    ingest(root, vectorstore, manifest_path)
+    assert missing_chunks(vectorstore, manifest_path, sources) == set()
+
+
+@pytest.mark.parametrize("change", ["delete", "edit"])
+def test_copy_of_changed_canonical_stays_retrievable(tmp_path, store, change):
+    vectorstore, manifest_path = store
+    root = tmp_path / "docs"
+    root.mkdir()
+    original, copy = root / "a_release.txt", root / "b_mirror.txt"
+    write(original, press_release("acme"))
+    write(copy, press_release("acme"), "Syndicated by Example News")
+    stats = ingest(root, vectorstore, manifest_path, near_duplicate_threshold=0.7)
+    assert [(d[0], d[1]) for d in stats.near_duplicates] == [(str(copy), str(original))]
+    assert "Syndicated" not in stored_text(vectorstore)
+
+    if change == "delete":
+        original.unlink()
+    else:
+        write(original, press_release("zeta"))
+    ingest(root, vectorstore, manifest_path, near_duplicate_threshold=0.7)
+
+    text = stored_text(vectorstore)
+    assert "Syndicated by Example News" in text
+    assert "acme5 launch5" in text
+    assert missing_chunks(vectorstore, manifest_path, [str(copy)]) == set()
+
+
+def test_chunks_of_removed_file_are_deleted_after_failed_run(tmp_path, store, monkeypatch):
+    vectorstore, manifest_path = store
+    root = tmp_path / "docs"
+    root.mkdir()
+    write(root / "a.txt", paragraph("stale"))
+    ingest(root, vectorstore, manifest_path)
+
+    (root / "a.txt").unlink()
+    write(root / "b.txt", paragraph("fresh"))
+
+    def rate_limited(*args, **kwargs):
+        raise RuntimeError("rate limit exceeded")
+
+    monkeypatch.setattr(vectorstore, "add_texts", rate_limited)
+    with pytest.raises(RuntimeError):
+        ingest(root, vectorstore, manifest_path)
+    assert "stale" in stored_text(vectorstore)
+
+    monkeypatch.undo()
+    stats = ingest(root, vectorstore, manifest_path)
+    assert stats.deleted == 1
+    text = stored_text(vectorstore)
+    assert "stale" not in text and "fresh" in text
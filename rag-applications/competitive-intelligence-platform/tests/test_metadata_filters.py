@@ -0,0 +1,41 @@
+import pytest
+
+from metadata_filters import parse_filter
+
+
+def test_clauses_joined_by_and_and_semicolon():
+    assert parse_filter("threat_level = High and market_share > 10%; revenue between 500M and 3B") == {"$and": [
+        {"threat_level": {"$eq": "High"}},
+        {"market_share": {"$gt": 10.0}},
+        {"revenue": {"$gte": 500_000_000}},
+        {"revenue": {"$lte": 3_000_000_000}},
+    ]}
+
+
+@pytest.mark.parametrize("quote", ['"', "'"])
+def test_quoted_value_keeps_and(quote):
+    text = f"competitor = {quote}Johnson and Johnson{quote} and threat_level != Low"
+    assert parse_filter(text) == {"$and": [
+        {"competitor": {"$eq": "Johnson and Johnson"}},
+        {"threat_level": {"$ne": "Low"}},
+    ]}
+
+
+def test_quoted_list_values_keep_commas_and_semicolons():
+    assert parse_filter('industry in ["Health, Beauty", "Food; Drink", Retail]') == {
+        "industry": {"$in": ["Health, Beauty", "Food; Drink", "Retail"]}
+    }
+
+
+def test_apostrophe_is_not_a_quote():
+    assert parse_filter("competitor = McDonald's and industry = 'Fast Food'") == {"$and": [
+        {"competitor": {"$eq": "McDonald's"}},
+        {"industry": {"$eq": "Fast Food"}},
+    ]}
+
+
+def test_separators_inside_a_list_stay_in_the_clause():
+    assert parse_filter("industry in [Food; Drink, Health and Beauty] and revenue >= 1B") == {"$and": [
+        {"industry": {"$in": ["Food; Drink", "Health and Beauty"]}},
+        {"revenue": {"$gte": 1_000_000_000}},
+    ]}